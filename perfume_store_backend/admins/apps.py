@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class AdminsConfig(AppConfig):
+    name = 'perfume_store_backend.admins'
+
+    def ready(self):
+        # Connects the signal handlers that revoke cached token lookups
+        from . import authentication  # noqa: F401
+        # Registers the deploy check for a shared login throttle
+        from . import throttling  # noqa: F401
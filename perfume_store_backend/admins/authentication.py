@@ -0,0 +1,98 @@
+"""
+Token authentication with the token lookup cached.
+
+DRF's TokenAuthentication loads the token and its user with a join on
+every authenticated request. `CachedTokenAuthentication` keeps what the
+permission checks need of the user (CACHED_USER_FIELDS: its id, name and
+flags) in the cache for AUTH_TOKEN_CACHE_TIMEOUT seconds, keyed by a hash
+of the token, and rebuilds the (user, token) pair from that and the key
+the request presented. The cache never holds a usable credential: neither
+the token key nor the password hash is stored. The rebuilt user loads any
+other field from the database when it is read, and saves only the fields
+that were loaded or set.
+
+Entries are revoked rather than just deleted when a token is deleted
+(password change, logout) or its admin is saved (is_active, is_staff or
+any other field): the revocation marker outlives a request that loaded
+the token just before and would otherwise put it back. A revoked key is
+looked up in the database on every request until the marker expires.
+Changes made with QuerySet.update() send no signals and are only seen
+once the entry expires.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .models import Admin
+
+# Seconds a token lookup is cached; also how long a revocation is remembered
+AUTH_TOKEN_CACHE_TIMEOUT = getattr(settings, 'AUTH_TOKEN_CACHE_TIMEOUT', 300)
+
+REVOKED = 'revoked'
+
+# What is cached of a token's admin: enough for authentication and permission checks, nothing secret
+CACHED_USER_FIELDS = ('id', 'name', 'is_active', 'is_staff', 'is_superuser')
+
+
+def token_cache_key(key):
+    return 'auth_token_' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def revoke_cached_tokens(keys):
+    """Drop the cached lookups of these token keys."""
+    if keys:
+        cache.set_many({token_cache_key(key): REVOKED for key in keys}, AUTH_TOKEN_CACHE_TIMEOUT)
+
+
+def cached_user_entry(user):
+    """The cache entry for a token of `user`."""
+    return tuple(getattr(user, field) for field in CACHED_USER_FIELDS)
+
+
+def _user_from_entry(entry):
+    """The admin of a cache entry, with the fields that are not cached deferred: loaded if read, left alone by save()."""
+    values = dict(zip(CACHED_USER_FIELDS, entry))
+    # from_db() takes the values in the model's field order
+    names = [field.attname for field in Admin._meta.concrete_fields if field.attname in values]
+    return Admin.from_db(DEFAULT_DB_ALIAS, names, [values[name] for name in names])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that usually answers from the cache instead of the database."""
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        entry = cache.get(cache_key)
+        if entry is None or entry == REVOKED:
+            try:
+                token = self.get_model().objects.select_related('user').get(key=key)
+            except self.get_model().DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            # Never replaces a revocation, including one that raced this lookup
+            cache.add(cache_key, cached_user_entry(token.user), AUTH_TOKEN_CACHE_TIMEOUT)
+        else:
+            token = self.get_model()(key=key, user=_user_from_entry(entry))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        return (token.user, token)
+
+
+@receiver(post_delete, sender=Token, dispatch_uid='revoke_deleted_token')
+def _token_deleted(sender, instance, **kwargs):
+    revoke_cached_tokens([instance.key])
+
+
+@receiver(post_save, sender=Admin, dispatch_uid='revoke_saved_admin_tokens')
+def _admin_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    revoke_cached_tokens(list(Token.objects.filter(user_id=instance.pk).values_list('key', flat=True)))
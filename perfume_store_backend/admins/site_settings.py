@@ -0,0 +1,148 @@
+"""
+Read-through access to the `Settings` table.
+
+`site_settings` keeps the whole table (it holds a handful of rows) in each
+process and reloads it when the shared settings generation moves on, which
+every write through `site_settings.update()` does. A read queries at most
+the generation, and that at most once per GENERATION_CHECK_INTERVAL.
+
+Values are stored as text. Keys listed in SITE_SETTING_TYPES are decoded
+to their type on load and validated on write; other keys are plain
+strings. Only the keys in PUBLIC_SITE_SETTINGS are served to the
+storefront by the public settings endpoint.
+"""
+import json
+import logging
+import threading
+
+from django.conf import settings
+
+from perfume_store_backend.perfumes.catalog import bump_generation, get_generation
+
+from .models import Settings
+
+SETTINGS_GENERATION_KEY = 'settings_generation'
+
+# Type of each known setting: one of DECODERS
+SITE_SETTING_TYPES = getattr(settings, 'SITE_SETTING_TYPES', {
+    'whatsapp_phone': 'str',
+})
+
+# Settings anyone may read through /api/settings/
+PUBLIC_SITE_SETTINGS = getattr(settings, 'PUBLIC_SITE_SETTINGS', ('whatsapp_phone',))
+
+SETTING_KEY_MAX_LENGTH = Settings._meta.get_field('key').max_length
+
+# Most settings one bulk PUT may write
+SETTINGS_MAX_BULK = 100
+
+
+def _decode_bool(text):
+    value = text.strip().lower()
+    if value in ('1', 'true', 'yes', 'on'):
+        return True
+    if value in ('0', 'false', 'no', 'off', ''):
+        return False
+    raise ValueError(f"not a boolean: {text!r}")
+
+
+DECODERS = {
+    'str': str,
+    'int': int,
+    'float': float,
+    'bool': _decode_bool,
+    'json': json.loads,
+}
+
+
+class SettingValueError(ValueError):
+    pass
+
+
+def decode_setting(key, text):
+    """The typed value of setting `key` stored as `text`; raises ValueError if it does not parse."""
+    return DECODERS[SITE_SETTING_TYPES.get(key, 'str')](text)
+
+
+def encode_setting(key, value):
+    """The text stored for setting `key` set to `value`, checked against the key's type."""
+    if not isinstance(key, str) or not key or len(key) > SETTING_KEY_MAX_LENGTH:
+        raise SettingValueError(f"Setting keys must be non-empty strings of at most {SETTING_KEY_MAX_LENGTH} characters.")
+    if value is None:
+        raise SettingValueError(f"{key}: a value is required.")
+    if isinstance(value, bool):
+        text = 'true' if value else 'false'
+    elif isinstance(value, (dict, list)):
+        text = json.dumps(value, ensure_ascii=False)
+    else:
+        text = str(value)
+    try:
+        decode_setting(key, text)
+    except ValueError:
+        raise SettingValueError(f"{key}: expected a {SITE_SETTING_TYPES[key]} value.")
+    return text
+
+
+class SiteSettings:
+    """The Settings table, cached per process and reloaded when the settings generation changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generation = None
+        self._text = {}
+        self._values = {}
+
+    def _ensure_loaded(self):
+        generation = get_generation(SETTINGS_GENERATION_KEY)
+        if self._generation == generation:
+            return
+        with self._lock:
+            if self._generation == generation:
+                return
+            text = dict(Settings.objects.values_list('key', 'value'))
+            values = {}
+            for key, value in text.items():
+                try:
+                    values[key] = decode_setting(key, value)
+                except ValueError:
+                    logging.error(f"Setting {key} holds {value!r}, which is not a valid {SITE_SETTING_TYPES[key]}")
+            self._text, self._values = text, values
+            self._generation = generation
+
+    def as_text(self):
+        """Every setting as stored, {key: text}."""
+        self._ensure_loaded()
+        return dict(self._text)
+
+    def get(self, key, default=None):
+        """The typed value of `key`, or `default` if it is unset or does not parse."""
+        self._ensure_loaded()
+        return self._values.get(key, default)
+
+    def public(self):
+        """The typed values of the PUBLIC_SITE_SETTINGS that are set."""
+        self._ensure_loaded()
+        return {key: self._values[key] for key in PUBLIC_SITE_SETTINGS if key in self._values}
+
+    def update(self, values):
+        """
+        Set every {key: value} in `values` with one upsert and retire the
+        cached table everywhere. Raises SettingValueError, writing nothing,
+        if any key or value is invalid.
+        """
+        rows = [
+            Settings(key=key, value=encode_setting(key, value), description=f'Setting for {key}')
+            for key, value in values.items()
+        ]
+        Settings.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['key'], update_fields=['value', 'updated_at'],
+        )
+        bump_generation(SETTINGS_GENERATION_KEY)
+
+    def invalidate(self):
+        """Drop this process's copy; it is reloaded on the next read."""
+        with self._lock:
+            self._generation = None
+
+
+site_settings = SiteSettings()
@@ -0,0 +1,285 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from perfume_store_backend.admins import authentication, site_settings as site_settings_module, throttling
+from perfume_store_backend.admins import views as admin_views
+from perfume_store_backend.admins.site_settings import site_settings
+from perfume_store_backend.perfumes import catalog
+
+Admin = get_user_model()
+
+# A process reuses the generation it read last for GENERATION_CHECK_INTERVAL seconds; tests
+# counting queries keep it for their whole run instead of depending on how fast they run
+within_check_interval = mock.patch.object(catalog, 'GENERATION_CHECK_INTERVAL', 60)
+
+
+class CachedTokenAuthenticationTest(APITestCase):
+    """
+    Test suite for the cached admin token lookup and its invalidation.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.admin_user = Admin.objects.create_superuser(name='tokenadmin', password='testpassword')
+        self.token = Token.objects.create(user=self.admin_user)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.url = reverse('admin-settings')
+
+    def test_cached_lookup_saves_a_query(self):
+        """
+        Test that only the first request loads the token from the database.
+        """
+        url = reverse('admin-perfume-list')
+        with CaptureQueriesContext(connection) as first:
+            self.assertEqual(self.client.get(url, secure=True).status_code, status.HTTP_200_OK)
+        with CaptureQueriesContext(connection) as second:
+            self.assertEqual(self.client.get(url, secure=True).status_code, status.HTTP_200_OK)
+        self.assertEqual(len(second), len(first) - 1)
+        self.assertFalse(any('authtoken_token' in query['sql'] for query in second.captured_queries))
+
+    def test_password_update_revokes_cached_tokens(self):
+        """
+        Test that the tokens deleted by a password update stop working at once.
+        """
+        self.client.get(self.url, secure=True)
+        response = self.client.post(reverse('admin-update-password'), {'password': 'newpassword'}, format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.get(self.url, secure=True).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_admin_changes_revoke_cached_tokens(self):
+        """
+        Test that deactivating or demoting an admin takes effect on the next request.
+        """
+        self.client.get(self.url, secure=True)
+        self.admin_user.is_staff = False
+        self.admin_user.save()
+        self.assertEqual(self.client.get(self.url, secure=True).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.admin_user.is_staff = True
+        self.admin_user.save()
+        self.assertEqual(self.client.get(self.url, secure=True).status_code, status.HTTP_200_OK)
+
+        self.admin_user.is_active = False
+        self.admin_user.save()
+        self.assertEqual(self.client.get(self.url, secure=True).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_revocation_wins_a_racing_lookup(self):
+        """
+        Test that a lookup that started before a revocation cannot put the token back in the cache.
+        """
+        token_key = self.token.key
+        self.token.delete()
+        cache.add(authentication.token_cache_key(token_key), authentication.cached_user_entry(self.admin_user),
+                  authentication.AUTH_TOKEN_CACHE_TIMEOUT)
+        self.assertEqual(self.client.get(self.url, secure=True).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cache_holds_no_credentials(self):
+        """
+        Test that the cached lookup holds neither the token key nor the password hash, and still authenticates.
+        """
+        self.client.get(self.url, secure=True)
+        entry = cache.get(authentication.token_cache_key(self.token.key))
+        self.assertEqual(entry, (self.admin_user.id, 'tokenadmin', True, True, True))
+        self.assertNotIn(self.token.key, repr(entry))
+        self.assertNotIn(self.admin_user.password, repr(entry))
+
+        with self.assertNumQueries(0):
+            user, token = authentication.CachedTokenAuthentication().authenticate_credentials(self.token.key)
+        self.assertEqual((user.pk, user.name, token.key), (self.admin_user.pk, 'tokenadmin', self.token.key))
+
+        # A password change through the cached user writes the password alone
+        created_at = Admin.objects.get(pk=self.admin_user.pk).created_at
+        response = self.client.post(reverse('admin-update-password'), {'password': 'newpassword'}, format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        saved = Admin.objects.get(pk=self.admin_user.pk)
+        self.assertTrue(saved.check_password('newpassword'))
+        self.assertEqual((saved.created_at, saved.name), (created_at, 'tokenadmin'))
+
+
+class SiteSettingsTest(APITestCase):
+    """
+    Test suite for the cached settings store and the settings endpoints.
+    """
+
+    def setUp(self):
+        cache.clear()
+        site_settings.invalidate()
+        self.admin_user = Admin.objects.create_superuser(name='settingsadmin', password='testpassword')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + Token.objects.create(user=self.admin_user).key)
+        self.url = reverse('admin-settings')
+
+    def test_single_and_bulk_put(self):
+        """
+        Test that one PUT sets one key or many, with a single upsert for many.
+        """
+        response = self.client.put(self.url, {'key': 'whatsapp_phone', 'value': '+20100'}, format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(self.url, {'settings': {
+                'whatsapp_phone': '+20111', 'store_name': 'Top Notes', 'banner_text': 'Sale',
+            }}, format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len([query for query in queries.captured_queries if '"settings"' in query['sql']]), 1)
+        self.assertEqual(
+            self.client.get(self.url, secure=True).json(),
+            {'whatsapp_phone': '+20111', 'store_name': 'Top Notes', 'banner_text': 'Sale'},
+        )
+
+        for bad in ({'settings': {}}, {'settings': ['whatsapp_phone']}, {'settings': {'': 'x'}}, {'key': 'whatsapp_phone'}):
+            response = self.client.put(self.url, bad, format='json', secure=True)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, bad)
+
+    @within_check_interval
+    def test_reads_are_cached_until_a_write(self):
+        """
+        Test that reads after the first need no query, and a write is seen by the next read.
+        """
+        site_settings.update({'whatsapp_phone': '+20100'})
+        self.assertEqual(site_settings.get('whatsapp_phone'), '+20100')
+        with self.assertNumQueries(0):
+            self.assertEqual(site_settings.get('whatsapp_phone'), '+20100')
+            self.assertEqual(site_settings.get('missing', 'default'), 'default')
+        site_settings.update({'whatsapp_phone': '+20122'})
+        self.assertEqual(site_settings.get('whatsapp_phone'), '+20122')
+
+    @mock.patch.object(site_settings_module, 'SITE_SETTING_TYPES', {'max_cart_items': 'int', 'show_banner': 'bool', 'hours': 'json'})
+    def test_typed_values(self):
+        """
+        Test that typed settings are validated on write and decoded on read.
+        """
+        site_settings.update({'max_cart_items': 12, 'show_banner': False, 'hours': {'open': 10, 'close': 22}})
+        self.assertEqual(site_settings.get('max_cart_items'), 12)
+        self.assertIs(site_settings.get('show_banner'), False)
+        self.assertEqual(site_settings.get('hours'), {'open': 10, 'close': 22})
+        self.assertEqual(site_settings.as_text()['show_banner'], 'false')
+
+        response = self.client.put(self.url, {'settings': {'max_cart_items': 'many', 'show_banner': True}}, format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('max_cart_items', response.json()['detail'])
+        self.assertIs(site_settings.get('show_banner'), False)
+
+    def test_public_settings(self):
+        """
+        Test that anyone can read the whitelisted settings, and only those.
+        """
+        site_settings.update({'whatsapp_phone': '+20100', 'internal_note': 'secret'})
+        self.client.credentials()
+        self.assertEqual(self.client.get(self.url, secure=True).status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get(reverse('public-settings'), secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), {'whatsapp_phone': '+20100'})
+        self.assertIn('max-age', response['Cache-Control'])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoginThrottleTest(APITestCase):
+    """
+    Test suite for the shared login throttle and decoy password hashing.
+    """
+
+    def setUp(self):
+        cache.clear()
+        admin_views._decoy_password_hash.cache_clear()
+        self.addCleanup(admin_views._decoy_password_hash.cache_clear)
+        self.url = reverse('admin-login')
+        Admin.objects.create_superuser(name='loginadmin', password='testpassword')
+        for limiter, limit in ((throttling.login_ip_limiter, 3), (throttling.login_account_limiter, 5)):
+            patcher = mock.patch.object(limiter, 'limit', limit)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _login(self, password, name='loginadmin', ip='10.0.0.1'):
+        return self.client.post(self.url, {'name': name, 'password': password}, format='json', secure=True, REMOTE_ADDR=ip)
+
+    def test_rejects_before_lookup_and_hashing(self):
+        """
+        Test that attempts over the per-IP limit are refused without touching the database or hashing.
+        """
+        for _ in range(3):
+            self.assertEqual(self._login('wrong').status_code, status.HTTP_401_UNAUTHORIZED)
+        with mock.patch.object(admin_views, 'check_password') as check_password, self.assertNumQueries(0):
+            response = self._login('testpassword')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], str(throttling.login_ip_limiter.window))
+        check_password.assert_not_called()
+        # Another address is still let through
+        self.assertEqual(self._login('testpassword', ip='10.0.0.2').status_code, status.HTTP_200_OK)
+
+    def test_account_limit_spans_addresses(self):
+        """
+        Test that guesses at one account are limited however many addresses they come from.
+        """
+        for number in range(5):
+            self.assertEqual(self._login('wrong', ip=f'10.0.1.{number}').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self._login('testpassword', ip='10.0.1.99').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_success_clears_the_counters(self):
+        """
+        Test that logging in forgets the address's and the account's earlier failures.
+        """
+        for _ in range(2):
+            self._login('wrong')
+        self.assertEqual(self._login('testpassword').status_code, status.HTTP_200_OK)
+        for _ in range(3):
+            self.assertEqual(self._login('wrong').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_unknown_names_are_hashed_too(self):
+        """
+        Test that a login for an unknown name checks the password against a decoy hash.
+        """
+        with mock.patch.object(admin_views, 'check_password', wraps=admin_views.check_password) as check_password:
+            self.assertEqual(self._login('guess', name='nobody').status_code, status.HTTP_401_UNAUTHORIZED)
+        check_password.assert_called_once_with('guess', admin_views._decoy_password_hash())
+
+    def test_sliding_window_is_atomic(self):
+        """
+        Test that concurrent hits never exceed the limit, and that the previous window counts in proportion.
+        """
+        limiter = throttling.SlidingWindowLimiter('test', 5, 60)
+        now = 6000.0  # the start of a window
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            admitted = list(pool.map(lambda _: limiter.hit('client', now), range(20)))
+        self.assertEqual(admitted.count(True), 5)
+
+        # 20 hits in the previous window, three quarters of which still overlap the sliding window
+        self.assertFalse(limiter.hit('client', now + 45))
+        # Two windows later, nothing is left
+        self.assertTrue(limiter.hit('client', now + 120))
+
+    def test_refused_attempts_are_not_counted(self):
+        """
+        Test that retrying while over the limit does not extend the lockout, nor use up another limit.
+        """
+        limiter = throttling.SlidingWindowLimiter('test', 5, 60)
+        now = 6000.0
+        admitted = [limiter.hit('client', now + second) for second in range(50)]
+        self.assertEqual(admitted.count(True), 5)
+        # The 45 refused retries left the next window as it would be after 5 attempts
+        self.assertTrue(limiter.hit('client', now + 60 + 15))
+
+        for number in range(5):
+            self._login('wrong', ip=f'10.0.2.{number}')
+        for _ in range(3):
+            self.assertEqual(self._login('wrong', ip='10.0.2.99').status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        # Refused by the account limit, so they did not count against the address either
+        self.assertEqual(self._login('guess', name='nobody', ip='10.0.2.99').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_no_global_budget_by_default(self):
+        """
+        Test that many wrong logins from many addresses do not lock out the admin.
+        """
+        self.assertIsNone(throttling.login_global_limiter)
+        for number in range(40):
+            self._login('wrong', name=f'stuffed-{number}', ip=f'10.0.3.{number}')
+        self.assertEqual(self._login('testpassword', ip='10.0.3.200').status_code, status.HTTP_200_OK)
@@ -0,0 +1,137 @@
+"""
+Login throttling shared by every worker.
+
+Each `SlidingWindowLimiter` admits at most `limit` attempts per `window`
+seconds for one identity (a client IP or an account name). It keeps one
+counter per fixed window in the cache and estimates the sliding count as
+the current window's counter plus the previous window's, weighted by how
+much of it still overlaps the sliding window. Attempts are counted with
+`cache.incr` *before* the attempt is let through, so concurrent requests
+cannot all slip past the check, and a rejected attempt costs a few cache
+round trips and nothing else. Rejected attempts are not counted: a client
+that keeps retrying gets `limit` attempts per window, not a lockout that
+lasts as long as it keeps trying.
+
+The limits are only as shared as the cache. With REDIS_URL set the
+counters live in Redis and the limits apply to all workers together; with
+the default per-process LocMemCache every worker counts on its own, so a
+client gets the limit once per worker. Production deployments should set
+REDIS_URL; `manage.py check --deploy` warns when they do not.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+class SlidingWindowLimiter:
+    """At most `limit` hits per identity in any `window` seconds (approximately)."""
+
+    def __init__(self, name, limit, window):
+        self.name = name
+        self.limit = limit
+        self.window = window
+
+    def _key(self, identity, index):
+        digest = hashlib.sha256(str(identity).encode('utf-8')).hexdigest()[:32]
+        return f"throttle_{self.name}_{digest}_{index}"
+
+    def hit(self, identity, now=None):
+        """Count one attempt by `identity` if it is within the limit; returns whether it is."""
+        now = time.time() if now is None else now
+        index, offset = divmod(now, self.window)
+        current_key = self._key(identity, int(index))
+        previous_key = self._key(identity, int(index) - 1)
+        counts = cache.get_many([current_key, previous_key])
+        overlap = counts.get(previous_key, 0) * (1 - offset / self.window)
+        if overlap + counts.get(current_key, 0) >= self.limit:
+            return False
+        try:
+            count = cache.incr(current_key)
+        except ValueError:
+            # First hit in this window. Kept for two windows: it is the previous one next.
+            if cache.add(current_key, 1, self.window * 2):
+                count = 1
+            else:
+                count = cache.incr(current_key)
+        if overlap + count <= self.limit:
+            return True
+        # A concurrent attempt took the last slot; this one is not counted either
+        self._uncount(current_key)
+        return False
+
+    def _uncount(self, key):
+        try:
+            cache.decr(key)
+        except ValueError:
+            # The window's counter expired meanwhile
+            pass
+
+    def unhit(self, identity, now=None):
+        """Take back an attempt `hit()` counted, e.g. one another limit then refused."""
+        now = time.time() if now is None else now
+        self._uncount(self._key(identity, int(now // self.window)))
+
+    def reset(self, identity, now=None):
+        """Forget `identity`'s attempts, e.g. after it logged in."""
+        now = time.time() if now is None else now
+        index = int(now // self.window)
+        cache.delete_many([self._key(identity, index), self._key(identity, index - 1)])
+
+
+# (attempts, seconds) per client IP and per account name
+LOGIN_RATE_PER_IP = getattr(settings, 'LOGIN_RATE_PER_IP', (5, 15 * 60))
+LOGIN_RATE_PER_ACCOUNT = getattr(settings, 'LOGIN_RATE_PER_ACCOUNT', (10, 15 * 60))
+
+# Optional (attempts, seconds) for all login attempts together, which bounds the CPU
+# spent hashing passwords when attempts come from many addresses and try many names.
+# Off by default: once it is spent nobody, the admins included, can log in until
+# the window passes, so anyone can lock the admins out by spending it.
+LOGIN_RATE_GLOBAL = getattr(settings, 'LOGIN_RATE_GLOBAL', None)
+
+login_ip_limiter = SlidingWindowLimiter('login_ip', *LOGIN_RATE_PER_IP)
+login_account_limiter = SlidingWindowLimiter('login_account', *LOGIN_RATE_PER_ACCOUNT)
+login_global_limiter = SlidingWindowLimiter('login_global', *LOGIN_RATE_GLOBAL) if LOGIN_RATE_GLOBAL else None
+
+
+def admit_login(client_ip, name):
+    """
+    Count a login attempt against every limit. Returns None if the attempt
+    may go ahead, otherwise the number of seconds the client should wait
+    before retrying; a refused attempt is not counted against any limit.
+    """
+    admitted = []
+    for limiter, identity in (
+        (login_ip_limiter, client_ip),
+        (login_account_limiter, name),
+        (login_global_limiter, 'all'),
+    ):
+        if limiter is None:
+            continue
+        if not limiter.hit(identity):
+            for counted, counted_identity in admitted:
+                counted.unhit(counted_identity)
+            return limiter.window
+        admitted.append((limiter, identity))
+    return None
+
+
+def login_succeeded(client_ip, name):
+    login_ip_limiter.reset(client_ip)
+    login_account_limiter.reset(name)
+
+
+@checks.register(checks.Tags.security, deploy=True)
+def check_shared_login_throttle(app_configs, **kwargs):
+    """The login limits span workers only if the cache does."""
+    if isinstance(caches['default'], LocMemCache):
+        return [checks.Warning(
+            "The default cache is a per-process LocMemCache, so every worker counts login attempts on its "
+            "own and the login limits are multiplied by the number of workers.",
+            hint="Set REDIS_URL so the login throttle is shared by all workers.",
+            id='admins.W001',
+        )]
+    return []
@@ -1,8 +1,10 @@
 from django.urls import path
-from .views import AdminLoginView, SettingsView, AdminPasswordUpdateView
+from .views import AdminLoginView, SettingsView, PublicSettingsView, AdminPasswordUpdateView, MetricsView
 
 urlpatterns = [
     path('admin/login/', AdminLoginView.as_view(), name='admin-login'),
     path('admin/settings/', SettingsView.as_view(), name='admin-settings'),
+    path('settings/', PublicSettingsView.as_view(), name='public-settings'),
     path('admin/update-password/', AdminPasswordUpdateView.as_view(), name='admin-update-password'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
@@ -1,10 +1,27 @@
+import functools
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
-from django.core.cache import cache
-from .models import Admin, Settings
+from django.contrib.auth.hashers import check_password, make_password
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.crypto import get_random_string
+from perfume_store_backend.instrumentation import registry
+from .models import Admin
+from .site_settings import SETTINGS_MAX_BULK, SettingValueError, site_settings
+from .throttling import admit_login, login_succeeded
+
+# max-age of the public settings response in browsers and the CDN
+PUBLIC_SETTINGS_MAX_AGE = getattr(settings, 'PUBLIC_SETTINGS_MAX_AGE', 60)
+
+@functools.cache
+def _decoy_password_hash():
+    """A hash of a random password with the current hasher, checked in place of unknown accounts' hashes."""
+    return make_password(get_random_string(32))
 
 # Custom Permission for Admin Users
 class IsAdminUser(permissions.BasePermission):
@@ -24,23 +41,20 @@ class AdminLoginView(APIView):
         if not password:
             return Response({"detail": "Password is required."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Rate limiting
+        # Rate limiting, before the account lookup and the (deliberately slow) password hash
         client_ip = self.get_client_ip(request)
-        cache_key = f"admin_login_attempts_{client_ip}"
-        attempts = cache.get(cache_key, 0)
-        
-        if attempts >= 5:
-            return Response({"detail": "Too many login attempts. Please try again in 15 minutes."}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        retry_after = admit_login(client_ip, name)
+        if retry_after is not None:
+            response = Response({"detail": "Too many login attempts. Please try again later."}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+            response['Retry-After'] = str(retry_after)
+            return response
 
-        try:
-            user = Admin.objects.get(name=name)
-            if not user.check_password(password):
-                raise Admin.DoesNotExist
-        except Admin.DoesNotExist:
-            user = None
-
-        if user is not None:
-            cache.delete(cache_key)
+        user = Admin.objects.filter(name=name).first()
+        if user is None:
+            # Hash anyway, so unknown names cost (and take) as long as wrong passwords
+            check_password(password, _decoy_password_hash())
+        elif user.check_password(password):
+            login_succeeded(client_ip, name)
             token, created = Token.objects.get_or_create(user=user)
             return Response({
                 "message": "Login successful",
@@ -49,9 +63,7 @@ class AdminLoginView(APIView):
                     "name": user.name
                 }
             }, status=status.HTTP_200_OK)
-        else:
-            cache.set(cache_key, attempts + 1, 900) # 15 minutes
-            return Response({"detail": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
+        return Response({"detail": "Invalid credentials"}, status=status.HTTP_401_UNAUTHORIZED)
 
     def get_client_ip(self, request):
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -65,27 +77,43 @@ class SettingsView(APIView):
     permission_classes = [IsAdminUser] # Protect this view
 
     def get(self, request, *args, **kwargs):
-        settings = Settings.objects.all()
-        settings_data = {setting.key: setting.value for setting in settings}
-        return Response(settings_data, status=status.HTTP_200_OK)
+        return Response(site_settings.as_text(), status=status.HTTP_200_OK)
 
     def put(self, request, *args, **kwargs):
-        key = request.data.get('key')
-        value = request.data.get('value')
-        
-        if not key or value is None:
-            return Response({"detail": "Key and value are required."}, status=status.HTTP_400_BAD_REQUEST)
-        
-        setting, created = Settings.objects.get_or_create(
-            key=key,
-            defaults={'value': value, 'description': f'Setting for {key}'}
-        )
-        
-        if not created:
-            setting.value = value
-            setting.save()
-        
-        return Response({"message": "Setting updated successfully"}, status=status.HTTP_200_OK)
+        """
+        Set one setting ({"key": ..., "value": ...}) or several at once
+        ({"settings": {key: value, ...}}), in one upsert.
+        """
+        if 'settings' in request.data:
+            values = request.data['settings']
+            if not isinstance(values, dict) or not values:
+                return Response({"detail": "settings must be a non-empty object of key/value pairs."}, status=status.HTTP_400_BAD_REQUEST)
+            if len(values) > SETTINGS_MAX_BULK:
+                return Response({"detail": f"At most {SETTINGS_MAX_BULK} settings can be updated at once."}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            key = request.data.get('key')
+            value = request.data.get('value')
+            if not key or value is None:
+                return Response({"detail": "Key and value are required."}, status=status.HTTP_400_BAD_REQUEST)
+            values = {key: value}
+
+        try:
+            site_settings.update(values)
+        except SettingValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        message = "Setting updated successfully" if len(values) == 1 else f"{len(values)} settings updated successfully"
+        return Response({"message": message}, status=status.HTTP_200_OK)
+
+class PublicSettingsView(APIView):
+    """The whitelisted settings the storefront needs (PUBLIC_SITE_SETTINGS), with their types."""
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def get(self, request, *args, **kwargs):
+        response = Response(site_settings.public(), status=status.HTTP_200_OK)
+        patch_cache_control(response, public=True, max_age=PUBLIC_SETTINGS_MAX_AGE)
+        return response
 
 class AdminPasswordUpdateView(APIView):
     permission_classes = [IsAdminUser] # Protect this view
@@ -104,3 +132,10 @@ class AdminPasswordUpdateView(APIView):
         Token.objects.filter(user=user).delete()
         
         return Response({"message": "Password updated successfully"}, status=status.HTTP_200_OK)
+
+class MetricsView(APIView):
+    """Per-view request metrics in the Prometheus text format, for the scraper."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(registry.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,125 @@
+"""
+Response compression negotiated by Accept-Encoding.
+
+`CompressionMiddleware` compresses text and JSON responses of at least
+`COMPRESSION_MIN_SIZE` bytes with brotli (when the `brotli` package is
+installed) or gzip, whichever the client's Accept-Encoding prefers. Smaller
+bodies are sent as they are: below a packet or two, compressing costs more
+CPU than it saves on the wire. Streaming responses are left alone; the
+catalog export compresses its own stream.
+
+Cached catalog responses are compressed once per cache entry by
+`cache_catalog_response` (perfumes/response_cache.py), at a higher level
+than the middleware can afford per request, and arrive here with a
+Content-Encoding already set. The middleware does not touch those.
+"""
+import gzip
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from .instrumentation import timed
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is in requirements.txt
+    brotli = None
+
+# Bodies smaller than this (bytes) are never compressed
+COMPRESSION_MIN_SIZE = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+
+# Offered in this order of preference when the client rates them equally
+SUPPORTED_ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+# Levels for compressing on every request, and for bodies compressed once and cached
+RESPONSE_LEVELS = {'br': 4, 'gzip': 6}
+CACHED_LEVELS = {'br': 9, 'gzip': 9}
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/javascript', 'text/')
+
+
+def negotiate_encoding(request):
+    """The supported content coding the client ranks highest, or None for identity."""
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if not header:
+        return None
+    qualities = {}
+    for item in header.split(','):
+        coding, _, params = item.partition(';')
+        quality = 1.0
+        name, _, value = params.partition('=')
+        if name.strip().lower() == 'q':
+            try:
+                quality = float(value)
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def should_compress(content_type, size):
+    """Whether a body of `size` bytes and `content_type` is worth compressing."""
+    return size >= COMPRESSION_MIN_SIZE and content_type is not None and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(body, encoding, level=None):
+    """Compress `body` (bytes) with `encoding`, at `level` or the per-request default."""
+    level = RESPONSE_LEVELS[encoding] if level is None else level
+    with timed('compress'):
+        if encoding == 'br':
+            return brotli.compress(body, quality=level)
+        # mtime=0 keeps the output (and so the cached bytes) deterministic
+        return gzip.compress(body, compresslevel=level, mtime=0)
+
+
+class CompressionMiddleware:
+    """
+    Compress responses per Accept-Encoding. Place it right after
+    RequestMetricsMiddleware, above anything that reads or writes the body.
+    Works in both sync and async stacks.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self._compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self._compress(request, await self.get_response(request))
+
+    def _compress(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if not should_compress(response.get('Content-Type'), len(response.content)):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request)
+        if encoding is None:
+            return response
+
+        body = compress(response.content, encoding)
+        if len(body) >= len(response.content):
+            return response
+        response.content = body
+        response['Content-Encoding'] = encoding
+        response['Content-Length'] = str(len(body))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            # The body is no longer byte-identical to what the tag was computed for
+            response['ETag'] = 'W/' + etag
+        return response
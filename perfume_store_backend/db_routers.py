@@ -0,0 +1,129 @@
+"""
+Read-replica routing.
+
+With a `replica` alias in DATABASES (settings: DATABASE_REPLICA_HOST),
+`PrimaryReplicaRouter` sends ORM reads to the replica and writes and
+migrations to the primary. Without one, everything stays on `default`, and
+neither the router nor the middleware does any work.
+
+Reads go to the primary instead:
+
+- in unsafe requests (POST, PUT, PATCH, DELETE), so the admin views read
+  and lock the rows they are about to change on the database they change;
+- in every request for REPLICA_STICKY_SECONDS after an authenticated write,
+  so the admin reads back their own changes. This is global rather than per
+  admin because a write also bumps the catalog generation: a public read
+  served from a replica that has not caught up would be cached, and built
+  into the facet and search indexes, under the new generation;
+- inside `use_primary()`, which the catalog snapshot writer uses.
+
+REPLICA_STICKY_SECONDS should cover the replica's usual lag.
+"""
+import contextvars
+from contextlib import contextmanager, nullcontext
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA_DB_ALIAS = 'replica' if 'replica' in settings.DATABASES else None
+
+# Seconds reads stay on the primary after a write
+REPLICA_STICKY_SECONDS = getattr(settings, 'REPLICA_STICKY_SECONDS', 5)
+
+RECENT_WRITE_KEY = 'db_recent_write'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_use_primary = contextvars.ContextVar('use_primary', default=False)
+
+
+@contextmanager
+def use_primary():
+    """Route this thread's (or task's) reads to the primary inside the block."""
+    token = _use_primary.set(True)
+    try:
+        yield
+    finally:
+        _use_primary.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """Reads from the replica unless pinned to the primary; writes and migrations on the primary."""
+
+    def db_for_read(self, model, **hints):
+        if REPLICA_DB_ALIAS is None or _use_primary.get():
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Pin requests to the primary as described above, and start the sticky
+    window after authenticated writes. Place it above any middleware that
+    queries the database. Works in both sync and async stacks.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if REPLICA_DB_ALIAS is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        pinned = request.method not in SAFE_METHODS or bool(cache.get(RECENT_WRITE_KEY))
+        with self._pinned(pinned):
+            response = self.get_response(request)
+        if self._wrote(request, response):
+            cache.set(RECENT_WRITE_KEY, True, REPLICA_STICKY_SECONDS)
+        return self._finish(response, pinned)
+
+    async def __acall__(self, request):
+        pinned = request.method not in SAFE_METHODS or bool(await cache.aget(RECENT_WRITE_KEY))
+        with self._pinned(pinned):
+            response = await self.get_response(request)
+        if self._wrote(request, response):
+            await cache.aset(RECENT_WRITE_KEY, True, REPLICA_STICKY_SECONDS)
+        return self._finish(response, pinned)
+
+    @staticmethod
+    def _pinned(pinned):
+        return use_primary() if pinned else nullcontext()
+
+    @staticmethod
+    def _wrote(request, response):
+        return (
+            request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and 'HTTP_AUTHORIZATION' in request.META
+        )
+
+    @staticmethod
+    def _finish(response, pinned):
+        if pinned and response.streaming and not response.is_async:
+            # Streamed bodies (the catalog export) query as they are sent, after the view returns
+            response.streaming_content = _primary_stream(response.streaming_content)
+        return response
+
+
+def _primary_stream(content):
+    with use_primary():
+        yield from content
@@ -0,0 +1,307 @@
+"""
+Request-level performance instrumentation.
+
+`RequestMetricsMiddleware` measures every request: wall time, the number
+and duration of SQL queries (through `connection.execute_wrapper`), and
+time spent in serializers, renderers and compression (code marks those
+phases with `timed('serialize')` / `timed('render')` / `timed('compress')`;
+`TimedJSONRenderer` does the rendering one for DRF), plus the response
+size as sent. The figures are sent back in a `Server-Timing` header, so
+the browser's network panel shows where the time went:
+
+    Server-Timing: db;dur=12.4;desc="3 queries", serialize;dur=2.1, render;dur=0.6,
+                   compress;dur=0.3, size;desc="1711 bytes", total;dur=17.9
+
+They are also aggregated per URL name (`perfume-list`, `perfume-detail`,
+...) into histograms, which `render_prometheus()` exposes in the Prometheus
+text format. The registry lives in the process, so with several workers
+each one reports its own numbers.
+
+Requests slower than `SLOW_REQUEST_THRESHOLD_MS` are logged on the
+`perfume_store_backend.slow_requests` logger with their slowest SQL.
+"""
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework.renderers import JSONRenderer
+
+# Requests slower than this (milliseconds) are logged with their slowest SQL
+SLOW_REQUEST_THRESHOLD_MS = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', 500)
+
+# How many of a slow request's queries are logged, slowest first
+SLOW_REQUEST_LOG_QUERIES = getattr(settings, 'SLOW_REQUEST_LOG_QUERIES', 5)
+
+# Logged SQL is cut to this many characters (bulk statements run to kilobytes)
+SLOW_REQUEST_SQL_CHARS = 300
+
+# Send the Server-Timing header (the metrics are collected either way)
+SERVER_TIMING_HEADER = getattr(settings, 'SERVER_TIMING_HEADER', True)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+slow_request_logger = logging.getLogger('perfume_store_backend.slow_requests')
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """What one request spent its time on."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}      # phase name -> seconds
+        self.queries = []     # (seconds, sql)
+
+    @property
+    def db_time(self):
+        return sum(duration for duration, sql in self.queries)
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+
+def _record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries.append((time.perf_counter() - start, sql))
+
+
+def install_query_recorder(connection, **kwargs):
+    """
+    Time `connection`'s queries for whichever request is current.
+
+    Installed once per connection (on `connection_created`), not per
+    request. Connections are per thread and the async ORM runs queries on
+    threads of its own, so a wrapper added by the middleware would miss
+    them. The request is found through a context variable instead, which
+    follows it into those threads.
+    """
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(install_query_recorder)
+
+
+@contextmanager
+def timed(phase):
+    """Attribute the enclosed time to `phase` of the current request, if one is being measured."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(phase, time.perf_counter() - start)
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """DRF's JSONRenderer, with its time reported as the `render` phase."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus expects, keyed by a label tuple."""
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self._series = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self):
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                yield f"{self.name}_bucket", labels + (('le', _format_number(bound)),), cumulative
+            yield f"{self.name}_sum", labels, series[-1]
+            yield f"{self.name}_count", labels, cumulative
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self._series = {}
+
+    def inc(self, labels, amount=1):
+        self._series[labels] = self._series.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self._series.items()):
+            yield self.name, labels, value
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # Every series is labelled with the URL name as `view`
+        self.requests = Counter('perfume_http_requests_total', "Requests handled, by view, method and status.")
+        self.duration = Histogram('perfume_http_request_duration_seconds', "Wall time per request.", DURATION_BUCKETS)
+        self.db_duration = Histogram('perfume_db_duration_seconds', "Time in SQL per request.", DURATION_BUCKETS)
+        self.db_queries = Counter('perfume_db_queries_total', "SQL queries executed.")
+        self.serialize_duration = Histogram(
+            'perfume_serialize_duration_seconds', "Time in serializers per request.", DURATION_BUCKETS)
+        self.render_duration = Histogram(
+            'perfume_render_duration_seconds', "Time in response renderers per request.", DURATION_BUCKETS)
+        self.response_size = Histogram('perfume_http_response_size_bytes', "Response body size.", SIZE_BUCKETS)
+        self.slow_requests = Counter('perfume_slow_requests_total', "Requests over the slow-request threshold.")
+        self.metrics = (
+            self.requests, self.duration, self.db_duration, self.db_queries, self.serialize_duration,
+            self.render_duration, self.response_size, self.slow_requests,
+        )
+
+    def reset(self):
+        with self._lock:
+            self._reset()
+
+    def observe(self, view, method, status_code, total, metrics, size, slow):
+        labels = (('view', view),)
+        with self._lock:
+            self.requests.inc(labels + (('method', method), ('status', str(status_code))))
+            self.duration.observe(labels, total)
+            self.db_duration.observe(labels, metrics.db_time)
+            self.db_queries.inc(labels, len(metrics.queries))
+            self.serialize_duration.observe(labels, metrics.phases.get('serialize', 0.0))
+            self.render_duration.observe(labels, metrics.phases.get('render', 0.0))
+            if size is not None:
+                self.response_size.observe(labels, size)
+            if slow:
+                self.slow_requests.inc(labels)
+
+    def render_prometheus(self):
+        """The registry in the Prometheus text exposition format (0.0.4)."""
+        lines = []
+        with self._lock:
+            for metric in self.metrics:
+                kind = 'histogram' if isinstance(metric, Histogram) else 'counter'
+                lines.append(f"# HELP {metric.name} {metric.help_text}")
+                lines.append(f"# TYPE {metric.name} {kind}")
+                for name, labels, value in metric.samples():
+                    label_text = ','.join(f'{key}="{_escape(value_)}"' for key, value_ in labels)
+                    lines.append(f"{name}{{{label_text}}} {_format_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_number(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+registry = MetricsRegistry()
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.url_name or match.view_name or 'unnamed'
+
+
+def _server_timing(metrics, total, size):
+    entries = [f'db;dur={metrics.db_time * 1000:.1f};desc="{len(metrics.queries)} queries"']
+    for phase in ('serialize', 'render', 'compress'):
+        if phase in metrics.phases:
+            entries.append(f"{phase};dur={metrics.phases[phase] * 1000:.1f}")
+    if size is not None:
+        entries.append(f'size;desc="{size} bytes"')
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ', '.join(entries)
+
+
+def _log_slow_request(request, view, status_code, total, metrics):
+    slowest = sorted(metrics.queries, key=lambda query: query[0], reverse=True)[:SLOW_REQUEST_LOG_QUERIES]
+    lines = [
+        f"Slow request: {request.method} {request.get_full_path()} ({view}) -> {status_code} "
+        f"in {total * 1000:.0f} ms; {len(metrics.queries)} queries took {metrics.db_time * 1000:.0f} ms"
+    ]
+    for duration, sql in slowest:
+        if len(sql) > SLOW_REQUEST_SQL_CHARS:
+            sql = sql[:SLOW_REQUEST_SQL_CHARS] + '...'
+        lines.append(f"  {duration * 1000:8.1f} ms  {sql}")
+    slow_request_logger.warning('\n'.join(lines))
+
+
+class RequestMetricsMiddleware:
+    """
+    Measure each request, add a Server-Timing header and feed the metrics
+    registry. Should be first in MIDDLEWARE so it sees the whole request.
+    Works in both sync and async stacks.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, metrics)
+
+    def _finish(self, request, response, metrics):
+        total = time.perf_counter() - metrics.started
+        view = _view_name(request)
+        size = None if response.streaming else len(response.content)
+        slow = total * 1000 >= SLOW_REQUEST_THRESHOLD_MS
+        registry.observe(view, request.method, response.status_code, total, metrics, size, slow)
+        if slow:
+            _log_slow_request(request, view, response.status_code, total, metrics)
+        if SERVER_TIMING_HEADER:
+            response['Server-Timing'] = _server_timing(metrics, total, size)
+        return response
@@ -0,0 +1,993 @@
+"""
+Per-endpoint micro-benchmarks over synthetic bilingual catalogs.
+
+`run_benchmarks()` creates a throwaway test database on the configured
+engine (SQLite or PostgreSQL), grows a synthetic catalog through each
+requested size and, at every size, sends each scenario through the full
+request stack with Django's test client. Per scenario it records:
+
+- latency: mean/p50/p95 in milliseconds over `iterations` timed runs,
+  after one untimed warm-up run
+- queries: the number of SQL queries in one run
+- response_bytes: the size of the response body
+- allocations: peak and net traced Python memory in KiB during one run
+  (tracemalloc)
+
+Public catalog responses are cached per generation, so cached responses
+are dropped before every run to measure the view itself. The generation is
+kept, so the in-process facet and search indexes stay warm. The only
+exception is `list/cached`, which measures the cache hit. Runs use a
+private in-memory cache, so a shared Redis is never touched.
+
+Results are plain JSON. `compare_results()` checks them against a stored
+baseline and reports latency, query-count and allocation regressions.
+
+    python manage.py benchmark_perfumes --sizes 1000,10000 --output bench.json
+    python manage.py benchmark_perfumes --baseline bench.json
+
+`run_server_benchmark()` answers a different question: how many requests
+per second one worker serves when many clients are connected at once. It
+drives the public list and detail endpoints through a threaded WSGI
+worker (like gunicorn's gthread) and through the ASGI application on the
+async views (like a uvicorn worker). Each run adds a simulated database
+round trip to every query and a delay while each response is delivered
+to a slow client.
+
+    python manage.py benchmark_perfumes --servers --concurrency 200 --threads 8
+
+`run_connection_benchmark()` measures what opening database connections
+costs each request: one worker serves requests back to back with a new
+connection per request (CONN_MAX_AGE=0), a persistent one with health
+checks, and, on PostgreSQL with psycopg 3, a connection pool. Run it
+against the real database server; SQLite shows no difference.
+
+    python manage.py benchmark_perfumes --connections --requests 500
+
+`run_login_attack_benchmark()` sends a credential-stuffing burst (wrong
+passwords, a new name and address each time) at the login endpoint with
+the login throttle off and on, and reports the CPU time it costs.
+
+    python manage.py benchmark_perfumes --login-attack --requests 200
+
+`run_serializer_benchmark()` compares the per-row cost of serializing
+public list rows with the DRF serializer and with the compiled projection
+(`public_perfume_projection`), at a few page sizes.
+
+    python manage.py benchmark_perfumes --serializers
+"""
+import asyncio
+import collections
+import fnmatch
+import gc
+import importlib.util
+import io
+import itertools
+import json
+import platform
+import random
+import statistics
+import sys
+import threading
+import time
+import types
+import tracemalloc
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone as dt_timezone
+from urllib.parse import urlencode
+
+import django
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import Client, override_settings
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import include, path, reverse
+from rest_framework.authtoken.models import Token
+
+from perfume_store_backend import instrumentation
+from perfume_store_backend.admins import throttling
+from perfume_store_backend.admins.models import Admin
+from . import changes, images, snapshot
+from .facets import facet_index
+from .models import Perfume
+from .search import search_index
+from .serializers import PublicPerfumeSerializer, public_perfume_projection
+from .synthetic import BRANDS, CATEGORIES, GENDERS, build_perfume, seed_catalog
+from .urls import perfume_urlpatterns
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_ITERATIONS = 20
+
+# A scenario regresses when it is this much slower (or allocates this much
+# more) than the baseline...
+DEFAULT_TOLERANCE = 0.25
+# ...and the difference is above the noise floor.
+LATENCY_NOISE_MS = 0.5
+ALLOCATION_NOISE_KIB = 64
+
+# Perfumes per bulk admin request
+BULK_BATCH = 50
+
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'perfume-benchmarks',
+    }
+}
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+class Scenario:
+    """
+    One request to measure. `send(client, state)` issues it and returns the
+    response; `prepare()`, if given, runs untimed before every run and its
+    return value is passed to `send` as `state`.
+    """
+
+    def __init__(self, name, send, prepare=None, admin=False, clear_cache=True, max_iterations=None):
+        self.name = name
+        self.send = send
+        self.prepare = prepare
+        self.admin = admin
+        self.clear_cache = clear_cache
+        self.max_iterations = max_iterations
+
+
+def _consume(response):
+    """Read the whole body, so streamed responses are measured end to end; returns its size."""
+    if response.streaming:
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def _payload(perfume):
+    """Admin API request body for an unsaved perfume."""
+    data = {field: getattr(perfume, field) for field in (
+        'nameEn', 'nameAr', 'brandEn', 'brandAr', 'categoryEn', 'categoryAr', 'genderEn', 'genderAr',
+        'descriptionEn', 'descriptionAr', 'sizes', 'imageUrl', 'isNew', 'isBestseller', 'isActive',
+    )}
+    data['stockStatus'] = perfume.get_stockStatus_display()
+    return data
+
+
+def build_scenarios(size):
+    """Every scenario for a catalog of `size` perfumes, in run order."""
+    rng, numbers = random.Random(size), itertools.count(10_000_000)
+
+    def new_perfume():
+        return build_perfume(rng, next(numbers))
+
+    perfume_list = reverse('perfume-list')
+    admin_list = reverse('admin-perfume-list')
+    active_ids = [
+        str(pk) for pk in
+        Perfume.objects.filter(isActive=True).order_by('-created_at').values_list('id', flat=True)[:BULK_BATCH * 2]
+    ]
+    if not active_ids:
+        raise BenchmarkError("The catalog has no active perfumes.")
+    sample_id = active_ids[len(active_ids) // 2]
+    last_page = max(1, (Perfume.objects.filter(isActive=True).count() + 11) // 12)
+
+    def get(url, params=None, **headers):
+        return lambda client, state: client.get(url, params or {}, secure=True, **headers)
+
+    def send_json(method, url, data):
+        def send(client, state):
+            body = data() if callable(data) else data
+            return getattr(client, method)(url, body, content_type='application/json', secure=True)
+        return send
+
+    scenarios = []
+
+    # --- PerfumeListView: every filter combination in both languages ---
+    for language, column in (('en', 0), ('ar', 1)):
+        filters = {
+            'brandFilter': BRANDS[0][column],
+            'categoryFilter': CATEGORIES[0][column],
+            'genderFilter': GENDERS[0][column],
+            'stockStatusFilter': 'in_stock',
+        }
+        for count in range(len(filters) + 1):
+            for names in itertools.combinations(filters, count):
+                label = '+'.join(name.replace('Filter', '') for name in names) or 'all'
+                params = {'language': language, **{name: filters[name] for name in names}}
+                scenarios.append(Scenario(f"list/{language}/{label}", get(perfume_list, params)))
+    for sort in ('price_asc', 'price_desc', 'name'):
+        scenarios.append(Scenario(f"list/sort={sort}", get(perfume_list, {'sort': sort})))
+    scenarios.append(Scenario("list/price-range", get(perfume_list, {'minPrice': 500, 'maxPrice': 2000})))
+    scenarios.append(Scenario("list/grid-fields", get(perfume_list, {
+        'language': 'ar', 'languageOnly': 'true', 'limit': 24,
+        'fields': 'name,brand,category,sizes,stockStatus,imageUrl,isNew,isBestseller',
+    })))
+    scenarios.append(Scenario("list/grid-full", get(perfume_list, {'language': 'ar', 'limit': 24})))
+    scenarios.append(Scenario("list/search", get(perfume_list, {'searchTerm': 'vanilla'})))
+    scenarios.append(Scenario("list/search-typo", get(perfume_list, {'searchTerm': 'vanila'})))
+
+    # --- deep pages ---
+    scenarios.append(Scenario("list/page-middle", get(perfume_list, {'page': max(1, last_page // 2)})))
+    scenarios.append(Scenario("list/page-last", get(perfume_list, {'page': last_page})))
+
+    def deep_cursor():
+        cursor, client = '', Client()
+        for _ in range(20):
+            cursor = client.get(perfume_list, {'cursor': cursor}, secure=True).json()['pagination']['nextCursor'] or ''
+        return cursor
+
+    scenarios.append(Scenario("list/cursor-first", get(perfume_list, {'cursor': ''})))
+    scenarios.append(Scenario(
+        "list/cursor-page-21",
+        lambda client, cursor: client.get(perfume_list, {'cursor': cursor}, secure=True),
+        prepare=_cached_once(deep_cursor),
+    ))
+    scenarios.append(Scenario("list/cached", get(perfume_list), clear_cache=False))
+    # Compressed once when cached, then served as stored; response_bytes is the wire size
+    scenarios.append(Scenario("list/grid-full/gzip", get(perfume_list, {'language': 'ar', 'limit': 24},
+                                                          HTTP_ACCEPT_ENCODING='gzip')))
+    scenarios.append(Scenario("list/cached/gzip", get(perfume_list, HTTP_ACCEPT_ENCODING='gzip'), clear_cache=False))
+
+    # --- PerfumeDetailView, PerfumeBatchView, BrandListView, CategoryListView ---
+    scenarios.append(Scenario("detail", get(reverse('perfume-detail', args=[sample_id]))))
+    scenarios.append(Scenario("detail/missing", get(reverse('perfume-detail', args=[str(uuid.UUID(int=0))]))))
+    scenarios.append(Scenario("batch/20", get(reverse('perfume-batch'), {'ids': ','.join(active_ids[:20])})))
+    for language in ('en', 'ar'):
+        scenarios.append(Scenario(f"brands/{language}", get(reverse('brand-list'), {'language': language})))
+        scenarios.append(Scenario(f"categories/{language}", get(reverse('category-list'), {'language': language})))
+    scenarios.append(Scenario("brands/en/in-category", get(reverse('brand-list'), {'categoryFilter': CATEGORIES[0][0]})))
+
+    # --- CollectionListView: every homepage rail queried, and served from the cache ---
+    collection_list = reverse('collection-list')
+    grid = {'language': 'ar', 'fields': 'name,brand,category,sizes,stockStatus,imageUrl,isNew,isBestseller',
+            'languageOnly': 'true'}
+    scenarios.append(Scenario("collections", get(collection_list, grid)))
+    scenarios.append(Scenario("collections/cached", get(collection_list, grid), clear_cache=False))
+    scenarios.append(Scenario("list/isNew", get(perfume_list, {'isNew': 'true'})))
+
+    # --- PerfumeChangesView: a first sync batch, and a poll by a client that is up to date ---
+    perfume_changes = reverse('perfume-changes')
+
+    def caught_up_cursor():
+        # Without the lag, or the perfumes seeded moments ago would turn up in every poll
+        page, client = {'hasMore': True, 'nextCursor': ''}, Client()
+        lag, changes.CATALOG_CHANGES_LAG = changes.CATALOG_CHANGES_LAG, 0
+        try:
+            while page['hasMore']:
+                page = client.get(perfume_changes, {'since': page['nextCursor'], 'limit': 1000}, secure=True).json()
+        finally:
+            changes.CATALOG_CHANGES_LAG = lag
+        return page['nextCursor']
+
+    scenarios.append(Scenario("changes/first-batch", get(perfume_changes)))
+    scenarios.append(Scenario(
+        "changes/poll",
+        lambda client, cursor: client.get(perfume_changes, {'since': cursor}, secure=True),
+        prepare=_cached_once(caught_up_cursor),
+    ))
+
+    # --- PerfumeAdminViewSet ---
+    admin_detail = reverse('admin-perfume-detail', args=[sample_id])
+
+    def saved_perfume_id():
+        perfume = new_perfume()
+        perfume.save()
+        return str(perfume.id)
+
+    def saved_perfume_ids():
+        perfumes = [new_perfume() for _ in range(BULK_BATCH)]
+        return [str(perfume.id) for perfume in Perfume.objects.bulk_create(perfumes)]
+
+    scenarios += [
+        Scenario("admin/list", get(admin_list), admin=True),
+        Scenario("admin/list/page-last", get(admin_list, {'page': max(1, (size + 19) // 20)}), admin=True),
+        Scenario("admin/list/cursor", get(admin_list, {'cursor': ''}), admin=True),
+        Scenario("admin/retrieve", get(admin_detail), admin=True),
+        Scenario("admin/create", send_json('post', admin_list, lambda: _payload(new_perfume())), admin=True),
+        Scenario("admin/update", send_json('put', admin_detail, lambda: _payload(new_perfume())), admin=True),
+        Scenario("admin/partial_update", send_json('patch', admin_detail, lambda: {'isNew': rng.random() < 0.5}), admin=True),
+        Scenario(
+            "admin/destroy",
+            lambda client, perfume_id: client.delete(reverse('admin-perfume-detail', args=[perfume_id]), secure=True),
+            prepare=saved_perfume_id, admin=True,
+        ),
+        Scenario("admin/export/ndjson", get(reverse('admin-perfume-export')), admin=True, max_iterations=3),
+        Scenario("admin/export/csv", get(reverse('admin-perfume-export'), {'exportFormat': 'csv'}), admin=True, max_iterations=3),
+        Scenario(
+            "admin/bulk-create",
+            send_json('post', reverse('admin-perfume-bulk-create'), lambda: [_payload(new_perfume()) for _ in range(BULK_BATCH)]),
+            admin=True,
+        ),
+        Scenario(
+            "admin/bulk-update",
+            send_json('patch', reverse('admin-perfume-bulk-update'), lambda: [
+                {'id': perfume_id, 'isNew': rng.random() < 0.5} for perfume_id in active_ids[:BULK_BATCH]
+            ]),
+            admin=True,
+        ),
+        Scenario(
+            "admin/bulk-update/filter",
+            send_json('patch', reverse('admin-perfume-bulk-update'), lambda: {
+                'filter': {'brandEn': BRANDS[-1][0]}, 'values': {'isBestseller': rng.random() < 0.5},
+            }),
+            admin=True,
+        ),
+        Scenario(
+            "admin/bulk-activate",
+            send_json('post', reverse('admin-perfume-bulk-activate'), {'ids': active_ids[:BULK_BATCH], 'isActive': True}),
+            admin=True,
+        ),
+        Scenario(
+            "admin/bulk-delete",
+            lambda client, ids: client.post(reverse('admin-perfume-bulk-delete'), {'ids': ids},
+                                            content_type='application/json', secure=True),
+            prepare=saved_perfume_ids, admin=True,
+        ),
+    ]
+    return scenarios
+
+
+def _cached_once(factory):
+    """prepare() hook that computes its value on first use only."""
+    values = []
+
+    def prepare():
+        if not values:
+            values.append(factory())
+        return values[0]
+    return prepare
+
+
+def _clear_responses():
+    """Drop cached responses; the generation lives in the database, so in-process indexes stay built."""
+    cache.clear()
+
+
+def _run_once(scenario, client):
+    state = scenario.prepare() if scenario.prepare else None
+    if scenario.clear_cache:
+        _clear_responses()
+    start = time.perf_counter()
+    response = scenario.send(client, state)
+    size = _consume(response)
+    elapsed = time.perf_counter() - start
+    if response.status_code >= 400:
+        raise BenchmarkError(f"{scenario.name}: HTTP {response.status_code}")
+    return elapsed, size
+
+
+def measure(scenario, client, iterations):
+    """Latency, query count and allocations of one scenario."""
+    if scenario.max_iterations:
+        iterations = min(iterations, scenario.max_iterations)
+    _run_once(scenario, client)  # warm-up: connection, facet/search indexes, imports
+    timings = [_run_once(scenario, client)[0] * 1000 for _ in range(iterations)]
+
+    queries = []
+
+    def count_query(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count_query):
+        _, response_bytes = _run_once(scenario, client)
+
+    tracemalloc.start()
+    try:
+        _run_once(scenario, client)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'iterations': iterations,
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        'queries': len(queries),
+        'response_bytes': response_bytes,
+        'alloc_peak_kib': round(peak / 1024, 1),
+        'alloc_net_kib': round(current / 1024, 1),
+    }
+
+
+def _admin_client():
+    admin, _ = Admin.objects.get_or_create(name='benchmark-admin', defaults={'is_staff': True, 'is_superuser': True})
+    token, _ = Token.objects.get_or_create(user=admin)
+    return Client(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, iterations=DEFAULT_ITERATIONS, only=None, log=None):
+    """
+    Benchmark every scenario at every catalog size in a throwaway database.
+    `only` is an optional list of fnmatch patterns on scenario names.
+    """
+    log = log or (lambda message: None)
+    results = {
+        'meta': {
+            'created': datetime.now(dt_timezone.utc).isoformat(timespec='seconds'),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'iterations': iterations,
+        },
+        'results': {},
+    }
+    with _throwaway_database(BENCHMARK_CACHES):
+        results['meta']['database_version'] = '.'.join(map(str, connection.get_database_version()))
+        client, admin_client = Client(), _admin_client()
+        seeded = 0
+        for size in sorted(sizes):
+            log(f"Seeding {size} perfumes...")
+            seeded += _grow_catalog(size, seeded)
+            size_results = results['results'][str(size)] = {}
+            for scenario in build_scenarios(size):
+                if only and not any(fnmatch.fnmatch(scenario.name, pattern) for pattern in only):
+                    continue
+                try:
+                    size_results[scenario.name] = measure(scenario, admin_client if scenario.admin else client, iterations)
+                except Exception as e:
+                    size_results[scenario.name] = {'error': str(e)}
+                log(f"  {size:>7} {scenario.name:<32} {_summary(size_results[scenario.name])}")
+    return results
+
+
+@contextmanager
+def _throwaway_database(caches):
+    """
+    A fresh test database on the configured engine, with `caches` in place
+    of the real ones. Catalog snapshots and image variants are off: they
+    are made off the request path, and the real snapshot must not be
+    overwritten.
+    """
+    old_name = connection.settings_dict['NAME']
+    snapshot_path = snapshot.CATALOG_SNAPSHOT_PATH
+    image_root = images.PERFUME_IMAGE_ROOT
+    setup_test_environment()
+    try:
+        with override_settings(CACHES=caches):
+            snapshot.CATALOG_SNAPSHOT_PATH = ''
+            images.PERFUME_IMAGE_ROOT = ''
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                yield
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+    finally:
+        snapshot.CATALOG_SNAPSHOT_PATH = snapshot_path
+        images.PERFUME_IMAGE_ROOT = image_root
+        teardown_test_environment()
+
+
+def _grow_catalog(size, seeded):
+    """Seed the catalog up to `size` perfumes and refresh planner statistics; returns how many were added."""
+    added = seed_catalog(size - Perfume.objects.count(), start=seeded)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    facet_index.invalidate()
+    search_index.invalidate()
+    return added
+
+
+def _summary(result):
+    if 'error' in result:
+        return f"ERROR {result['error']}"
+    return (f"p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms  "
+            f"{result['queries']:3d} queries  {result['response_bytes']:8d} B  peak {result['alloc_peak_kib']:9.1f} KiB")
+
+
+# --- WSGI worker vs ASGI worker under many concurrent clients ---
+
+SERVER_CONCURRENCY = 200
+SERVER_REQUESTS = 2000
+# Request threads of the WSGI worker, e.g. gunicorn --threads
+SERVER_WSGI_THREADS = 8
+# Simulated network round trip per SQL query, and per response to a slow client
+SERVER_DB_LATENCY_MS = 5
+SERVER_CLIENT_DELAY_MS = 200
+
+SERVER_CACHES = {
+    # No response caching: every request reaches the view
+    'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+}
+
+
+def _server_urlconf(async_views):
+    """A root URLconf holding just the public list and detail routes, on sync or async views."""
+    urlconf = types.ModuleType(f"perfume_benchmark_urls_{'async' if async_views else 'sync'}")
+    urlconf.urlpatterns = [path('api/', include(perfume_urlpatterns(async_views)))]
+    return urlconf
+
+
+def _server_paths(perfume_ids):
+    """(path, query string) pairs the simulated clients cycle through."""
+    paths = [
+        ('/api/perfumes/', ''),
+        ('/api/perfumes/', 'language=ar&page=2'),
+        ('/api/perfumes/', urlencode({'brandFilter': BRANDS[0][0], 'sort': 'price_asc'})),
+    ]
+    paths += [(f'/api/perfumes/{perfume_id}/', '') for perfume_id in perfume_ids]
+    return paths
+
+
+@contextmanager
+def _slow_request_log_off():
+    """Every request is "slow" here by construction; logging each one would skew the run."""
+    threshold = instrumentation.SLOW_REQUEST_THRESHOLD_MS
+    instrumentation.SLOW_REQUEST_THRESHOLD_MS = float('inf')
+    try:
+        yield
+    finally:
+        instrumentation.SLOW_REQUEST_THRESHOLD_MS = threshold
+
+
+@contextmanager
+def _simulated_db_latency(seconds):
+    """Add `seconds` to every query on every connection, including ones opened by other threads."""
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(connection, **kwargs):
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    for existing in connections.all(initialized_only=True):
+        install(existing)
+    connection_created.connect(install, weak=False)
+    try:
+        yield
+    finally:
+        connection_created.disconnect(install)
+        for existing in connections.all(initialized_only=True):
+            if delay in existing.execute_wrappers:
+                existing.execute_wrappers.remove(delay)
+
+
+def _wsgi_environ(request_path, query):
+    return {
+        'REQUEST_METHOD': 'GET', 'SCRIPT_NAME': '', 'PATH_INFO': request_path, 'QUERY_STRING': query,
+        'SERVER_NAME': 'testserver', 'SERVER_PORT': '443', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'testserver', 'REMOTE_ADDR': '127.0.0.1',
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'https', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+
+
+def _run_wsgi(paths, concurrency, total, threads, client_delay):
+    """
+    `concurrency` clients against one WSGI worker with `threads` request
+    threads, queued first come first served. A request holds its thread
+    until the slow client has its body.
+    """
+    application = get_wsgi_application()
+    counter, lock = itertools.count(), threading.Lock()
+
+    def serve(request_path, query):
+        statuses = []
+        body = application(_wsgi_environ(request_path, query), lambda status, headers, exc_info=None: statuses.append(status))
+        try:
+            for _ in body:
+                pass
+            time.sleep(client_delay)
+        finally:
+            body.close()
+        return int(statuses[0].split()[0])
+
+    def client(worker):
+        timings, errors = [], 0
+        while True:
+            with lock:
+                number = next(counter)
+            if number >= total:
+                return timings, errors
+            start = time.perf_counter()
+            if worker.submit(serve, *paths[number % len(paths)]).result() != 200:
+                errors += 1
+            timings.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=threads) as worker, ThreadPoolExecutor(max_workers=concurrency) as clients:
+        return [future.result() for future in [clients.submit(client, worker) for _ in range(concurrency)]]
+
+
+def _run_asgi(paths, concurrency, total, client_delay):
+    """`concurrency` clients against one ASGI worker (one event loop, as under uvicorn)."""
+    application = get_asgi_application()
+    counter = itertools.count()
+
+    async def serve(request_path, query):
+        status, request_sent = [], []
+
+        async def receive():
+            if not request_sent:
+                request_sent.append(True)
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # The client stays connected; Django cancels this wait once it has responded
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+            elif not message.get('more_body'):
+                await asyncio.sleep(client_delay)
+
+        await application({
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+            'scheme': 'https', 'path': request_path, 'raw_path': request_path.encode(), 'root_path': '',
+            'query_string': query.encode(), 'headers': [(b'host', b'testserver')],
+            'client': ('127.0.0.1', 0), 'server': ('testserver', 443),
+        }, receive, send)
+        return status[0]
+
+    async def client():
+        timings, errors = [], 0
+        while (number := next(counter)) < total:
+            start = time.perf_counter()
+            if await serve(*paths[number % len(paths)]) != 200:
+                errors += 1
+            timings.append(time.perf_counter() - start)
+        return timings, errors
+
+    async def main():
+        return await asyncio.gather(*[client() for _ in range(concurrency)])
+
+    return asyncio.run(main())
+
+
+def _server_summary(clients, elapsed):
+    timings = sorted(itertools.chain.from_iterable(timings for timings, errors in clients))
+    return {
+        'requests': len(timings),
+        'errors': sum(errors for timings, errors in clients),
+        'requests_per_s': round(len(timings) / elapsed, 1),
+        'p50_ms': round(statistics.median(timings) * 1000, 1),
+        'p95_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000, 1),
+    }
+
+
+def measure_servers(concurrency=SERVER_CONCURRENCY, requests=SERVER_REQUESTS, threads=SERVER_WSGI_THREADS,
+                    db_latency_ms=SERVER_DB_LATENCY_MS, client_delay_ms=SERVER_CLIENT_DELAY_MS):
+    """
+    Throughput and latency of the WSGI and ASGI workers over the current
+    catalog, which must be committed so other threads' connections see it.
+    """
+    perfume_ids = list(Perfume.objects.filter(isActive=True).values_list('id', flat=True)[:5])
+    if not perfume_ids:
+        raise BenchmarkError("The catalog has no active perfumes.")
+    paths = _server_paths(perfume_ids)
+    results = {}
+    with override_settings(CACHES=SERVER_CACHES), _slow_request_log_off(), _simulated_db_latency(db_latency_ms / 1000):
+        for server in ('wsgi', 'asgi'):
+            with override_settings(ROOT_URLCONF=_server_urlconf(async_views=server == 'asgi')):
+                start = time.perf_counter()
+                if server == 'wsgi':
+                    clients = _run_wsgi(paths, concurrency, requests, threads, client_delay_ms / 1000)
+                else:
+                    clients = _run_asgi(paths, concurrency, requests, client_delay_ms / 1000)
+                results[server] = _server_summary(clients, time.perf_counter() - start)
+    return results
+
+
+def run_server_benchmark(size=1000, log=None, **options):
+    """`measure_servers()` over a synthetic catalog of `size` perfumes in a throwaway database."""
+    log = log or (lambda message: None)
+    with _throwaway_database(SERVER_CACHES):
+        log(f"Seeding {size} perfumes...")
+        _grow_catalog(size, 0)
+        results = measure_servers(**options)
+    for server, result in results.items():
+        log(f"  {server:<5} {result['requests_per_s']:8.1f} req/s  p50 {result['p50_ms']:8.1f} ms  "
+            f"p95 {result['p95_ms']:8.1f} ms  {result['errors']} errors")
+    return results
+
+
+# --- Connection setup per request ---
+
+CONNECTION_REQUESTS = 500
+
+
+def _pool_available():
+    if connection.vendor != 'postgresql' or importlib.util.find_spec('psycopg_pool') is None:
+        return False
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+    return is_psycopg3
+
+
+def connection_modes():
+    """The connection settings `measure_connections()` compares, as {name: overrides of the default alias}."""
+    modes = {
+        'per-request': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+        'persistent': {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True},
+    }
+    if _pool_available():
+        options = {**connection.settings_dict['OPTIONS'], 'pool': {'min_size': 1, 'max_size': 4}}
+        modes['pool'] = {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False, 'OPTIONS': options}
+    return modes
+
+
+@contextmanager
+def _connection_settings(overrides):
+    """The default alias with `overrides` in its settings, starting from a closed connection."""
+    saved = {key: connection.settings_dict[key] for key in overrides}
+    connection.close()
+    connection.settings_dict.update(overrides)
+    try:
+        yield
+    finally:
+        connection.close()
+        if connection.settings_dict['OPTIONS'].get('pool'):
+            connection.close_pool()
+        connection.settings_dict.update(saved)
+
+
+@contextmanager
+def _timed_connects():
+    """Count and time every connection the default alias opens (or takes from its pool) in this thread."""
+    stats = {'connects': 0, 'seconds': 0.0}
+    connect = connection.connect
+
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            stats['seconds'] += time.perf_counter() - start
+            stats['connects'] += 1
+
+    connection.connect = timed_connect
+    try:
+        yield stats
+    finally:
+        del connection.connect
+
+
+def _serve_sequentially(paths, total):
+    """
+    `total` requests, one after another, through a WSGI worker in this
+    thread. Like a real server, and unlike the test client, it sends
+    request_started and request_finished, which close or keep the
+    connection according to CONN_MAX_AGE.
+    """
+    application = get_wsgi_application()
+    timings, errors = [], 0
+    for number in range(total):
+        statuses = []
+        start = time.perf_counter()
+        body = application(_wsgi_environ(*paths[number % len(paths)]),
+                           lambda status, headers, exc_info=None: statuses.append(status))
+        try:
+            for _ in body:
+                pass
+        finally:
+            body.close()
+        timings.append(time.perf_counter() - start)
+        if int(statuses[0].split()[0]) != 200:
+            errors += 1
+    return timings, errors
+
+
+def measure_connections(requests=CONNECTION_REQUESTS):
+    """
+    Per-request latency and time spent opening connections under each of
+    `connection_modes()`, over the current (committed) catalog. Only a
+    server database shows a difference: an in-memory SQLite database keeps
+    its one connection regardless.
+    """
+    perfume_ids = list(Perfume.objects.filter(isActive=True).values_list('id', flat=True)[:5])
+    if not perfume_ids:
+        raise BenchmarkError("The catalog has no active perfumes.")
+    paths = _server_paths(perfume_ids)
+    results = {}
+    with override_settings(CACHES=SERVER_CACHES, ROOT_URLCONF=_server_urlconf(async_views=False)):
+        for mode, overrides in connection_modes().items():
+            with _connection_settings(overrides), _timed_connects() as stats:
+                _serve_sequentially(paths, len(paths))  # warm-up: imports, indexes, the pool's first connection
+                stats.update(connects=0, seconds=0.0)
+                timings, errors = _serve_sequentially(paths, requests)
+            results[mode] = {
+                **_server_summary([(timings, errors)], sum(timings)),
+                'connects_per_request': round(stats['connects'] / requests, 3),
+                'connect_ms_per_request': round(stats['seconds'] * 1000 / requests, 3),
+            }
+    return results
+
+
+def run_connection_benchmark(size=1000, log=None, **options):
+    """`measure_connections()` over a synthetic catalog of `size` perfumes in a throwaway database."""
+    log = log or (lambda message: None)
+    with _throwaway_database(SERVER_CACHES):
+        log(f"Seeding {size} perfumes...")
+        _grow_catalog(size, 0)
+        results = measure_connections(**options)
+    for mode, result in results.items():
+        log(f"  {mode:<12} p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms  "
+            f"{result['connects_per_request']:6.3f} connects/request  "
+            f"{result['connect_ms_per_request']:7.3f} ms connecting/request  {result['errors']} errors")
+    return results
+
+
+# --- Login throttling under a credential-stuffing burst ---
+
+LOGIN_ATTACK_REQUESTS = 200
+LOGIN_ATTACK_CONCURRENCY = 8
+
+
+@contextmanager
+def _login_throttling_off():
+    limiters = [
+        limiter for limiter in (throttling.login_ip_limiter, throttling.login_account_limiter,
+                                throttling.login_global_limiter)
+        if limiter is not None
+    ]
+    limits = [limiter.limit for limiter in limiters]
+    for limiter in limiters:
+        limiter.limit = float('inf')
+    try:
+        yield
+    finally:
+        for limiter, limit in zip(limiters, limits):
+            limiter.limit = limit
+
+
+def _login_environ(number):
+    """A wrong login for a name of its own, from an address of its own."""
+    body = json.dumps({'name': f'stuffed-{number}', 'password': f'guess-{number}'}).encode()
+    environ = _wsgi_environ('/api/admin/login/', '')
+    environ.update({
+        'REQUEST_METHOD': 'POST', 'CONTENT_TYPE': 'application/json', 'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body), 'REMOTE_ADDR': f'10.{number >> 16 & 255}.{number >> 8 & 255}.{number & 255}',
+    })
+    return environ
+
+
+def _run_login_attack(requests, concurrency):
+    """Status code counts of `requests` wrong logins sent by `concurrency` threads through a WSGI worker."""
+    application = get_wsgi_application()
+
+    def attempt(number):
+        statuses = []
+        body = application(_login_environ(number), lambda status, headers, exc_info=None: statuses.append(status))
+        try:
+            for _ in body:
+                pass
+        finally:
+            body.close()
+        return int(statuses[0].split()[0])
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return collections.Counter(pool.map(attempt, range(requests)))
+
+
+def measure_login_attack(requests=LOGIN_ATTACK_REQUESTS, concurrency=LOGIN_ATTACK_CONCURRENCY):
+    """
+    CPU time the login endpoint spends on a burst of `requests` wrong
+    logins, each from a different address for a different name, with the
+    login throttle off and on. Only the optional global budget
+    (LOGIN_RATE_GLOBAL) can stop such a burst, capping the password hashes,
+    the expensive part; without it both runs check every password.
+    """
+    results = {}
+    with _slow_request_log_off():
+        for mode in ('unthrottled', 'throttled'):
+            cache.clear()
+            with _login_throttling_off() if mode == 'unthrottled' else nullcontext():
+                cpu, start = time.process_time(), time.perf_counter()
+                statuses = _run_login_attack(requests, concurrency)
+                cpu, elapsed = time.process_time() - cpu, time.perf_counter() - start
+            results[mode] = {
+                'requests': requests,
+                'statuses': {str(code): count for code, count in sorted(statuses.items())},
+                'password_checks': statuses[200] + statuses[401],
+                'cpu_s': round(cpu, 2),
+                'cpu_ms_per_request': round(cpu * 1000 / requests, 2),
+                'elapsed_s': round(elapsed, 2),
+            }
+    return results
+
+
+def run_login_attack_benchmark(log=None, **options):
+    """`measure_login_attack()` in a throwaway database."""
+    log = log or (lambda message: None)
+    with _throwaway_database(BENCHMARK_CACHES):
+        results = measure_login_attack(**options)
+    for mode, result in results.items():
+        log(f"  {mode:<12} {result['password_checks']:5d} password checks  {result['cpu_s']:8.2f} s CPU  "
+            f"{result['cpu_ms_per_request']:8.2f} ms CPU/request  statuses {result['statuses']}")
+    return results
+
+
+# --- Serializer cost per row ---
+
+SERIALIZER_ROWS = (12, 100, 1000)
+
+
+def measure_serializers(rows=SERIALIZER_ROWS):
+    """
+    Microseconds per row to serialize the first `rows` perfumes for a
+    public list, with the DRF serializer from model instances and with the
+    compiled projection from `.values()` rows. The queries are not timed.
+    """
+    queryset = Perfume.objects.order_by('nameEn')
+    instances = list(queryset[:max(rows)])
+    values = list(public_perfume_projection.values(queryset[:max(rows)]))
+    results = {}
+    for count in rows:
+        count = min(count, len(instances))
+        if not count:
+            continue
+        # Like timeit, keep the cyclic GC out of the timed sections
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            PublicPerfumeSerializer(instances[:count], many=True).data
+            drf = (time.perf_counter() - start) / count
+            start = time.perf_counter()
+            public_perfume_projection.many(values[:count])
+            compiled = (time.perf_counter() - start) / count
+        finally:
+            gc.enable()
+        results[str(count)] = {
+            'drf_us_per_row': round(drf * 1e6, 1),
+            'compiled_us_per_row': round(compiled * 1e6, 1),
+            'speedup': round(drf / compiled, 1) if compiled else None,
+        }
+    return results
+
+
+def run_serializer_benchmark(size=1000, log=None, **options):
+    """`measure_serializers()` over a synthetic catalog of `size` perfumes in a throwaway database."""
+    log = log or (lambda message: None)
+    with _throwaway_database(BENCHMARK_CACHES):
+        log(f"Seeding {size} perfumes...")
+        _grow_catalog(size, 0)
+        results = measure_serializers(**options)
+    for count, result in results.items():
+        log(f"  {count:>5} rows: DRF {result['drf_us_per_row']:7.1f} us/row, "
+            f"compiled {result['compiled_us_per_row']:6.1f} us/row ({result['speedup']}x)")
+    return results
+
+
+def compare_results(current, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Regressions of `current` against `baseline`, as human-readable lines.
+    Only scenarios present in both are compared; any change in query
+    count, or latency/allocation growth beyond `tolerance` and the noise
+    floor, counts.
+    """
+    regressions = []
+    for size, scenarios in current.get('results', {}).items():
+        baseline_scenarios = baseline.get('results', {}).get(size, {})
+        for name, result in scenarios.items():
+            before = baseline_scenarios.get(name)
+            if before is None or 'error' in before:
+                continue
+            label = f"{name} @ {size}"
+            if 'error' in result:
+                regressions.append(f"{label}: now fails ({result['error']})")
+                continue
+            if result['queries'] > before['queries']:
+                regressions.append(f"{label}: {before['queries']} -> {result['queries']} queries")
+            if (result['p50_ms'] > before['p50_ms'] * (1 + tolerance)
+                    and result['p50_ms'] - before['p50_ms'] > LATENCY_NOISE_MS):
+                regressions.append(f"{label}: p50 {before['p50_ms']} -> {result['p50_ms']} ms")
+            if (result['alloc_peak_kib'] > before['alloc_peak_kib'] * (1 + tolerance)
+                    and result['alloc_peak_kib'] - before['alloc_peak_kib'] > ALLOCATION_NOISE_KIB):
+                regressions.append(f"{label}: peak allocations {before['alloc_peak_kib']} -> {result['alloc_peak_kib']} KiB")
+    return regressions
+
+
+def load_results(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_results(results, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+        f.write('\n')
@@ -0,0 +1,172 @@
+"""
+Generation counters, and the per-process indexes that follow the catalog's.
+
+A generation counter is a number that every write to the data behind it
+bumps, so anything derived from that data (cached responses, the
+in-process indexes, the cached settings table, the catalog snapshot) can be
+checked for staleness by comparing one number. The counters live in the
+database (`GenerationCounter`), which every worker shares whatever cache
+backend is configured. Each process re-reads a counter at most every
+GENERATION_CHECK_INTERVAL seconds, so a read costs a query only that often,
+and a write by another worker is seen within that interval; the process
+that bumps a counter sees the new value at once.
+"""
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, transaction
+from django.db.models import F
+
+from .models import GenerationCounter
+
+CATALOG_GENERATION_KEY = 'catalog_generation'
+
+# Seconds a process goes on using a counter value before reading it again
+GENERATION_CHECK_INTERVAL = getattr(settings, 'CATALOG_GENERATION_CHECK_INTERVAL', 1)
+
+# key -> (value, time.monotonic() it was read at)
+_known = {}
+
+
+def _counters():
+    # Always the primary: a replica could lag behind a bump, or not have the row yet
+    return GenerationCounter.objects.using(DEFAULT_DB_ALIAS)
+
+
+def _create_counter(key):
+    # Time-based, so a recreated counter never repeats a value handed out before
+    _counters().bulk_create([GenerationCounter(key=key, value=int(time.time() * 1000))], ignore_conflicts=True)
+
+
+def _read_generation(key):
+    value = _counters().filter(key=key).values_list('value', flat=True).first()
+    if value is None:
+        _create_counter(key)
+        value = _counters().filter(key=key).values_list('value', flat=True).get()
+    known = _known.get(key)
+    if known is not None and value < known[0]:
+        # A bump made here was rolled back. Move past its number, which this process
+        # may have tagged indexes and cache entries with, so no later bump reuses it.
+        _counters().filter(key=key, value__lte=known[0]).update(value=known[0] + 1)
+        value = _counters().filter(key=key).values_list('value', flat=True).get()
+    _known[key] = (value, time.monotonic())
+    return value
+
+
+def get_generation(key):
+    """
+    Current value of the generation counter at `key`, as last read within
+    GENERATION_CHECK_INTERVAL seconds. While the database is unreachable the
+    last value read stays in use.
+    """
+    known = _known.get(key)
+    if known is not None and time.monotonic() - known[1] < GENERATION_CHECK_INTERVAL:
+        return known[0]
+    try:
+        return _read_generation(key)
+    except DatabaseError:
+        if known is None:
+            raise
+        return known[0]
+
+
+async def aget_generation(key):
+    """Async `get_generation()`."""
+    known = _known.get(key)
+    if known is not None and time.monotonic() - known[1] < GENERATION_CHECK_INTERVAL:
+        return known[0]
+    return await sync_to_async(get_generation)(key)
+
+
+def bump_generation(key):
+    """
+    Advance the generation counter at `key` after a write and return the new
+    value. Inside a transaction the counter's row stays locked until it
+    commits, so concurrent writers are numbered in commit order.
+    """
+    with transaction.atomic(using=DEFAULT_DB_ALIAS, savepoint=False):
+        if not _counters().filter(key=key).update(value=F('value') + 1):
+            _create_counter(key)
+            _counters().filter(key=key).update(value=F('value') + 1)
+        value = _counters().filter(key=key).values_list('value', flat=True).get()
+    _known[key] = (value, time.monotonic())
+    return value
+
+
+def forget_generations():
+    """Make the next read of every counter go to the database."""
+    _known.clear()
+
+
+def get_catalog_generation():
+    """
+    Current catalog generation number. Every admin write bumps it, retiring
+    cached responses and the in-process indexes.
+    """
+    return get_generation(CATALOG_GENERATION_KEY)
+
+
+async def aget_catalog_generation():
+    """Async `get_catalog_generation()`."""
+    return await aget_generation(CATALOG_GENERATION_KEY)
+
+
+def bump_catalog_generation():
+    """Advance the catalog generation after a write and return the new value."""
+    return bump_generation(CATALOG_GENERATION_KEY)
+
+
+class CatalogIndex:
+    """
+    Base for per-process indexes derived from the perfume table.
+
+    Subclasses implement `_rebuild()`, `_refresh(ids)` and `_remove(ids)`.
+    The index remembers the catalog generation it reflects; reads call
+    `_ensure_built()`, which rebuilds once the generation has moved on,
+    i.e. within GENERATION_CHECK_INTERVAL seconds of another worker's write.
+    The process that made a write applies it incrementally through
+    `refresh()`/`remove()` instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._generation = None
+
+    def _ensure_built(self):
+        generation = get_catalog_generation()
+        if self._generation == generation:
+            return
+        with self._lock:
+            if self._generation == generation:
+                return
+            self._rebuild()
+            self._generation = generation
+
+    def _advance(self, generation, apply):
+        with self._lock:
+            if self._generation is None:
+                return
+            if generation is not None and self._generation != generation - 1:
+                # Missed someone else's write; a full rebuild is needed anyway.
+                self._generation = None
+                return
+            apply()
+            if generation is not None:
+                self._generation = generation
+
+    def invalidate(self):
+        """Drop the whole index; it is rebuilt on the next read."""
+        with self._lock:
+            self._generation = None
+
+    def refresh(self, perfume_ids, generation=None):
+        """Re-read the given perfumes from the database and update the index."""
+        perfume_ids = list(perfume_ids)
+        self._advance(generation, lambda: self._refresh(perfume_ids))
+
+    def remove(self, perfume_ids, generation=None):
+        """Forget deleted perfumes without touching the database."""
+        perfume_ids = list(perfume_ids)
+        self._advance(generation, lambda: self._remove(perfume_ids))
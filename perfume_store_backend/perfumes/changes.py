@@ -0,0 +1,166 @@
+"""
+Incremental catalog sync.
+
+`catalog_changes()` answers "what changed since this cursor": the public
+perfumes created or updated after it, and the ids of perfumes that left
+the public catalog, deleted (a `PerfumeTombstone`) or deactivated. Both
+come from one keyset scan ordered by (time, id): `updated_at` for perfumes,
+`deleted_at` for tombstones, each on its own index, merged into batches of
+at most `limit` changes. The returned cursor continues from the last
+change; once a client has caught up it points at the sync horizon, so an
+idle client's cursor keeps moving.
+
+Changes newer than CATALOG_CHANGES_LAG seconds are held back to the next
+poll. Timestamps are taken before a write commits, so a slow transaction
+can commit a row older than one already seen; the lag also covers clock
+skew between workers and the replica's lag (REPLICA_STICKY_SECONDS).
+
+Tombstones are kept for CATALOG_TOMBSTONE_RETENTION seconds. A cursor older
+than that may have missed deletions and is refused with `CursorExpired`;
+the client should sync again from scratch.
+
+`catalog_changed()` is what every write to the catalog (the admin API, the
+image worker) calls once it has changed perfumes: it bumps the catalog
+generation and brings everything derived from the catalog up to date.
+"""
+import base64
+import datetime
+import json
+import uuid
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .catalog import bump_catalog_generation
+from .facets import facet_index
+from .models import Perfume, PerfumeTombstone
+from .pagination import InvalidCursor
+from .rails import collections_changed
+from .search import search_index
+from .snapshot import write_catalog_snapshot_on_commit
+
+# Seconds a change must have aged before it is handed out
+CATALOG_CHANGES_LAG = getattr(settings, 'CATALOG_CHANGES_LAG', 5)
+
+# Seconds tombstones are kept, i.e. how long a client may go without syncing
+CATALOG_TOMBSTONE_RETENTION = getattr(settings, 'CATALOG_TOMBSTONE_RETENTION', 30 * 24 * 60 * 60)
+
+# Default and largest number of changes in one batch
+CHANGES_DEFAULT_LIMIT = 200
+CHANGES_MAX_LIMIT = 1000
+
+# Sorts after every real id at the same instant
+_LAST_ID = uuid.UUID(int=(1 << 128) - 1)
+
+
+class CursorExpired(InvalidCursor):
+    pass
+
+
+def encode_change_cursor(changed_at, perfume_id):
+    payload = {"u": changed_at.isoformat(), "i": str(perfume_id)}
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_change_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        changed_at = parse_datetime(payload['u'])
+        perfume_id = uuid.UUID(payload['i'])
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor("Invalid cursor.")
+    if changed_at is None or changed_at.tzinfo is None:
+        raise InvalidCursor("Invalid cursor.")
+    return changed_at, perfume_id
+
+
+def _after(queryset, time_field, id_field, changed_at, perfume_id):
+    return queryset.filter(
+        Q(**{f'{time_field}__gt': changed_at}) | Q(**{time_field: changed_at, f'{id_field}__gt': perfume_id})
+    )
+
+
+def catalog_changes(since, limit, projection):
+    """
+    The changes after cursor `since` (None for the whole catalog), at most
+    `limit` of them, with perfumes rendered by `projection`:
+    {"perfumes": [...], "removed": [id, ...], "nextCursor": ..., "hasMore": bool}.
+    Raises InvalidCursor for a malformed cursor and CursorExpired for one
+    older than the tombstones.
+    """
+    now = timezone.now()
+    horizon = now - datetime.timedelta(seconds=CATALOG_CHANGES_LAG)
+    caught_up = (horizon, _LAST_ID)
+    perfumes = Perfume.objects.filter(updated_at__lte=horizon)
+    tombstones = PerfumeTombstone.objects.filter(deleted_at__lte=horizon)
+    if since:
+        changed_at, perfume_id = decode_change_cursor(since)
+        if changed_at < now - datetime.timedelta(seconds=CATALOG_TOMBSTONE_RETENTION):
+            raise CursorExpired("This cursor is too old to sync from; fetch the catalog again without `since`.")
+        perfumes = _after(perfumes, 'updated_at', 'id', changed_at, perfume_id)
+        tombstones = _after(tombstones, 'deleted_at', 'perfume_id', changed_at, perfume_id)
+        # Never move a cursor backwards, e.g. one handed out by a worker whose clock runs ahead
+        caught_up = max(caught_up, (changed_at, perfume_id))
+
+    rows = list(
+        perfumes.order_by('updated_at', 'id').values(*projection.columns, 'updated_at', 'isActive')[:limit + 1]
+    )
+    deleted = list(
+        tombstones.order_by('deleted_at', 'perfume_id').values_list('deleted_at', 'perfume_id')[:limit + 1]
+    )
+    merged = sorted(
+        [(row['updated_at'], row['id'], row) for row in rows] + [(*key, None) for key in deleted],
+        key=lambda change: change[:2],
+    )
+    has_more = len(merged) > limit
+    merged = merged[:limit]
+
+    active, removed = [], []
+    for _, perfume_id, row in merged:
+        if row is not None and row['isActive']:
+            active.append(row)
+        else:
+            removed.append(str(perfume_id))
+    last_at, last_id = merged[-1][:2] if has_more else caught_up
+    return {
+        "perfumes": projection.many(active),
+        "removed": removed,
+        "nextCursor": encode_change_cursor(last_at, last_id),
+        "hasMore": has_more,
+    }
+
+
+def record_deletions(perfume_ids):
+    """
+    Leave tombstones for deleted perfumes, in the deleting transaction, and
+    drop the ones past CATALOG_TOMBSTONE_RETENTION.
+    """
+    now = timezone.now()
+    PerfumeTombstone.objects.bulk_create(
+        [PerfumeTombstone(perfume_id=perfume_id, deleted_at=now) for perfume_id in perfume_ids],
+        update_conflicts=True, unique_fields=['perfume_id'], update_fields=['deleted_at'],
+    )
+    PerfumeTombstone.objects.filter(
+        deleted_at__lt=now - datetime.timedelta(seconds=CATALOG_TOMBSTONE_RETENTION)
+    ).delete()
+
+
+def catalog_changed(updated_ids=(), deleted_ids=()):
+    """
+    Record a write to the catalog: bump the catalog generation (retiring
+    cached responses everywhere), bring this process's indexes and the
+    homepage rails up to date and rewrite the catalog snapshot once the
+    write commits.
+    """
+    generation = bump_catalog_generation()
+    for index in (facet_index, search_index):
+        if updated_ids:
+            index.refresh(updated_ids, generation)
+        if deleted_ids:
+            index.remove(deleted_ids, generation)
+    collections_changed(generation, updated_ids, deleted_ids)
+    write_catalog_snapshot_on_commit(generation)
@@ -0,0 +1,92 @@
+import csv
+import json
+import zlib
+
+from .models import Perfume
+from .serializers import admin_perfume_projection
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# Rows fetched per round trip from the server-side cursor.
+EXPORT_CHUNK_SIZE = 1000
+
+# Export rows are flushed in batches of roughly this many bytes.
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+# Columns written to CSV as JSON
+JSON_COLUMNS = ('sizes', 'imageVariants')
+
+
+def export_queryset(active_only=False):
+    queryset = Perfume.objects.order_by('created_at', 'id')
+    if active_only:
+        queryset = queryset.filter(isActive=True)
+    return admin_perfume_projection.values(queryset)
+
+
+def _rows(queryset, chunk_size):
+    # iterator() streams from a server-side cursor on PostgreSQL instead of
+    # materializing the whole result set.
+    return admin_perfume_projection.many_iter(queryset.iterator(chunk_size=chunk_size))
+
+
+def _buffered(pieces):
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= EXPORT_BUFFER_SIZE:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def iter_ndjson(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """One JSON object per line, in the admin API's perfume shape."""
+    return _buffered(
+        json.dumps(row, ensure_ascii=False, separators=(',', ':')) + '\n'
+        for row in _rows(queryset, chunk_size)
+    )
+
+
+class _Echo:
+    """File-like object whose write() returns the line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """CSV with a header row; `sizes` and `imageVariants` are written as JSON."""
+    writer = csv.writer(_Echo())
+    columns = admin_perfume_projection.columns
+
+    def lines():
+        yield writer.writerow(columns)
+        for row in _rows(queryset, chunk_size):
+            yield writer.writerow([
+                json.dumps(row[column], ensure_ascii=False) if column in JSON_COLUMNS else row[column]
+                for column in columns
+            ])
+
+    return _buffered(lines())
+
+
+def iter_export(export_format, queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    if export_format == 'csv':
+        return iter_csv(queryset, chunk_size)
+    return iter_ndjson(queryset, chunk_size)
+
+
+def gzip_stream(chunks):
+    """Gzip-compress a stream of text chunks incrementally, as UTF-8."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,151 @@
+from .catalog import CatalogIndex
+from .models import Perfume, STOCK_STATUS_LABELS
+
+# Facet name -> model column per language. Stock status is not translated,
+# so both languages read the same column (indexed by its display label).
+FACET_FIELDS = {
+    'brand': {'en': 'brandEn', 'ar': 'brandAr'},
+    'category': {'en': 'categoryEn', 'ar': 'categoryAr'},
+    'gender': {'en': 'genderEn', 'ar': 'genderAr'},
+    'stockStatus': {'en': 'stockStatus', 'ar': 'stockStatus'},
+}
+
+LANGUAGES = ('en', 'ar')
+
+INDEXED_COLUMNS = sorted({column for columns in FACET_FIELDS.values() for column in columns.values()})
+
+
+def _facet_row(row):
+    """(perfume id, {column: facet value}) for a values_list row of id + INDEXED_COLUMNS."""
+    values = dict(zip(INDEXED_COLUMNS, row[1:]))
+    values['stockStatus'] = STOCK_STATUS_LABELS.get(values['stockStatus'])
+    return row[0], values
+
+
+def normalize_language(language):
+    return 'ar' if language == 'ar' else 'en'
+
+
+class FacetIndex(CatalogIndex):
+    """
+    Per-process index of the facet values of active perfumes.
+
+    Every active perfume gets a slot number, and for each facet/language/value
+    we keep a Python int whose bits are the slots of the perfumes carrying that
+    value. Distinct values, counts and intersections ("brands within category
+    X") are then answered with integer AND / bit_count instead of a query.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._reset()
+
+    def _rebuild(self):
+        self._reset()
+        rows = Perfume.objects.filter(isActive=True).values_list('id', *INDEXED_COLUMNS)
+        for row in rows:
+            self._add(*_facet_row(row))
+
+    def _reset(self):
+        self._slots = {}          # perfume id -> slot
+        self._rows = {}           # slot -> {column: value}
+        self._free_slots = []
+        self._next_slot = 0
+        self._bitsets = {(facet, language): {} for facet in FACET_FIELDS for language in LANGUAGES}
+        self._sorted_values = {}  # (facet, language) -> sorted list of values
+
+    def _add(self, perfume_id, row):
+        if self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            slot = self._next_slot
+            self._next_slot += 1
+        bit = 1 << slot
+        self._slots[perfume_id] = slot
+        self._rows[slot] = row
+        for facet, columns in FACET_FIELDS.items():
+            for language, column in columns.items():
+                value = row[column]
+                if not value:
+                    continue
+                values = self._bitsets[(facet, language)]
+                if value not in values:
+                    self._sorted_values.pop((facet, language), None)
+                values[value] = values.get(value, 0) | bit
+
+    def _discard(self, perfume_id):
+        slot = self._slots.pop(perfume_id, None)
+        if slot is None:
+            return
+        mask = ~(1 << slot)
+        row = self._rows.pop(slot)
+        for facet, columns in FACET_FIELDS.items():
+            for language, column in columns.items():
+                value = row[column]
+                values = self._bitsets[(facet, language)]
+                if value not in values:
+                    continue
+                remaining = values[value] & mask
+                if remaining:
+                    values[value] = remaining
+                else:
+                    del values[value]
+                    self._sorted_values.pop((facet, language), None)
+        self._free_slots.append(slot)
+
+    def _refresh(self, perfume_ids):
+        rows = Perfume.objects.filter(id__in=perfume_ids, isActive=True).values_list('id', *INDEXED_COLUMNS)
+        for perfume_id in perfume_ids:
+            self._discard(perfume_id)
+        for row in rows:
+            self._add(*_facet_row(row))
+
+    def _remove(self, perfume_ids):
+        for perfume_id in perfume_ids:
+            self._discard(perfume_id)
+
+    def _sorted(self, key):
+        sorted_values = self._sorted_values.get(key)
+        if sorted_values is None:
+            sorted_values = self._sorted_values[key] = sorted(self._bitsets[key])
+        return sorted_values
+
+    def _filter_mask(self, language, filters):
+        mask = None
+        for facet, value in (filters or {}).items():
+            if not value:
+                continue
+            bits = self._bitsets[(facet, language)].get(value, 0)
+            mask = bits if mask is None else mask & bits
+        return mask
+
+    def values(self, facet, language=None, filters=None):
+        """Sorted distinct values of `facet`, restricted to perfumes matching `filters`."""
+        self._ensure_built()
+        language = normalize_language(language)
+        key = (facet, language)
+        with self._lock:
+            values = self._bitsets[key]
+            sorted_values = self._sorted(key)
+            mask = self._filter_mask(language, filters)
+            if mask is None:
+                return list(sorted_values)
+            return [value for value in sorted_values if values[value] & mask]
+
+    def counts(self, facet, language=None, filters=None):
+        """Mapping of value -> number of active perfumes, restricted by `filters`."""
+        self._ensure_built()
+        language = normalize_language(language)
+        key = (facet, language)
+        with self._lock:
+            values = self._bitsets[key]
+            mask = self._filter_mask(language, filters)
+            counts = {}
+            for value in self._sorted(key):
+                bits = values[value] if mask is None else values[value] & mask
+                if bits:
+                    counts[value] = bits.bit_count()
+            return counts
+
+
+facet_index = FacetIndex()
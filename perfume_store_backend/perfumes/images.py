@@ -0,0 +1,280 @@
+"""
+Responsive image variants.
+
+Each perfume's image (an admin upload, or whatever its `imageUrl` points
+at, fetched once if its host is in IMAGE_FETCH_HOSTS) is resized to the IMAGE_WIDTHS no wider than the
+original and encoded as WebP and JPEG. Every file, the uploaded original
+included, is stored under PERFUME_IMAGE_ROOT named by a hash of its
+content, so a URL always denotes the same bytes and is served with
+`Cache-Control: immutable`; a changed image gets new URLs instead of
+needing a purge. The variant URLs are kept in `Perfume.imageVariants`,
+{"webp": {"320": url, ...}, "jpeg": {...}}, which list and detail
+responses carry next to `imageUrl` for `srcset`.
+
+The work runs on a background thread after the admin write commits, so
+requests never wait for decoding or resizing. A variant map belongs to
+the `imageSource` it was made from and is dropped when `imageUrl` changes
+(see `Perfume.update_derived_fields`); clients fall back to `imageUrl`
+until the new one is ready.
+
+Pillow is optional: without it, or with PERFUME_IMAGE_ROOT set to an empty
+value, uploads are refused and no variants are made.
+"""
+import hashlib
+import io
+import logging
+import os
+import re
+import tempfile
+import threading
+import urllib.request
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.http.request import validate_host
+from django.utils import timezone
+
+from perfume_store_backend.db_routers import use_primary
+
+from .changes import catalog_changed
+from .models import Perfume
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# Where the stored images live; empty turns the pipeline off
+PERFUME_IMAGE_ROOT = getattr(settings, 'PERFUME_IMAGE_ROOT', None)
+# URL prefix they are served under (see `serve_perfume_image`)
+PERFUME_IMAGE_URL = getattr(settings, 'PERFUME_IMAGE_URL', '/media/perfumes/')
+
+# Widths of the variants, in pixels. Widths above the original's are skipped;
+# the original's own width (capped at the largest) is always made.
+IMAGE_WIDTHS = getattr(settings, 'PERFUME_IMAGE_WIDTHS', (160, 320, 480, 640, 960))
+
+# Encoder options per variant format: (Pillow format, file extension, save options)
+IMAGE_FORMATS = {
+    'webp': ('WEBP', 'webp', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+# Formats accepted as originals, with the extension they are stored under
+SOURCE_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif'}
+
+# Largest original accepted, in bytes and in pixels (decompression bombs)
+IMAGE_MAX_BYTES = getattr(settings, 'PERFUME_IMAGE_MAX_BYTES', 10 * 1024 * 1024)
+IMAGE_MAX_PIXELS = getattr(settings, 'PERFUME_IMAGE_MAX_PIXELS', 40_000_000)
+
+# Seconds to wait for a remote image
+IMAGE_FETCH_TIMEOUT = getattr(settings, 'PERFUME_IMAGE_FETCH_TIMEOUT', 10)
+
+# Hosts (ALLOWED_HOSTS patterns) and schemes a remote imageUrl may be fetched
+# from, redirects included; with no hosts, only images we stored are read
+IMAGE_FETCH_HOSTS = getattr(settings, 'PERFUME_IMAGE_FETCH_HOSTS', ())
+IMAGE_FETCH_SCHEMES = getattr(settings, 'PERFUME_IMAGE_FETCH_SCHEMES', ('https',))
+
+# Names of stored files: content hash and extension
+STORED_NAME = re.compile(r'[0-9a-f]{32}\.(webp|jpg|png|gif)')
+
+
+class ImageError(ValueError):
+    pass
+
+
+def images_enabled():
+    return bool(PERFUME_IMAGE_ROOT) and Image is not None
+
+
+def _open(data):
+    try:
+        image = Image.open(io.BytesIO(data))
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ImageError(f"Not a readable image: {e}")
+    if image.format not in SOURCE_FORMATS:
+        raise ImageError(f"Unsupported image format {image.format}; use one of {', '.join(SOURCE_FORMATS)}.")
+    if image.width * image.height > IMAGE_MAX_PIXELS:
+        raise ImageError(f"Images may have at most {IMAGE_MAX_PIXELS} pixels.")
+    return image
+
+
+def _store(data, extension):
+    """Store `data` under its content hash (once) and return its URL path."""
+    name = f"{hashlib.sha256(data).hexdigest()[:32]}.{extension}"
+    path = os.path.join(PERFUME_IMAGE_ROOT, name)
+    if not os.path.exists(path):
+        os.makedirs(PERFUME_IMAGE_ROOT, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=PERFUME_IMAGE_ROOT, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    return PERFUME_IMAGE_URL + name
+
+
+def store_original(data):
+    """Check that `data` is an acceptable image, store it as is and return its URL path."""
+    if len(data) > IMAGE_MAX_BYTES:
+        raise ImageError(f"Images may be at most {IMAGE_MAX_BYTES} bytes.")
+    image = _open(data)
+    return _store(data, SOURCE_FORMATS[image.format])
+
+
+def build_variants(data):
+    """Resize and encode the image in `data`, store every variant and return the variant map."""
+    image = _open(data)
+    try:
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+            # JPEG has no alpha channel; product shots sit on white
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, 'white')
+            image.paste(rgba, mask=rgba.getchannel('A'))
+        else:
+            image = image.convert('RGB')
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ImageError(f"Not a readable image: {e}")
+
+    widths = sorted({width for width in IMAGE_WIDTHS if width < image.width} | {min(image.width, max(IMAGE_WIDTHS))})
+    variants = {name: {} for name in IMAGE_FORMATS}
+    for width in widths:
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS, reducing_gap=3.0)
+        for name, (image_format, extension, options) in IMAGE_FORMATS.items():
+            out = io.BytesIO()
+            resized.save(out, image_format, **options)
+            variants[name][str(width)] = _store(out.getvalue(), extension)
+    return variants
+
+
+def stored_image_path(url):
+    """The file behind `url` if it is one of ours, otherwise None."""
+    path = urlsplit(url).path
+    if not path.startswith(PERFUME_IMAGE_URL):
+        return None
+    name = path[len(PERFUME_IMAGE_URL):]
+    if not STORED_NAME.fullmatch(name):
+        return None
+    return os.path.join(PERFUME_IMAGE_ROOT, name)
+
+
+def _check_fetch_url(url):
+    parts = urlsplit(url)
+    if parts.scheme not in IMAGE_FETCH_SCHEMES:
+        raise ImageError(f"Cannot fetch {url}: scheme is not one of {', '.join(IMAGE_FETCH_SCHEMES)}.")
+    if not parts.hostname or not validate_host(parts.hostname, IMAGE_FETCH_HOSTS):
+        raise ImageError(f"Cannot fetch {url}: host is not in PERFUME_IMAGE_FETCH_HOSTS.")
+
+
+class _CheckedRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """Follows a redirect only to a URL `fetch_image` would fetch itself."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        _check_fetch_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+_fetch_opener = urllib.request.build_opener(_CheckedRedirectHandler)
+
+
+def fetch_image(url):
+    """
+    The bytes of the image at `url`: read from disk if we stored it,
+    otherwise downloaded, if it is on one of the IMAGE_FETCH_HOSTS.
+    """
+    local_path = stored_image_path(url)
+    if local_path is not None and os.path.exists(local_path):
+        with open(local_path, 'rb') as f:
+            return f.read()
+    _check_fetch_url(url)
+    request = urllib.request.Request(url, headers={'User-Agent': 'perfume-store-images'})
+    with _fetch_opener.open(request, timeout=IMAGE_FETCH_TIMEOUT) as response:
+        data = response.read(IMAGE_MAX_BYTES + 1)
+    if len(data) > IMAGE_MAX_BYTES:
+        raise ImageError(f"{url} is larger than {IMAGE_MAX_BYTES} bytes.")
+    return data
+
+
+def process_perfume_image(perfume_id):
+    """
+    Make the variants of a perfume's current image unless they exist.
+    Returns whether new variants were saved; a perfume whose imageUrl
+    changed meanwhile is left for the run its own change queued.
+    """
+    with use_primary():
+        row = Perfume.objects.filter(id=perfume_id).values('imageUrl', 'imageSource').first()
+        if row is None or not row['imageUrl'] or row['imageSource'] == row['imageUrl']:
+            return False
+        url = row['imageUrl']
+        variants = build_variants(fetch_image(url))
+        updated = Perfume.objects.filter(id=perfume_id, imageUrl=url).update(
+            imageVariants=variants, imageSource=url, updated_at=timezone.now(),
+        )
+        if updated:
+            catalog_changed(updated_ids=[perfume_id])
+        return bool(updated)
+
+
+class ImageWorker:
+    """
+    Processes perfume images on a background thread, one at a time. A
+    perfume queued again before its turn is processed once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._thread = None
+
+    def request(self, perfume_id):
+        with self._lock:
+            self._pending[perfume_id] = None
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='perfume-images', daemon=True)
+                self._thread.start()
+
+    def wait(self, timeout=None):
+        """Block until the queued images are processed."""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        try:
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        self._thread = None
+                        return
+                    perfume_id = next(iter(self._pending))
+                    del self._pending[perfume_id]
+                try:
+                    process_perfume_image(perfume_id)
+                except Exception:
+                    # The perfume keeps serving its imageUrl alone; the worker goes on with the next one
+                    logging.exception(f"Failed to make image variants for perfume {perfume_id}")
+        finally:
+            with self._lock:
+                if self._thread is threading.current_thread():
+                    self._thread = None
+            connections.close_all()
+
+
+image_worker = ImageWorker()
+
+
+def queue_perfume_images(perfume_ids):
+    """Have the perfumes' image variants made once the current transaction commits."""
+    if images_enabled() and perfume_ids:
+        perfume_ids = list(perfume_ids)
+
+        def request():
+            for perfume_id in perfume_ids:
+                image_worker.request(perfume_id)
+
+        transaction.on_commit(request)
@@ -0,0 +1,100 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from perfume_store_backend.perfumes.benchmarks import (
+    CONNECTION_REQUESTS, DEFAULT_ITERATIONS, DEFAULT_SIZES, DEFAULT_TOLERANCE, LOGIN_ATTACK_CONCURRENCY,
+    LOGIN_ATTACK_REQUESTS, SERIALIZER_ROWS, SERVER_CLIENT_DELAY_MS, SERVER_CONCURRENCY, SERVER_DB_LATENCY_MS,
+    SERVER_REQUESTS, SERVER_WSGI_THREADS, compare_results, load_results, run_benchmarks, run_connection_benchmark,
+    run_login_attack_benchmark, run_serializer_benchmark, run_server_benchmark, save_results,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the catalog and admin endpoints against synthetic catalogs in a throwaway "
+        "test database, write the results as JSON and optionally compare them with a baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                            help="Comma-separated catalog sizes (default: %(default)s).")
+        parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS, help="Timed runs per scenario.")
+        parser.add_argument('--only', action='append', metavar='PATTERN',
+                            help="Only run scenarios matching this glob, e.g. 'list/*'. Repeatable.")
+        parser.add_argument('--output', '-o', default='benchmark-results.json', help="Where to write the results.")
+        parser.add_argument('--baseline', help="Results file to compare against; regressions fail the command.")
+        parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                            help="Allowed relative growth in latency and allocations (default: %(default)s).")
+        servers = parser.add_argument_group(
+            "server comparison", "With --servers, compare a threaded WSGI worker and an ASGI worker under many "
+            "concurrent clients instead, on a catalog of the smallest --sizes.")
+        servers.add_argument('--servers', action='store_true', help="Run the WSGI/ASGI comparison.")
+        servers.add_argument('--concurrency', type=int,
+                             help=f"Concurrent clients (default: {SERVER_CONCURRENCY}).")
+        servers.add_argument('--requests', type=int,
+                             help=f"Requests in total (default: {SERVER_REQUESTS}; {CONNECTION_REQUESTS} with "
+                                  f"--connections, {LOGIN_ATTACK_REQUESTS} with --login-attack).")
+        servers.add_argument('--threads', type=int, default=SERVER_WSGI_THREADS, help="WSGI worker threads.")
+        servers.add_argument('--db-latency-ms', type=float, default=SERVER_DB_LATENCY_MS,
+                             help="Simulated round trip added to every query.")
+        servers.add_argument('--client-delay-ms', type=float, default=SERVER_CLIENT_DELAY_MS,
+                             help="Simulated time to deliver each response to a slow client.")
+        parser.add_argument('--connections', action='store_true',
+                            help="Instead, measure connection setup per request with per-request, persistent and "
+                                 "(psycopg 3) pooled connections, on a catalog of the smallest --sizes.")
+        parser.add_argument('--login-attack', action='store_true',
+                            help=f"Instead, measure the CPU a burst of wrong logins costs with the login throttle off "
+                                 f"and on ({LOGIN_ATTACK_REQUESTS} requests by default, from --concurrency threads, "
+                                 f"default {LOGIN_ATTACK_CONCURRENCY}).")
+        parser.add_argument('--serializers', action='store_true',
+                            help=f"Instead, compare the per-row cost of the DRF and compiled list serializers at "
+                                 f"{', '.join(map(str, SERIALIZER_ROWS))} rows, on a catalog of the smallest --sizes.")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        except ValueError:
+            raise CommandError("--sizes must be a comma-separated list of integers.")
+        if not sizes or min(sizes) < 1:
+            raise CommandError("--sizes must list positive catalog sizes.")
+        if options['serializers']:
+            results = run_serializer_benchmark(min(sizes), log=self.stdout.write)
+            save_results(results, options['output'])
+            self.stdout.write(f"Results written to {options['output']}")
+            return
+        if options['login_attack']:
+            results = run_login_attack_benchmark(
+                log=self.stdout.write, requests=options['requests'] or LOGIN_ATTACK_REQUESTS,
+                concurrency=options['concurrency'] or LOGIN_ATTACK_CONCURRENCY)
+            save_results(results, options['output'])
+            self.stdout.write(f"Results written to {options['output']}")
+            return
+        if options['connections']:
+            results = run_connection_benchmark(
+                min(sizes), log=self.stdout.write, requests=options['requests'] or CONNECTION_REQUESTS)
+            save_results(results, options['output'])
+            self.stdout.write(f"Results written to {options['output']}")
+            return
+        if options['servers']:
+            results = run_server_benchmark(
+                min(sizes), log=self.stdout.write, concurrency=options['concurrency'] or SERVER_CONCURRENCY,
+                requests=options['requests'] or SERVER_REQUESTS,
+                threads=options['threads'], db_latency_ms=options['db_latency_ms'],
+                client_delay_ms=options['client_delay_ms'],
+            )
+            save_results(results, options['output'])
+            self.stdout.write(f"Results written to {options['output']}")
+            return
+        baseline = load_results(options['baseline']) if options['baseline'] else None
+
+        results = run_benchmarks(sizes, options['iterations'], options['only'], log=self.stdout.write)
+        save_results(results, options['output'])
+        self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is None:
+            return
+        regressions = compare_results(results, baseline, options['tolerance'])
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(f"REGRESSION {regression}")
+            raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}.")
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}."))
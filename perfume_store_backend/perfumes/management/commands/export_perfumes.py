@@ -0,0 +1,38 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from perfume_store_backend.perfumes.export import (
+    EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_queryset, gzip_stream, iter_export,
+)
+
+
+class Command(BaseCommand):
+    help = "Stream the perfume catalog to a file or stdout as NDJSON or CSV, with constant memory use."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='ndjson')
+        parser.add_argument('--output', '-o', help="Output file (default: stdout).")
+        parser.add_argument('--gzip', action='store_true', help="Gzip-compress the output.")
+        parser.add_argument('--active-only', action='store_true', help="Skip inactive perfumes.")
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE, help="Rows fetched per database round trip.")
+
+    def handle(self, *args, **options):
+        chunks = iter_export(options['format'], export_queryset(options['active_only']), options['chunk_size'])
+
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                for chunk in self._encoded(chunks, options['gzip']):
+                    output.write(chunk)
+        elif options['gzip']:
+            for chunk in gzip_stream(chunks):
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+
+    def _encoded(self, chunks, use_gzip):
+        if use_gzip:
+            return gzip_stream(chunks)
+        return (chunk.encode('utf-8') for chunk in chunks)
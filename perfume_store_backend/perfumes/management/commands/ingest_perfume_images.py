@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+
+from perfume_store_backend.perfumes import images
+from perfume_store_backend.perfumes.models import Perfume
+
+
+class Command(BaseCommand):
+    help = (
+        "Make the resized image variants of every perfume whose imageUrl has none yet, e.g. after deploying "
+        "the image pipeline. Each image is fetched once and processed here rather than in the background."
+    )
+
+    def handle(self, *args, **options):
+        if not images.images_enabled():
+            raise CommandError("Image processing is off; install Pillow and set PERFUME_IMAGE_ROOT.")
+        perfume_ids = list(
+            Perfume.objects.exclude(imageUrl__isnull=True).exclude(imageUrl='')
+            .exclude(imageSource=F('imageUrl')).values_list('id', flat=True)
+        )
+        made = failed = 0
+        for perfume_id in perfume_ids:
+            try:
+                made += images.process_perfume_image(perfume_id)
+            except (images.ImageError, OSError) as e:
+                failed += 1
+                self.stderr.write(f"{perfume_id}: {e}")
+        self.stdout.write(f"Made variants for {made} of {len(perfume_ids)} perfumes ({failed} failed)")
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from perfume_store_backend.perfumes import snapshot
+from perfume_store_backend.perfumes.catalog import bump_catalog_generation
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the catalog snapshot now, e.g. on deploy or after changing perfumes outside the admin API. "
+        "Bumps the catalog generation first, which also retires cached catalog responses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', help="Snapshot file (default: CATALOG_SNAPSHOT_PATH).")
+
+    def handle(self, *args, **options):
+        path = options['output'] or snapshot.CATALOG_SNAPSHOT_PATH
+        if not path:
+            raise CommandError("Catalog snapshots are off; set CATALOG_SNAPSHOT_PATH or pass --output.")
+        generation = bump_catalog_generation()
+        count = snapshot.write_catalog_snapshot(generation, path)
+        self.stdout.write(f"Wrote {count} perfumes at generation {generation} to {path}")
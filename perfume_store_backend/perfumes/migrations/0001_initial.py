@@ -0,0 +1,66 @@
+# Generated by Django 5.2.3 on 2026-10-17 19:42
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Perfume",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("nameEn", models.CharField(max_length=255)),
+                ("nameAr", models.CharField(max_length=255)),
+                ("brandEn", models.CharField(max_length=255)),
+                ("brandAr", models.CharField(max_length=255)),
+                ("categoryEn", models.CharField(max_length=255)),
+                ("categoryAr", models.CharField(max_length=255)),
+                ("genderEn", models.CharField(max_length=255)),
+                ("genderAr", models.CharField(max_length=255)),
+                ("descriptionEn", models.TextField()),
+                ("descriptionAr", models.TextField()),
+                ("sizes", models.JSONField()),
+                ("stockStatus", models.CharField(max_length=50)),
+                ("imageUrl", models.URLField(blank=True, max_length=500, null=True)),
+                ("isNew", models.BooleanField(default=False)),
+                ("isBestseller", models.BooleanField(default=False)),
+                ("isActive", models.BooleanField(default=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "db_table": "perfumes",
+                "indexes": [
+                    models.Index(
+                        fields=["brandEn"], name="perfumes_brandEn_04f8fd_idx"
+                    ),
+                    models.Index(
+                        fields=["categoryEn"], name="perfumes_categor_56c5d8_idx"
+                    ),
+                    models.Index(
+                        fields=["genderEn"], name="perfumes_genderE_e70443_idx"
+                    ),
+                    models.Index(
+                        fields=["isActive"], name="perfumes_isActiv_ecac9b_idx"
+                    ),
+                    models.Index(
+                        fields=["stockStatus"], name="perfumes_stockSt_7c7298_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
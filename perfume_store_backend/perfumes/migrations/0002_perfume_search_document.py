@@ -0,0 +1,66 @@
+# Generated by Django 5.2.3 on 2026-10-17 19:42
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+from perfume_store_backend.perfumes.normalization import (
+    SEARCH_DOCUMENT_FIELDS,
+    build_search_document,
+)
+
+
+def populate_search_document(apps, schema_editor):
+    Perfume = apps.get_model("perfumes", "Perfume")
+    batch = []
+    queryset = Perfume.objects.using(schema_editor.connection.alias).only(
+        "id", *SEARCH_DOCUMENT_FIELDS
+    )
+    for perfume in queryset.iterator(chunk_size=500):
+        perfume.searchDocument = build_search_document(
+            {field: getattr(perfume, field) for field in SEARCH_DOCUMENT_FIELDS}
+        )
+        batch.append(perfume)
+        if len(batch) >= 500:
+            Perfume.objects.using(schema_editor.connection.alias).bulk_update(
+                batch, ["searchDocument"]
+            )
+            batch = []
+    if batch:
+        Perfume.objects.using(schema_editor.connection.alias).bulk_update(
+            batch, ["searchDocument"]
+        )
+
+
+def create_trigram_index(apps, schema_editor):
+    # GIN trigram index serving both LIKE '%term%' and the `%>` fuzzy
+    # operator. PostgreSQL only; other backends use the in-process index.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS perfumes_search_trgm_idx '
+        'ON perfumes USING gin ("searchDocument" gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS perfumes_search_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("perfumes", "0001_initial"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="perfume",
+            name="searchDocument",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.RunPython(populate_search_document, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.3 on 2026-10-17 19:51
+
+from django.db import migrations, models
+
+from perfume_store_backend.perfumes.models import price_range
+
+
+def populate_price_range(apps, schema_editor):
+    Perfume = apps.get_model("perfumes", "Perfume")
+    manager = Perfume.objects.using(schema_editor.connection.alias)
+    batch = []
+    for perfume in manager.only("id", "sizes").iterator(chunk_size=500):
+        perfume.minPriceEGP, perfume.maxPriceEGP = price_range(perfume.sizes)
+        batch.append(perfume)
+        if len(batch) >= 500:
+            manager.bulk_update(batch, ["minPriceEGP", "maxPriceEGP"])
+            batch = []
+    if batch:
+        manager.bulk_update(batch, ["minPriceEGP", "maxPriceEGP"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("perfumes", "0002_perfume_search_document"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="perfume",
+            name="maxPriceEGP",
+            field=models.DecimalField(
+                blank=True, decimal_places=2, editable=False, max_digits=12, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="perfume",
+            name="minPriceEGP",
+            field=models.DecimalField(
+                blank=True, decimal_places=2, editable=False, max_digits=12, null=True
+            ),
+        ),
+        migrations.RunPython(populate_price_range, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="perfume",
+            index=models.Index(
+                condition=models.Q(("isActive", True)),
+                fields=["minPriceEGP"],
+                name="perfumes_active_price_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,122 @@
+# Generated by Django 5.2.3 on 2026-10-17 19:54
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("perfumes", "0003_perfume_price_range"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="perfume",
+            name="perfumes_brandEn_04f8fd_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="perfume",
+            name="perfumes_categor_56c5d8_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="perfume",
+            name="perfumes_genderE_e70443_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="perfume",
+            name="perfumes_isActiv_ecac9b_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="perfume",
+            name="perfumes_stockSt_7c7298_idx",
+        ),
+        migrations.AddIndex(
+            model_name="perfume",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="perfumes_recent_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="perfume",
+            index=models.Index(
+                condition=models.Q(("isActive", True)),
+                fields=["-created_at", "-id"],
+                name="perfumes_active_recent_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="perfume",
+            index=models.Index(
+                condition=models.Q(("isActive", True)),
+                fields=["brandEn", "-created_at", "-id"],
+                name="perfumes_act_brand_en_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="perfume",
+            index=models.Index(
+                condition=models.Q(("isActive", True)),
+                fields=["brandAr", "-created_at", "-id"],
+                name="perfumes_act_brand_ar_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="perfume",
+            index=models.Index(
+                condition=models.Q(("isActive", True)),
+                fields=["categoryEn", "-created_at", "-id"],
+                name="perfumes_act_cat_en_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="perfume",
+            index=models.Index(
+                condition=models.Q(("isActive", True)),
+                fields=["categoryAr", "-created_at", "-id"],
+                name="perfumes_act_cat_ar_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="perfume",
+            index=models.Index(
+                condition=models.Q(("isActive", True)),
+                fields=["genderEn", "-created_at", "-id"],
+                name="perfumes_act_gender_en_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="perfume",
+            index=models.Index(
+                condition=models.Q(("isActive", True)),
+                fields=["genderAr", "-created_at", "-id"],
+                name="perfumes_act_gender_ar_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="perfume",
+            index=models.Index(
+                django.db.models.functions.text.Upper("stockStatus"),
+                models.OrderBy(models.F("created_at"), descending=True),
+                models.OrderBy(models.F("id"), descending=True),
+                condition=models.Q(("isActive", True)),
+                name="perfumes_act_stock_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="perfume",
+            index=models.Index(
+                condition=models.Q(("isActive", True)),
+                fields=["nameEn"],
+                name="perfumes_act_name_en_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="perfume",
+            index=models.Index(
+                condition=models.Q(("isActive", True)),
+                fields=["nameAr"],
+                name="perfumes_act_name_ar_idx",
+            ),
+        ),
+    ]
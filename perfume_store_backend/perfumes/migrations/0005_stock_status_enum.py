@@ -0,0 +1,64 @@
+# Generated by Django 5.2.3 on 2026-10-17 19:58
+
+import perfume_store_backend.perfumes.models
+from django.db import migrations, models
+
+from perfume_store_backend.perfumes.models import StockStatus, parse_stock_status
+
+
+def _guess_stock_status(value):
+    """Canonical status for a stored free-form string; unrecognised text is read as available."""
+    stock_status = parse_stock_status(value)
+    if stock_status is not None:
+        return stock_status
+    text = (value or "").lower()
+    if "out" in text or "غير" in text:
+        return StockStatus.OUT_OF_STOCK
+    if "low" in text or "limited" in text or "محدود" in text:
+        return StockStatus.LOW_STOCK
+    return StockStatus.IN_STOCK
+
+
+def stock_status_to_codes(apps, schema_editor):
+    Perfume = apps.get_model("perfumes", "Perfume")
+    manager = Perfume.objects.using(schema_editor.connection.alias)
+    for value in list(manager.values_list("stockStatus", flat=True).distinct()):
+        manager.filter(stockStatus=value).update(stockStatus=str(int(_guess_stock_status(value))))
+
+
+def stock_status_to_labels(apps, schema_editor):
+    Perfume = apps.get_model("perfumes", "Perfume")
+    manager = Perfume.objects.using(schema_editor.connection.alias)
+    for stock_status in StockStatus:
+        manager.filter(stockStatus=str(int(stock_status))).update(stockStatus=stock_status.label)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("perfumes", "0004_query_shape_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="perfume",
+            name="perfumes_act_stock_idx",
+        ),
+        # Runs against the old varchar column, leaving "1"/"2"/"3" to be cast by AlterField
+        migrations.RunPython(stock_status_to_codes, stock_status_to_labels),
+        migrations.AlterField(
+            model_name="perfume",
+            name="stockStatus",
+            field=perfume_store_backend.perfumes.models.StockStatusField(
+                choices=[(1, "In Stock"), (2, "Low Stock"), (3, "Out of Stock")]
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="perfume",
+            index=models.Index(
+                condition=models.Q(("isActive", True)),
+                fields=["stockStatus", "-created_at", "-id"],
+                name="perfumes_act_stock_idx",
+            ),
+        ),
+    ]
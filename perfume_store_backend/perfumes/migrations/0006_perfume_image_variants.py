@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-17 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("perfumes", "0005_stock_status_enum"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="perfume",
+            name="imageSource",
+            field=models.URLField(
+                blank=True, default="", editable=False, max_length=500
+            ),
+        ),
+        migrations.AddField(
+            model_name="perfume",
+            name="imageVariants",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
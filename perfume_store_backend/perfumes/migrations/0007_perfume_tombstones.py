@@ -0,0 +1,35 @@
+# Generated by Django 5.2.3 on 2026-10-17 21:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("perfumes", "0006_perfume_image_variants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PerfumeTombstone",
+            fields=[
+                ("perfume_id", models.UUIDField(primary_key=True, serialize=False)),
+                ("deleted_at", models.DateTimeField()),
+            ],
+            options={
+                "db_table": "perfume_tombstones",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="perfume",
+            index=models.Index(
+                fields=["updated_at", "id"], name="perfumes_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="perfumetombstone",
+            index=models.Index(
+                fields=["deleted_at", "perfume_id"], name="perfume_tombstones_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-17 21:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("perfumes", "0007_perfume_tombstones"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="perfume",
+            index=models.Index(
+                condition=models.Q(("isActive", True), ("isNew", True)),
+                fields=["-created_at", "-id"],
+                name="perfumes_act_new_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="perfume",
+            index=models.Index(
+                condition=models.Q(("isActive", True), ("isBestseller", True)),
+                fields=["-created_at", "-id"],
+                name="perfumes_act_bestseller_idx",
+            ),
+        ),
+    ]
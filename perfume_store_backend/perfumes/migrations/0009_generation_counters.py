@@ -0,0 +1,26 @@
+# Generated by Django 5.2.3 on 2026-10-17 21:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("perfumes", "0008_homepage_rail_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GenerationCounter",
+            fields=[
+                (
+                    "key",
+                    models.CharField(max_length=100, primary_key=True, serialize=False),
+                ),
+                ("value", models.BigIntegerField()),
+            ],
+            options={
+                "db_table": "generation_counters",
+            },
+        ),
+    ]
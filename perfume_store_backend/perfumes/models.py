@@ -1,5 +1,89 @@
+import re
 import uuid
+from decimal import Decimal
 from django.db import models
+from django.db.models import Q
+from .normalization import build_search_document, SEARCH_DOCUMENT_FIELDS
+
+def price_range(sizes):
+    """(lowest, highest) priceEGP across a perfume's sizes, or (None, None) if it has none."""
+    prices = [
+        Decimal(str(size['priceEGP'])).quantize(Decimal('0.01'))
+        for size in sizes or ()
+        if isinstance(size, dict) and size.get('priceEGP') is not None
+    ]
+    if not prices:
+        return None, None
+    return min(prices), max(prices)
+
+class StockStatus(models.IntegerChoices):
+    """Stored as a small integer; the label is what the API has always returned."""
+    IN_STOCK = 1, 'In Stock'
+    LOW_STOCK = 2, 'Low Stock'
+    OUT_OF_STOCK = 3, 'Out of Stock'
+
+# Stored integer -> display label
+STOCK_STATUS_LABELS = dict(StockStatus.choices)
+
+# Accepted spellings (after lowercasing and joining words with "_") -> status.
+# Covers the `stockStatusFilter` codes, the display labels and the storefront's Arabic labels.
+STOCK_STATUS_ALIASES = {
+    **{status.name.lower(): status for status in StockStatus},
+    'available': StockStatus.IN_STOCK,
+    'متوفر': StockStatus.IN_STOCK,
+    'limited_stock': StockStatus.LOW_STOCK,
+    'كمية_محدودة': StockStatus.LOW_STOCK,
+    'sold_out': StockStatus.OUT_OF_STOCK,
+    'unavailable': StockStatus.OUT_OF_STOCK,
+    'غير_متوفر': StockStatus.OUT_OF_STOCK,
+}
+
+def parse_stock_status(value):
+    """StockStatus for a code, label or stored integer in any common spelling, or None if unknown."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return StockStatus(value) if value in StockStatus.values else None
+    if not isinstance(value, str):
+        return None
+    key = re.sub(r'[\s_-]+', '_', value.strip().lower())
+    if key.isdigit():
+        return parse_stock_status(int(key))
+    return STOCK_STATUS_ALIASES.get(key)
+
+class StockStatusField(models.PositiveSmallIntegerField):
+    """
+    StockStatus column that also accepts codes and labels on the way in, so
+    `Perfume(stockStatus='In Stock')` and `.filter(stockStatus='out_of_stock')`
+    both store and compare the canonical integer.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('choices', StockStatus.choices)
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        if value is None:
+            return value
+        stock_status = parse_stock_status(value)
+        if stock_status is None:
+            return super().to_python(value)
+        return stock_status
+
+    def get_prep_value(self, value):
+        if value is None:
+            return value
+        stock_status = parse_stock_status(value)
+        if stock_status is None:
+            raise ValueError(f"Field '{self.name}' expected a stock status but got {value!r}.")
+        return int(stock_status)
+
+# `sort` values -> ORDER BY. Price sorting uses the "from" (lowest size) price.
+SORT_ORDERINGS = {
+    'newest': ('-created_at',),
+    'price_asc': ('minPriceEGP', '-created_at'),
+    'price_desc': ('-minPriceEGP', '-created_at'),
+    'name': ('nameEn', '-created_at'),
+    'name_ar': ('nameAr', '-created_at'),
+}
 
 class Perfume(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -14,23 +98,95 @@ class Perfume(models.Model):
     descriptionEn = models.TextField()
     descriptionAr = models.TextField()
     sizes = models.JSONField() # Stores array of {"size": "50ml", "priceEGP": 100.0}
-    stockStatus = models.CharField(max_length=50)
+    stockStatus = StockStatusField()
     imageUrl = models.URLField(max_length=500, blank=True, null=True)
     isNew = models.BooleanField(default=False)
     isBestseller = models.BooleanField(default=False)
     isActive = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Normalized name/brand/description text in both languages, indexed for search
+    searchDocument = models.TextField(blank=True, default='', editable=False)
+    # Cheapest / dearest entry of `sizes`, kept in sync so price filters and sorting can use indexes
+    minPriceEGP = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, editable=False)
+    maxPriceEGP = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, editable=False)
+    # Resized copies of the image, {"webp": {"320": url, ...}, "jpeg": {...}}, made in the
+    # background (perfumes/images.py) from `imageSource`, and dropped when imageUrl changes
+    imageVariants = models.JSONField(default=dict, blank=True, editable=False)
+    imageSource = models.URLField(max_length=500, blank=True, default='', editable=False)
+
+    # Columns computed from other columns, and the columns they are computed from
+    DERIVED_FIELDS = ('searchDocument', 'minPriceEGP', 'maxPriceEGP', 'imageVariants')
+    DERIVED_FROM_FIELDS = SEARCH_DOCUMENT_FIELDS + ('sizes', 'imageUrl')
 
     def __str__(self):
         return self.nameEn
 
+    def compute_search_document(self):
+        return build_search_document({field: getattr(self, field) for field in SEARCH_DOCUMENT_FIELDS})
+
+    def update_derived_fields(self):
+        """Recompute DERIVED_FIELDS; paths that bypass save() (bulk writes) must call this."""
+        self.searchDocument = self.compute_search_document()
+        self.minPriceEGP, self.maxPriceEGP = price_range(self.sizes)
+        if self.imageSource != (self.imageUrl or ''):
+            self.imageVariants = {}
+
+    def save(self, *args, **kwargs):
+        self.update_derived_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | set(self.DERIVED_FIELDS)
+        super().save(*args, **kwargs)
+
     class Meta:
         db_table = "perfumes"
+        # Public queries are all `WHERE isActive AND <filters> ORDER BY created_at DESC, id DESC`,
+        # so each filter column gets a partial index that also delivers that order and the
+        # planner can read the first page straight off the index instead of sorting.
         indexes = [
-            models.Index(fields=['brandEn']),
-            models.Index(fields=['categoryEn']),
-            models.Index(fields=['genderEn']),
-            models.Index(fields=['isActive']),
-            models.Index(fields=['stockStatus']),
+            models.Index(fields=['-created_at', '-id'], name='perfumes_recent_idx'),
+            # Incremental sync (perfumes/changes.py) scans every row, active or not, by last change
+            models.Index(fields=['updated_at', 'id'], name='perfumes_updated_idx'),
+            models.Index(fields=['-created_at', '-id'], name='perfumes_active_recent_idx', condition=Q(isActive=True)),
+            models.Index(fields=['brandEn', '-created_at', '-id'], name='perfumes_act_brand_en_idx', condition=Q(isActive=True)),
+            models.Index(fields=['brandAr', '-created_at', '-id'], name='perfumes_act_brand_ar_idx', condition=Q(isActive=True)),
+            models.Index(fields=['categoryEn', '-created_at', '-id'], name='perfumes_act_cat_en_idx', condition=Q(isActive=True)),
+            models.Index(fields=['categoryAr', '-created_at', '-id'], name='perfumes_act_cat_ar_idx', condition=Q(isActive=True)),
+            models.Index(fields=['genderEn', '-created_at', '-id'], name='perfumes_act_gender_en_idx', condition=Q(isActive=True)),
+            models.Index(fields=['genderAr', '-created_at', '-id'], name='perfumes_act_gender_ar_idx', condition=Q(isActive=True)),
+            models.Index(fields=['stockStatus', '-created_at', '-id'], name='perfumes_act_stock_idx', condition=Q(isActive=True)),
+            # Few perfumes carry these flags, so the homepage rails (perfumes/rails.py) get small indexes of just them
+            models.Index(fields=['-created_at', '-id'], name='perfumes_act_new_idx', condition=Q(isActive=True, isNew=True)),
+            models.Index(fields=['-created_at', '-id'], name='perfumes_act_bestseller_idx', condition=Q(isActive=True, isBestseller=True)),
+            models.Index(fields=['minPriceEGP'], name='perfumes_active_price_idx', condition=Q(isActive=True)),
+            models.Index(fields=['nameEn'], name='perfumes_act_name_en_idx', condition=Q(isActive=True)),
+            models.Index(fields=['nameAr'], name='perfumes_act_name_ar_idx', condition=Q(isActive=True)),
         ]
+
+
+class PerfumeTombstone(models.Model):
+    """A deleted perfume, remembered for a while so incremental sync clients hear of the deletion."""
+    perfume_id = models.UUIDField(primary_key=True)
+    deleted_at = models.DateTimeField()
+
+    def __str__(self):
+        return str(self.perfume_id)
+
+    class Meta:
+        db_table = "perfume_tombstones"
+        indexes = [
+            models.Index(fields=['deleted_at', 'perfume_id'], name='perfume_tombstones_idx'),
+        ]
+
+
+class GenerationCounter(models.Model):
+    """A generation counter (see `catalog.get_generation`), kept where every worker sees it."""
+    key = models.CharField(max_length=100, primary_key=True)
+    value = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.key}={self.value}"
+
+    class Meta:
+        db_table = "generation_counters"
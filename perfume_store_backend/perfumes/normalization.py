@@ -0,0 +1,47 @@
+import re
+import unicodedata
+
+# Arabic short vowels, tanween, shadda, sukun, superscript alef and tatweel
+# carry no meaning for matching and are rarely typed in search boxes.
+ARABIC_DIACRITICS_RE = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+
+# Letter variants that users type interchangeably.
+ARABIC_LETTER_MAP = str.maketrans({
+    'آ': 'ا',  # alef with madda -> alef
+    'أ': 'ا',  # alef with hamza above -> alef
+    'إ': 'ا',  # alef with hamza below -> alef
+    'ٱ': 'ا',  # alef wasla -> alef
+    'ى': 'ي',  # alef maksura -> ya
+    'ئ': 'ي',  # ya with hamza -> ya
+    'ؤ': 'و',  # waw with hamza -> waw
+    'ة': 'ه',  # taa marbuta -> ha
+})
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Columns folded into the stored search document, in order.
+SEARCH_DOCUMENT_FIELDS = ('nameEn', 'nameAr', 'brandEn', 'brandAr', 'descriptionEn', 'descriptionAr')
+
+
+def normalize_search_text(text):
+    """
+    Fold `text` for matching: lowercase, strip Latin accents and Arabic
+    diacritics, unify alef/ya/taa-marbuta variants and collapse whitespace.
+    The same function is applied to documents and queries.
+    """
+    if not text:
+        return ''
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    text = ARABIC_DIACRITICS_RE.sub('', text)
+    text = text.translate(ARABIC_LETTER_MAP).lower()
+    return ' '.join(text.split())
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(normalize_search_text(text))
+
+
+def build_search_document(values):
+    """Normalized text indexed for search, built from a {column: value} mapping."""
+    return normalize_search_text(' '.join(values.get(field) or '' for field in SEARCH_DOCUMENT_FIELDS))
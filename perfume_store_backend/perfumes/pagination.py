@@ -0,0 +1,140 @@
+import base64
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .catalog import aget_catalog_generation, get_catalog_generation
+
+# How long a filtered COUNT(*) is reused by cursor-paginated lists.
+COUNT_CACHE_TIMEOUT = getattr(settings, 'PERFUME_COUNT_CACHE_TIMEOUT', 60)
+
+# Keyset order used by cursor pagination; `id` breaks ties between rows
+# created in the same instant.
+CURSOR_ORDERING = ('-created_at', '-id')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _row_key(row):
+    """(created_at, id) of a model instance or a `.values()` row."""
+    if isinstance(row, dict):
+        return row['created_at'], row['id']
+    return row.created_at, row.id
+
+
+def encode_cursor(row, direction):
+    created_at, perfume_id = _row_key(row)
+    payload = {
+        "c": created_at.isoformat(),
+        "i": str(perfume_id),
+        "d": direction,
+    }
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        created_at = parse_datetime(payload['c'])
+        perfume_id = uuid.UUID(payload['i'])
+        direction = payload['d']
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor("Invalid cursor.")
+    if created_at is None or direction not in ('next', 'prev'):
+        raise InvalidCursor("Invalid cursor.")
+    return created_at, perfume_id, direction
+
+
+def _cursor_query(queryset, cursor, limit):
+    """The keyset query for one page (plus one look-ahead row), and the cursor it continues from."""
+    if cursor:
+        created_at, perfume_id, direction = decode_cursor(cursor)
+    else:
+        created_at, perfume_id, direction = None, None, 'next'
+
+    if direction == 'next':
+        queryset = queryset.order_by(*CURSOR_ORDERING)
+        if created_at is not None:
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=perfume_id)
+            )
+    else:
+        queryset = queryset.order_by('created_at', 'id').filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=perfume_id)
+        )
+    return queryset[:limit + 1], created_at, direction
+
+
+def _cursor_page(rows, limit, created_at, direction):
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == 'next':
+        has_next, has_prev = has_more, created_at is not None
+    else:
+        rows.reverse()
+        has_next, has_prev = True, has_more
+
+    pagination = {
+        "nextCursor": encode_cursor(rows[-1], 'next') if rows and has_next else None,
+        "prevCursor": encode_cursor(rows[0], 'prev') if rows and has_prev else None,
+        "hasNext": has_next,
+        "hasPrev": has_prev,
+    }
+    return rows, pagination
+
+
+def paginate_by_cursor(queryset, cursor, limit):
+    """
+    Return one keyset page of `queryset` as (rows, pagination).
+
+    Rows are ordered newest first. Instead of an OFFSET, the page is located
+    with a `(created_at, id)` comparison against the cursor, so fetching page
+    1000 costs the same index range scan as fetching page 1. One extra row is
+    read to know whether another page follows. `queryset` may be a
+    `.values()` queryset as long as it selects `created_at` and `id`.
+    """
+    page_query, created_at, direction = _cursor_query(queryset, cursor, limit)
+    return _cursor_page(list(page_query), limit, created_at, direction)
+
+
+async def apaginate_by_cursor(queryset, cursor, limit):
+    """Async `paginate_by_cursor()`."""
+    page_query, created_at, direction = _cursor_query(queryset, cursor, limit)
+    return _cursor_page([row async for row in page_query], limit, created_at, direction)
+
+
+def cached_count(queryset, signature):
+    """
+    COUNT(*) of `queryset`, reused per filter signature until the catalog
+    changes or COUNT_CACHE_TIMEOUT seconds pass.
+    """
+    cache_key = _count_cache_key(get_catalog_generation(), signature)
+    total = cache.get(cache_key)
+    if total is None:
+        total = queryset.count()
+        cache.set(cache_key, total, COUNT_CACHE_TIMEOUT)
+    return total
+
+
+async def acached_count(queryset, signature):
+    """Async `cached_count()`."""
+    cache_key = _count_cache_key(await aget_catalog_generation(), signature)
+    total = await cache.aget(cache_key)
+    if total is None:
+        total = await queryset.acount()
+        await cache.aset(cache_key, total, COUNT_CACHE_TIMEOUT)
+    return total
+
+
+def _count_cache_key(generation, signature):
+    digest = hashlib.sha1(repr((generation, signature)).encode('utf-8')).hexdigest()
+    return f"perfume_count_{digest}"
@@ -0,0 +1,143 @@
+"""
+Homepage collections (rails).
+
+`get_collections(language)` returns the rails the storefront's homepage
+shows: the newest perfumes flagged isNew ("new") and isBestseller
+("bestseller"), and the newest perfumes of each of the COLLECTION_GROUPS
+brands and categories with the most active perfumes. Each rail is one
+query reading the first COLLECTION_RAIL_SIZE rows of a partial index
+(perfumes_act_new_idx, perfumes_act_bestseller_idx, or the brand and
+category indexes).
+
+The rails of each language are kept together in the shared cache, tagged
+with the catalog generation they are current for; a reader that finds them
+tagged with another generation queries them all again. The admin write
+that bumps the generation carries them forward instead
+(`collections_changed`): only the rails that held one of the written
+perfumes, or that one of them now belongs in, are queried again, and the
+others are kept as they are.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from .catalog import get_catalog_generation
+from .facets import FACET_FIELDS, LANGUAGES, facet_index, normalize_language
+from .models import Perfume
+from .serializers import public_perfume_projection
+
+# Perfumes per rail
+COLLECTION_RAIL_SIZE = getattr(settings, 'COLLECTION_RAIL_SIZE', 12)
+
+# Brand rails and category rails, for the brands/categories with the most perfumes
+COLLECTION_GROUPS = getattr(settings, 'COLLECTION_GROUPS', 6)
+
+# Rails are replaced when the catalog changes; this bounds how long a change
+# made outside the admin API (which does not carry them forward) goes unseen
+COLLECTION_CACHE_TIMEOUT = getattr(settings, 'COLLECTION_CACHE_TIMEOUT', 10 * 60)
+
+# Rails on a flag, with the column it is on
+FLAG_RAILS = {'new': 'isNew', 'bestseller': 'isBestseller'}
+
+# Grouped rails: facet name per response key
+GROUP_RAILS = {'brands': 'brand', 'categories': 'category'}
+
+# Columns `collections_changed` reads to tell which rails a written perfume belongs in
+_MEMBERSHIP_COLUMNS = ('id', 'isActive', 'created_at', *FLAG_RAILS.values(), *(
+    column for facet in GROUP_RAILS.values() for column in FACET_FIELDS[facet].values()
+))
+
+
+def _cache_key(language):
+    return f'collections_{language}'
+
+
+def _rail_filter(rail, language):
+    """The column equalities (beyond isActive) that make a perfume a candidate for `rail`."""
+    kind, value = rail
+    if kind in FLAG_RAILS:
+        return {FLAG_RAILS[kind]: True}
+    return {FACET_FIELDS[GROUP_RAILS[kind]][language]: value}
+
+
+def _query_rail(rail, language):
+    queryset = Perfume.objects.filter(isActive=True, **_rail_filter(rail, language))
+    columns = public_perfume_projection.columns
+    return list(queryset.order_by('-created_at', '-id').values(*columns, 'created_at')[:COLLECTION_RAIL_SIZE])
+
+
+def _top_groups(facet, language):
+    counts = facet_index.counts(facet, language)
+    ranked = sorted((value for value in counts if value), key=lambda value: (-counts[value], value))
+    return ranked[:COLLECTION_GROUPS]
+
+
+def _rails(language):
+    """The rails shown in `language`, as (kind, value) pairs."""
+    rails = [(kind, None) for kind in FLAG_RAILS]
+    for kind, facet in GROUP_RAILS.items():
+        rails += [(kind, value) for value in _top_groups(facet, language)]
+    return rails
+
+
+def _affected(rail, rows, language, written_ids, written_rows):
+    """Whether a write of `written_ids` (now `written_rows`) can change `rail`, currently `rows`."""
+    if any(row['id'] in written_ids for row in rows):
+        return True
+    filters = _rail_filter(rail, language)
+    last = (rows[-1]['created_at'], rows[-1]['id']) if len(rows) >= COLLECTION_RAIL_SIZE else None
+    return any(
+        row['isActive'] and all(row[column] == value for column, value in filters.items())
+        and (last is None or (row['created_at'], row['id']) > last)
+        for row in written_rows
+    )
+
+
+def _build(language, generation, previous=None, written_ids=(), written_rows=()):
+    rails = {}
+    for rail in _rails(language):
+        rows = previous.get(rail) if previous is not None else None
+        if rows is None or _affected(rail, rows, language, written_ids, written_rows):
+            rows = _query_rail(rail, language)
+        rails[rail] = rows
+    entry = {'generation': generation, 'rails': rails}
+    cache.set(_cache_key(language), entry, COLLECTION_CACHE_TIMEOUT)
+    return entry
+
+
+def get_collections(language):
+    """
+    {"new": rows, "bestseller": rows, "brands": [(name, rows), ...],
+    "categories": [...]} for `language`, with rows from `.values()` for
+    the public projection.
+    """
+    language = normalize_language(language)
+    generation = get_catalog_generation()
+    entry = cache.get(_cache_key(language))
+    if entry is None or entry['generation'] != generation:
+        entry = _build(language, generation)
+    collections = {kind: [] for kind in GROUP_RAILS}
+    for (kind, value), rows in entry['rails'].items():
+        if kind in FLAG_RAILS:
+            collections[kind] = rows
+        elif rows:
+            collections[kind].append((value, rows))
+    return collections
+
+
+def collections_changed(generation, updated_ids=(), deleted_ids=()):
+    """
+    Carry the cached rails from the previous generation over to `generation`
+    after an admin write, re-querying only the rails the write touched.
+    Rails that are not current for the previous generation (another write
+    got in between) are left for the next reader to rebuild.
+    """
+    entries = cache.get_many([_cache_key(language) for language in LANGUAGES])
+    written_ids = set(updated_ids) | set(deleted_ids)
+    written_rows = None
+    for language in LANGUAGES:
+        entry = entries.get(_cache_key(language))
+        if entry is None or entry['generation'] != generation - 1:
+            continue
+        if written_rows is None:
+            written_rows = list(Perfume.objects.filter(id__in=updated_ids).values(*_MEMBERSHIP_COLUMNS)) if updated_ids else []
+        _build(language, generation, entry['rails'], written_ids, written_rows)
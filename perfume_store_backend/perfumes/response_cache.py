@@ -0,0 +1,198 @@
+import hashlib
+from functools import wraps
+from urllib.parse import urlencode
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+
+from perfume_store_backend.compression import CACHED_LEVELS, compress, negotiate_encoding, should_compress
+
+from .catalog import aget_catalog_generation, get_catalog_generation
+
+# How long a rendered catalog response is kept. Entries are keyed by the
+# catalog generation, so this only bounds memory, not staleness.
+CATALOG_RESPONSE_CACHE_TIMEOUT = getattr(settings, 'CATALOG_RESPONSE_CACHE_TIMEOUT', 60 * 60)
+
+# max-age sent to browsers and the CDN; after it expires they revalidate
+# with If-None-Match and usually get a 304.
+CATALOG_RESPONSE_MAX_AGE = getattr(settings, 'CATALOG_RESPONSE_MAX_AGE', 60)
+
+# Cache-busting parameters that never change the response.
+IGNORED_QUERY_PARAMS = {'t', '_'}
+
+
+def _normalized_query(request):
+    """Query string with cache-busting parameters dropped and the rest sorted."""
+    items = sorted(
+        (name, value)
+        for name, values in request.GET.lists()
+        if name not in IGNORED_QUERY_PARAMS
+        for value in values
+    )
+    return urlencode(items)
+
+
+def _set_cache_headers(response, etag):
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=CATALOG_RESPONSE_MAX_AGE)
+    patch_vary_headers(response, ['Accept', 'Accept-Encoding'])
+
+
+def _response_key(request, generation, encoding=None):
+    """(ETag, cache key) of a catalog response under `generation`, as sent with `encoding`."""
+    key_material = '\n'.join([
+        str(generation), request.path, _normalized_query(request), request.META.get('HTTP_ACCEPT', ''),
+        encoding or '',
+    ])
+    digest = hashlib.sha256(key_material.encode('utf-8')).hexdigest()
+    return f'"{digest[:32]}"', f"catalog_response_{digest}"
+
+
+def _not_modified(request, etag):
+    if etag not in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+        return None
+    response = HttpResponseNotModified()
+    _set_cache_headers(response, etag)
+    return response
+
+
+def _cached_response(cached):
+    content_type, body, content_encoding = cached
+    response = HttpResponse(body)
+    if content_type is None:
+        # Empty bodies (e.g. the detail view's `null` for a missing id) carry no Content-Type
+        del response['Content-Type']
+    else:
+        response['Content-Type'] = content_type
+    if content_encoding is not None:
+        response['Content-Encoding'] = content_encoding
+    return response
+
+
+def _cacheable(response):
+    """(Content-Type, body, None) to store for a fresh response, or None if it must not be stored."""
+    if hasattr(response, 'render'):
+        response.render()
+    if response.status_code != 200 or 'no-store' in response.get('Cache-Control', ''):
+        # e.g. answered from an outdated catalog snapshot during a database outage
+        return None
+    return response.get('Content-Type'), response.content, None
+
+
+def _encoded(cached, encoding):
+    """The entry to store for clients that accept `encoding`: compressed, or as is when that does not pay."""
+    content_type, body, _ = cached
+    if not should_compress(content_type, len(body)):
+        return cached
+    compressed = compress(body, encoding, CACHED_LEVELS[encoding])
+    if len(compressed) >= len(body):
+        return cached
+    return content_type, compressed, encoding
+
+
+def cache_catalog_response(view_func):
+    """
+    Cache a public catalog view's rendered responses under the catalog generation.
+
+    The key (and the strong ETag derived from it) covers the catalog
+    generation, the path, the normalized query, the Accept header and the
+    content coding negotiated from Accept-Encoding, so it changes exactly
+    when the body could. A matching If-None-Match is answered with 304
+    before the view runs; otherwise a cached body is returned without
+    touching the database or the serializers. Only 200 responses are stored.
+
+    Each coding has its own entry, compressed once when it is stored, so a
+    hit costs one cache read and no compression. Its uncompressed body is
+    looked up (or rendered) only on a miss. Async views get an async
+    wrapper that uses the async cache API.
+    """
+    if iscoroutinefunction(view_func):
+        return _async_cache_catalog_response(view_func)
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view_func(request, *args, **kwargs)
+
+        try:
+            generation = get_catalog_generation()
+        except DatabaseError:
+            # Nothing to key the cache by; the view answers from the snapshot or reports the outage
+            return view_func(request, *args, **kwargs)
+        encoding = negotiate_encoding(request)
+        etag, cache_key = _response_key(request, generation, encoding)
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        response = None
+        cached = cache.get(cache_key)
+        if cached is None:
+            identity_key = cache_key
+            if encoding is not None:
+                # Another coding's entry may have stored the uncompressed body already
+                identity_key = _response_key(request, generation)[1]
+                cached = cache.get(identity_key)
+            if cached is None:
+                response = view_func(request, *args, **kwargs)
+                cached = _cacheable(response)
+                if cached is None:
+                    return response
+                cache.set(identity_key, cached, CATALOG_RESPONSE_CACHE_TIMEOUT)
+            if encoding is not None:
+                cached = _encoded(cached, encoding)
+                cache.set(cache_key, cached, CATALOG_RESPONSE_CACHE_TIMEOUT)
+        if response is None or cached[2] is not None:
+            # Send the stored bytes, unless the view's own response is what was stored
+            response = _cached_response(cached)
+        _set_cache_headers(response, etag)
+        return response
+
+    return wrapper
+
+
+def _async_cache_catalog_response(view_func):
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await view_func(request, *args, **kwargs)
+
+        try:
+            generation = await aget_catalog_generation()
+        except DatabaseError:
+            return await view_func(request, *args, **kwargs)
+        encoding = negotiate_encoding(request)
+        etag, cache_key = _response_key(request, generation, encoding)
+        not_modified = _not_modified(request, etag)
+        if not_modified is not None:
+            return not_modified
+
+        response = None
+        cached = await cache.aget(cache_key)
+        if cached is None:
+            identity_key = cache_key
+            if encoding is not None:
+                # Another coding's entry may have stored the uncompressed body already
+                identity_key = _response_key(request, generation)[1]
+                cached = await cache.aget(identity_key)
+            if cached is None:
+                response = await view_func(request, *args, **kwargs)
+                cached = _cacheable(response)
+                if cached is None:
+                    return response
+                await cache.aset(identity_key, cached, CATALOG_RESPONSE_CACHE_TIMEOUT)
+            if encoding is not None:
+                cached = _encoded(cached, encoding)
+                await cache.aset(cache_key, cached, CATALOG_RESPONSE_CACHE_TIMEOUT)
+        if response is None or cached[2] is not None:
+            # Send the stored bytes, unless the view's own response is what was stored
+            response = _cached_response(cached)
+        _set_cache_headers(response, etag)
+        return response
+
+    return wrapper
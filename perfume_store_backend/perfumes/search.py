@@ -0,0 +1,171 @@
+import functools
+import operator
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, When, Value, FloatField, IntegerField, Q
+from django.db.models.functions import Lower
+
+from .catalog import CatalogIndex
+from .models import Perfume
+from .normalization import normalize_search_text, tokenize
+
+# Upper bound on ranked matches returned by the in-process engine.
+SEARCH_MAX_RESULTS = getattr(settings, 'PERFUME_SEARCH_MAX_RESULTS', 500)
+
+# Minimum trigram similarity for a misspelt token to still count as a match
+# (pg_trgm's default word_similarity_threshold is 0.6).
+FUZZY_THRESHOLD = getattr(settings, 'PERFUME_SEARCH_FUZZY_THRESHOLD', 0.5)
+
+# Relative weight of a hit in each column, for both rankings.
+FIELD_WEIGHTS = {
+    'nameEn': 4, 'nameAr': 4,
+    'brandEn': 2, 'brandAr': 2,
+    'descriptionEn': 1, 'descriptionAr': 1,
+}
+
+
+def trigrams(token):
+    """Trigrams of a single word, padded the way pg_trgm pads them."""
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class InvertedSearchIndex(CatalogIndex):
+    """
+    In-process inverted index over the searchable columns of active perfumes.
+
+    Used where PostgreSQL's pg_trgm is not available (SQLite test runs and
+    local development). Tokens map to the perfumes containing them with a
+    field weight, and a trigram -> token table finds prefix, substring and
+    misspelt matches without scanning the vocabulary.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._postings = defaultdict(dict)   # token -> {perfume id: weight}
+        self._trigrams = defaultdict(set)    # trigram -> set of tokens
+        self._documents = {}                 # perfume id -> set of tokens
+
+    def _rebuild(self):
+        self._postings = defaultdict(dict)
+        self._trigrams = defaultdict(set)
+        self._documents = {}
+        for row in Perfume.objects.filter(isActive=True).values('id', *FIELD_WEIGHTS):
+            self._add(row)
+
+    def _add(self, row):
+        weights = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(row[field]):
+                weights[token] = max(weights.get(token, 0), weight)
+        for token, weight in weights.items():
+            if token not in self._postings:
+                for trigram in trigrams(token):
+                    self._trigrams[trigram].add(token)
+            self._postings[token][row['id']] = weight
+        self._documents[row['id']] = set(weights)
+
+    def _discard(self, perfume_id):
+        for token in self._documents.pop(perfume_id, ()):
+            postings = self._postings[token]
+            postings.pop(perfume_id, None)
+            if not postings:
+                del self._postings[token]
+                for trigram in trigrams(token):
+                    self._trigrams[trigram].discard(token)
+
+    def _refresh(self, perfume_ids):
+        for perfume_id in perfume_ids:
+            self._discard(perfume_id)
+        for row in Perfume.objects.filter(id__in=perfume_ids, isActive=True).values('id', *FIELD_WEIGHTS):
+            self._add(row)
+
+    def _remove(self, perfume_ids):
+        for perfume_id in perfume_ids:
+            self._discard(perfume_id)
+
+    def _matching_tokens(self, query_token):
+        """Vocabulary tokens matching `query_token`, with a similarity score in (0, 1]."""
+        query_trigrams = trigrams(query_token)
+        shared = defaultdict(int)
+        for trigram in query_trigrams:
+            for token in self._trigrams.get(trigram, ()):
+                shared[token] += 1
+        matches = {}
+        for token, common in shared.items():
+            if query_token in token:
+                matches[token] = 1.0 if token.startswith(query_token) else 0.8
+                continue
+            similarity = common / len(query_trigrams | trigrams(token))
+            if similarity >= FUZZY_THRESHOLD:
+                matches[token] = similarity
+        return matches
+
+    def search(self, term, limit=SEARCH_MAX_RESULTS):
+        """Ids of active perfumes matching every word of `term`, best match first."""
+        query_tokens = tokenize(term)
+        if not query_tokens:
+            return []
+        self._ensure_built()
+        with self._lock:
+            scores = None
+            for query_token in query_tokens:
+                token_scores = defaultdict(float)
+                for token, similarity in self._matching_tokens(query_token).items():
+                    for perfume_id, weight in self._postings[token].items():
+                        token_scores[perfume_id] = max(token_scores[perfume_id], weight * similarity)
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {pk: score + token_scores[pk] for pk, score in scores.items() if pk in token_scores}
+                if not scores:
+                    return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], str(item[0])))
+        return [perfume_id for perfume_id, score in ranked[:limit]]
+
+
+search_index = InvertedSearchIndex()
+
+
+def uses_postgres_search():
+    return connection.vendor == 'postgresql'
+
+
+def apply_search(queryset, term):
+    """
+    Narrow `queryset` to perfumes matching `term`, ordered by relevance.
+
+    On PostgreSQL this matches the normalized `searchDocument` column, which
+    carries pg_trgm GIN indexes: substring hits use `LIKE` and misspellings
+    the `%>` word-similarity operator. Matches are ranked by the
+    `word_similarity` of the term to each column, weighted by FIELD_WEIGHTS
+    as the in-process ranking is, so a name hit outranks a description hit
+    on both. The columns are only lowercased for ranking, not normalized,
+    so an accent or Arabic letter variant costs a little rank there.
+    Elsewhere the in-process index resolves the ids.
+    """
+    normalized = normalize_search_text(term)
+    if not normalized:
+        return queryset
+    if uses_postgres_search():
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        return queryset.filter(
+            Q(searchDocument__contains=normalized) | Q(searchDocument__trigram_word_similar=normalized)
+        ).annotate(
+            search_rank=functools.reduce(operator.add, [
+                Value(float(weight), output_field=FloatField()) * TrigramWordSimilarity(normalized, Lower(field))
+                for field, weight in FIELD_WEIGHTS.items()
+            ])
+        ).order_by('-search_rank', '-created_at')
+
+    perfume_ids = search_index.search(normalized)
+    if not perfume_ids:
+        return queryset.none()
+    ordering = Case(
+        *[When(id=perfume_id, then=Value(position)) for position, perfume_id in enumerate(perfume_ids)],
+        output_field=IntegerField(),
+    )
+    return queryset.filter(id__in=perfume_ids).annotate(search_rank=ordering).order_by('search_rank')
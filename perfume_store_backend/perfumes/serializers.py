@@ -1,10 +1,49 @@
 from rest_framework import serializers
 
+from perfume_store_backend.instrumentation import timed
+from .models import STOCK_STATUS_LABELS, parse_stock_status
+
+class StockStatusField(serializers.Field):
+    """Reads as the display label ("In Stock"); accepts labels, filter codes or the stored integer."""
+    default_error_messages = {
+        'invalid_choice': '"{input}" is not a valid stock status.',
+    }
+
+    def to_internal_value(self, data):
+        stock_status = parse_stock_status(data)
+        if stock_status is None:
+            self.fail('invalid_choice', input=data)
+        return stock_status
+
+    def to_representation(self, value):
+        label = STOCK_STATUS_LABELS.get(value)
+        if label is None:
+            stock_status = parse_stock_status(value)
+            label = value if stock_status is None else stock_status.label
+        return label
+
 class PerfumeSizeSerializer(serializers.Serializer):
     size = serializers.CharField(max_length=50)
     priceEGP = serializers.FloatField()
 
-class PublicPerfumeSerializer(serializers.Serializer):
+class TimedListSerializer(serializers.ListSerializer):
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
+
+class TimedSerializer(serializers.Serializer):
+    """Serializer whose output time is reported as the request's `serialize` phase."""
+
+    class Meta:
+        list_serializer_class = TimedListSerializer
+
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
+
+class PublicPerfumeSerializer(TimedSerializer):
     """Serializer for public consumption, excludes internal fields like isActive."""
     id = serializers.UUIDField(read_only=True)
     nameEn = serializers.CharField(max_length=255)
@@ -18,12 +57,13 @@ class PublicPerfumeSerializer(serializers.Serializer):
     descriptionEn = serializers.CharField()
     descriptionAr = serializers.CharField()
     sizes = serializers.ListField(child=PerfumeSizeSerializer())
-    stockStatus = serializers.CharField(max_length=50)
+    stockStatus = StockStatusField()
     imageUrl = serializers.URLField(max_length=500, allow_blank=True, allow_null=True)
+    imageVariants = serializers.JSONField(read_only=True)
     isNew = serializers.BooleanField(default=False)
     isBestseller = serializers.BooleanField(default=False)
 
-class AdminPerfumeSerializer(serializers.Serializer):
+class AdminPerfumeSerializer(TimedSerializer):
     """Serializer for admin use, includes all fields."""
     id = serializers.UUIDField(read_only=True)
     nameEn = serializers.CharField(max_length=255)
@@ -37,8 +77,103 @@ class AdminPerfumeSerializer(serializers.Serializer):
     descriptionEn = serializers.CharField()
     descriptionAr = serializers.CharField()
     sizes = serializers.ListField(child=PerfumeSizeSerializer())
-    stockStatus = serializers.CharField(max_length=50)
+    stockStatus = StockStatusField()
     imageUrl = serializers.URLField(max_length=500, allow_blank=True, allow_null=True)
+    imageVariants = serializers.JSONField(read_only=True)
     isNew = serializers.BooleanField(default=False)
     isBestseller = serializers.BooleanField(default=False)
     isActive = serializers.BooleanField(default=True)
+
+
+class CompiledSerializer:
+    """
+    Read-only fast path for rendering many perfumes with a DRF serializer's output shape.
+
+    The declared fields of `serializer_class` are turned once into a plan of
+    (name, converter) pairs that is applied to `.values()` rows, skipping
+    DRF's per-field `get_attribute`/`to_representation` machinery. Fields
+    without a known converter fall back to their own `to_representation`, so
+    the output is identical to `serializer_class(instances, many=True).data`.
+    Input validation keeps using the DRF serializers.
+    """
+
+    # Distinct field subsets kept by `subset()`; further ones are built per call
+    MAX_SUBSETS = 256
+
+    def __init__(self, serializer_class, plan=None):
+        self.serializer_class = serializer_class
+        self.plan = self._compile(serializer_class()) if plan is None else plan
+        self.columns = tuple(name for name, _ in self.plan)
+        self._subsets = {}
+
+    def subset(self, names):
+        """
+        A projection of just the fields in `names` (kept in declaration
+        order), so `values()` selects only their columns. Unknown names are ignored.
+        """
+        names = frozenset(names)
+        projection = self._subsets.get(names)
+        if projection is None:
+            projection = CompiledSerializer(self.serializer_class, [entry for entry in self.plan if entry[0] in names])
+            if len(self._subsets) < self.MAX_SUBSETS:
+                self._subsets[names] = projection
+        return projection
+
+    @classmethod
+    def _compile(cls, serializer):
+        plan = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if field.source != name:
+                raise ValueError(f"{serializer.__class__.__name__}.{name}: renamed sources are not supported")
+            plan.append((name, cls._converter(field)))
+        return plan
+
+    @classmethod
+    def _converter(cls, field):
+        if isinstance(field, serializers.UUIDField) and field.uuid_format == 'hex_verbose':
+            return str
+        if type(field) in (serializers.CharField, serializers.URLField):
+            return str
+        if type(field) is serializers.FloatField:
+            return float
+        if type(field) is serializers.BooleanField:
+            return bool
+        if isinstance(field, serializers.ListField) and isinstance(field.child, serializers.Serializer):
+            child_plan = cls._compile(field.child)
+            def convert_list(items):
+                return [
+                    None if item is None else {
+                        name: None if item[name] is None else convert(item[name])
+                        for name, convert in child_plan
+                    }
+                    for item in items
+                ]
+            return convert_list
+        return field.to_representation
+
+    def values(self, queryset):
+        """`queryset` reduced to exactly the columns the plan reads."""
+        return queryset.values(*self.columns)
+
+    def to_representation(self, row):
+        return {name: None if row[name] is None else convert(row[name]) for name, convert in self.plan}
+
+    def many(self, rows):
+        plan = self.plan
+        with timed('serialize'):
+            return [
+                {name: None if row[name] is None else convert(row[name]) for name, convert in plan}
+                for row in rows
+            ]
+
+    def many_iter(self, rows):
+        """Lazily project `rows`, for streaming responses."""
+        plan = self.plan
+        for row in rows:
+            yield {name: None if row[name] is None else convert(row[name]) for name, convert in plan}
+
+
+public_perfume_projection = CompiledSerializer(PublicPerfumeSerializer)
+admin_perfume_projection = CompiledSerializer(AdminPerfumeSerializer)
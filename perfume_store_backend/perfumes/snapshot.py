@@ -0,0 +1,387 @@
+"""
+On-disk snapshot of the public catalog.
+
+After every admin write (once it commits) the active catalog is written to
+`CATALOG_SNAPSHOT_PATH`, tagged with the catalog generation the write
+produced. A background thread does the writing, so the admin request does
+not wait for it, and a burst of writes produces one snapshot of the last.
+The file is built next to the old one and renamed over it, so readers only
+ever see a complete snapshot. Layout:
+
+    PERFUME-CATALOG-SNAPSHOT <format> <generation>\\n
+    <header: JSON>\\n
+    <one perfume per line, as the detail endpoint renders it, newest first>
+
+The header holds what answering a list query needs without decoding any
+perfume: the ids, the filter columns, the rank order of every `sort` and
+the byte offset of each perfume. Workers open the snapshot at startup
+(wsgi.py / asgi.py) with mmap, decode the header, and decode perfumes only
+when a response includes them.
+
+The public list (page mode, without search), detail and batch endpoints
+answer from the snapshot:
+
+- while it is current, i.e. its generation is the catalog generation. The
+  generation is the shared counter in the database (see catalog.py), which
+  numbers every worker's writes in one sequence, so a snapshot tagged with
+  it holds exactly what the database would return and a worker serves
+  reads from it without touching the perfume table. A snapshot is tagged
+  with the generation of the write it follows and never replaces one with
+  a higher generation, which was written after a later commit.
+- whatever its age, while the database is unreachable. Those responses are
+  marked with `X-Catalog-Snapshot` and are never cached.
+
+A snapshot written by an older release, or for a different set of public
+fields, is ignored.
+"""
+import glob
+import json
+import logging
+import mmap
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from perfume_store_backend.db_routers import use_primary
+from perfume_store_backend.renderers import FastJSONRenderer, orjson
+
+from .catalog import aget_catalog_generation, get_catalog_generation
+from .models import Perfume, SORT_ORDERINGS
+from .serializers import public_perfume_projection
+
+# Where the snapshot lives; empty to turn snapshots off
+CATALOG_SNAPSHOT_PATH = getattr(settings, 'CATALOG_SNAPSHOT_PATH', None)
+
+SNAPSHOT_MAGIC = b'PERFUME-CATALOG-SNAPSHOT'
+SNAPSHOT_FORMAT = 2
+
+# Temporary files older than this (seconds) were left by a worker killed mid-write
+STALE_TEMP_FILE_AGE = 10 * 60
+
+# Columns list queries filter on, kept in the header
+FILTER_COLUMNS = (
+    'brandEn', 'brandAr', 'categoryEn', 'categoryAr', 'genderEn', 'genderAr', 'stockStatus', 'isNew', 'isBestseller',
+)
+
+_loads = orjson.loads if orjson is not None else json.loads
+_write_lock = threading.Lock()
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _cents(price):
+    return None if price is None else int(price * 100)
+
+
+class CatalogSnapshot:
+    """A snapshot file opened for reading."""
+
+    def __init__(self, buffer, header, body_start):
+        self._buffer = buffer
+        self._body_start = body_start
+        self._offsets = header['offsets']
+        self._filter_columns = header['filterColumns']
+        self._orderings = header['orderings']
+        self._postings = {}
+        self.generation = header['generation']
+        self.written_at = header['writtenAt']
+        self.columns = tuple(header['columns'])
+        self.ids = header['ids']
+        self.count = len(self.ids)
+        self._positions = {perfume_id: position for position, perfume_id in enumerate(self.ids)}
+
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as f:
+            try:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise SnapshotError(f"{path} is empty.")
+        magic_end = buffer.find(b'\n')
+        header_end = buffer.find(b'\n', magic_end + 1)
+        magic = buffer[:magic_end].split()
+        if header_end < 0 or len(magic) != 3 or magic[0] != SNAPSHOT_MAGIC:
+            raise SnapshotError(f"{path} is not a catalog snapshot.")
+        if magic[1] != str(SNAPSHOT_FORMAT).encode():
+            raise SnapshotError(f"{path} is in snapshot format {magic[1].decode()}, not {SNAPSHOT_FORMAT}.")
+        try:
+            header = _loads(buffer[magic_end + 1:header_end])
+        except ValueError:
+            raise SnapshotError(f"{path} has a corrupt header.")
+        if tuple(header['columns']) != public_perfume_projection.columns:
+            raise SnapshotError(f"{path} was written for different public fields.")
+        if len(buffer) - (header_end + 1) != header['offsets'][-1]:
+            raise SnapshotError(f"{path} is truncated.")
+        return cls(buffer, header, header_end + 1)
+
+    def _matching(self, column, value):
+        """Positions whose `column` equals `value`, newest first."""
+        postings = self._postings.get(column)
+        if postings is None:
+            postings = {}
+            for position, column_value in enumerate(self._filter_columns[column]):
+                postings.setdefault(column_value, []).append(position)
+            self._postings[column] = postings
+        return postings.get(value, ())
+
+    def select(self, equal=None, min_price=None, max_price=None, order='newest'):
+        """
+        Positions of the perfumes that match the list filters, in `order`
+        (a SORT_ORDERINGS key): `equal` maps filter columns to the value
+        they must have; a perfume is in a price range when any of its sizes
+        could be.
+        """
+        candidates = None
+        for column, value in (equal or {}).items():
+            matches = self._matching(column, value)
+            candidates = set(matches) if candidates is None else candidates.intersection(matches)
+        checks = []
+        if min_price is not None:
+            min_cents, max_prices = min_price * 100, self._filter_columns['maxPriceCents']
+            checks.append(lambda position: max_prices[position] is not None and max_prices[position] >= min_cents)
+        if max_price is not None:
+            max_cents, min_prices = max_price * 100, self._filter_columns['minPriceCents']
+            checks.append(lambda position: min_prices[position] is not None and min_prices[position] <= max_cents)
+
+        ordered = range(self.count) if order == 'newest' else self._orderings[order]
+        if candidates is None and not checks:
+            return ordered
+        return [
+            position for position in ordered
+            if (candidates is None or position in candidates) and all(check(position) for check in checks)
+        ]
+
+    def perfumes(self, positions, columns=None):
+        """The perfumes at `positions`, as rendered by the public projection with `columns`."""
+        buffer, start, offsets = self._buffer, self._body_start, self._offsets
+        columns = tuple(columns or self.columns)
+        perfumes = []
+        for position in positions:
+            perfume = _loads(buffer[start + offsets[position]:start + offsets[position + 1]])
+            perfumes.append(perfume if columns == self.columns else {name: perfume[name] for name in columns})
+        return perfumes
+
+    def find(self, perfume_ids, columns=None):
+        """{id: perfume} for those of `perfume_ids` (UUIDs) that are in the snapshot."""
+        found = [(perfume_id, self._positions.get(str(perfume_id))) for perfume_id in perfume_ids]
+        found = [(perfume_id, position) for perfume_id, position in found if position is not None]
+        return dict(zip(
+            (perfume_id for perfume_id, _ in found),
+            self.perfumes((position for _, position in found), columns),
+        ))
+
+
+def _snapshot_rows():
+    """The active catalog, newest first, with each perfume's rank under every other sort."""
+    ranks = {
+        f'rank_{name}': Window(RowNumber(), order_by=list(ordering))
+        for name, ordering in SORT_ORDERINGS.items() if name != 'newest'
+    }
+    rows = list(
+        Perfume.objects.filter(isActive=True).annotate(**ranks).order_by('-created_at', '-id')
+        .values(*public_perfume_projection.columns, 'minPriceEGP', 'maxPriceEGP', *ranks)
+    )
+    orderings = {}
+    for name in ranks:
+        order = sorted(range(len(rows)), key=lambda position: rows[position][name])
+        orderings[name[len('rank_'):]] = order
+    return rows, orderings
+
+
+def _encode(generation):
+    rows, orderings = _snapshot_rows()
+    render = FastJSONRenderer().render
+    body, offsets = [], [0]
+    for perfume in public_perfume_projection.many(rows):
+        line = render(perfume) + b'\n'
+        body.append(line)
+        offsets.append(offsets[-1] + len(line))
+    filter_columns = {column: [row[column] for row in rows] for column in FILTER_COLUMNS}
+    filter_columns['minPriceCents'] = [_cents(row['minPriceEGP']) for row in rows]
+    filter_columns['maxPriceCents'] = [_cents(row['maxPriceEGP']) for row in rows]
+    header = {
+        'generation': generation,
+        'writtenAt': timezone.now().isoformat(),
+        'columns': public_perfume_projection.columns,
+        'ids': [str(row['id']) for row in rows],
+        'filterColumns': filter_columns,
+        'orderings': orderings,
+        'offsets': offsets,
+    }
+    magic = b'%s %d %d\n' % (SNAPSHOT_MAGIC, SNAPSHOT_FORMAT, generation)
+    return [magic, render(header) + b'\n', *body], len(rows)
+
+
+def _generation_on_disk(path):
+    try:
+        with open(path, 'rb') as f:
+            magic = f.readline(256).split()
+    except OSError:
+        return None
+    if len(magic) != 3 or magic[0] != SNAPSHOT_MAGIC or not magic[2].isdigit():
+        return None
+    return int(magic[2])
+
+
+def _remove_stale_temp_files(directory):
+    for temp_path in glob.glob(os.path.join(directory, '.catalog-snapshot-*')):
+        try:
+            if os.stat(temp_path).st_mtime < time.time() - STALE_TEMP_FILE_AGE:
+                os.unlink(temp_path)
+        except OSError:
+            pass
+
+
+def write_catalog_snapshot(generation, path=None):
+    """
+    Write the active catalog, tagged with `generation`, to `path`
+    (CATALOG_SNAPSHOT_PATH by default) atomically. Returns the number of
+    perfumes written, or None if snapshots are off or the file on disk is
+    already newer.
+    """
+    path = path or CATALOG_SNAPSHOT_PATH
+    if not path:
+        return None
+    # Never from a replica that may not have the write yet
+    with _write_lock, use_primary():
+        on_disk = _generation_on_disk(path)
+        if on_disk is not None and on_disk > generation:
+            return None
+        chunks, count = _encode(generation)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        _remove_stale_temp_files(directory)
+        fd, temp_path = tempfile.mkstemp(prefix='.catalog-snapshot-', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.writelines(chunks)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+    return count
+
+
+class SnapshotWriter:
+    """
+    Writes snapshots on a background thread, one at a time. Generations
+    requested while a write runs are coalesced into one snapshot of the latest.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = None
+        self._thread = None
+
+    def request(self, generation):
+        with self._lock:
+            self._pending = generation if self._pending is None else max(self._pending, generation)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='catalog-snapshot', daemon=True)
+                self._thread.start()
+
+    def wait(self, timeout=None):
+        """Block until the requested snapshots are written."""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        try:
+            while True:
+                with self._lock:
+                    generation, self._pending = self._pending, None
+                    if generation is None:
+                        self._thread = None
+                        return
+                try:
+                    write_catalog_snapshot(generation)
+                except Exception:
+                    # The admin write itself succeeded; readers keep the previous snapshot until the next one
+                    logging.exception(f"Failed to write the catalog snapshot to {CATALOG_SNAPSHOT_PATH}")
+        finally:
+            with self._lock:
+                if self._thread is threading.current_thread():
+                    self._thread = None
+            connections.close_all()
+
+
+snapshot_writer = SnapshotWriter()
+
+
+def write_catalog_snapshot_on_commit(generation):
+    """Have the snapshot rewritten once the current transaction commits (right away outside one)."""
+    if CATALOG_SNAPSHOT_PATH:
+        transaction.on_commit(lambda: snapshot_writer.request(generation))
+
+
+class SnapshotFile:
+    """The snapshot at CATALOG_SNAPSHOT_PATH, reopened whenever the file is replaced."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._snapshot = None
+
+    def get(self):
+        """The snapshot on disk, or None if there is no usable one."""
+        path = CATALOG_SNAPSHOT_PATH
+        if not path:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = (path, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if key == self._key:
+            return self._snapshot
+        with self._lock:
+            if key != self._key:
+                try:
+                    self._snapshot = CatalogSnapshot.open(path)
+                except (OSError, SnapshotError, KeyError) as e:
+                    logging.warning(f"Ignoring catalog snapshot {path}: {e}")
+                    self._snapshot = None
+                self._key = key
+            return self._snapshot
+
+    def load(self):
+        """
+        Open the snapshot when a worker starts, so the first request does not
+        pay for decoding its header. It is served once the catalog generation
+        read from the database says it is current, never on its own word.
+        """
+        return self.get()
+
+
+catalog_snapshot = SnapshotFile()
+
+
+def current_snapshot():
+    """The snapshot if it holds the current catalog generation, else None."""
+    snapshot = catalog_snapshot.get()
+    if snapshot is not None and snapshot.generation == get_catalog_generation():
+        return snapshot
+    return None
+
+
+async def acurrent_snapshot():
+    """Async `current_snapshot()`."""
+    snapshot = catalog_snapshot.get()
+    if snapshot is not None and snapshot.generation == await aget_catalog_generation():
+        return snapshot
+    return None
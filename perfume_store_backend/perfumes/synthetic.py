@@ -0,0 +1,85 @@
+"""
+Synthetic bilingual catalogs for query-plan checks and benchmarks.
+
+`seed_catalog(n)` bulk-inserts `n` perfumes whose brands, categories,
+genders, stock statuses and sizes follow skewed, store-like distributions,
+so that planner statistics and result sizes resemble production.
+"""
+import random
+
+from .models import Perfume, StockStatus
+
+BRANDS = [
+    ("Chanel", "شانيل"), ("Dior", "ديور"), ("Guerlain", "جيرلان"), ("Hermes", "هيرميس"),
+    ("Tom Ford", "توم فورد"), ("Creed", "كريد"), ("Amouage", "أمواج"), ("Lattafa", "لطافة"),
+    ("Arabian Oud", "العربية للعود"), ("Ajmal", "أجمل"), ("Rasasi", "الرصاصي"), ("Armani", "أرماني"),
+    ("Versace", "فيرساتشي"), ("Gucci", "غوتشي"), ("Prada", "برادا"), ("YSL", "إيف سان لوران"),
+    ("Kilian", "كيليان"), ("Byredo", "بايريدو"), ("Le Labo", "لو لابو"), ("Xerjoff", "زيرجوف"),
+    ("Montale", "مونتال"), ("Mancera", "مانسيرا"), ("Nishane", "نيشان"), ("Parfums de Marly", "بارفان دي مارلي"),
+    ("Maison Margiela", "ميزون مارجيلا"), ("Jo Malone", "جو مالون"), ("Burberry", "بربري"), ("Givenchy", "جيفنشي"),
+    ("Lancome", "لانكوم"), ("Narciso Rodriguez", "نارسيسو رودريغيز"), ("Swiss Arabian", "السويسرية العربية"),
+    ("Abdul Samad Al Qurashi", "عبد الصمد القرشي"),
+]
+CATEGORIES = [
+    ("Oriental", "شرقي"), ("Woody", "خشبي"), ("Floral", "زهري"), ("Fresh", "منعش"),
+    ("Citrus", "حمضي"), ("Gourmand", "حلو"), ("Aquatic", "مائي"), ("Oud", "عود"),
+]
+GENDERS = [("Unisex", "للجنسين"), ("Male", "ذكر"), ("Female", "أنثى")]
+STOCK_STATUSES = [StockStatus.IN_STOCK, StockStatus.LOW_STOCK, StockStatus.OUT_OF_STOCK]
+SIZES = ["5ml", "30ml", "50ml", "75ml", "100ml", "200ml"]
+NAME_WORDS = [
+    ("Royal", "ملكي"), ("Velvet", "مخملي"), ("Amber", "عنبر"), ("Noir", "أسود"), ("Rose", "ورد"),
+    ("Musk", "مسك"), ("Saffron", "زعفران"), ("Vanilla", "فانيلا"), ("Desert", "صحراء"), ("Night", "ليلة"),
+    ("Silk", "حرير"), ("Leather", "جلد"), ("Jasmine", "ياسمين"), ("Cedar", "أرز"), ("Incense", "بخور"),
+]
+
+
+def _weighted_index(rng, count, skew=1.1):
+    """Zipf-like pick: low indexes are much more common, as with real brand popularity."""
+    weights = [1 / (rank ** skew) for rank in range(1, count + 1)]
+    return rng.choices(range(count), weights=weights)[0]
+
+
+def build_perfume(rng, number):
+    brand_en, brand_ar = BRANDS[_weighted_index(rng, len(BRANDS))]
+    category_en, category_ar = CATEGORIES[_weighted_index(rng, len(CATEGORIES), skew=0.7)]
+    gender_en, gender_ar = rng.choices(GENDERS, weights=[5, 3, 4])[0]
+    first, second = rng.sample(NAME_WORDS, 2)
+    base_price = rng.choice([350, 600, 900, 1500, 2500, 4000, 7500])
+    sizes = [
+        {"size": size, "priceEGP": float(round(base_price * (index + 1) * rng.uniform(0.8, 1.2)))}
+        for index, size in enumerate(sorted(rng.sample(SIZES, rng.choice([1, 2, 2, 3])), key=SIZES.index))
+    ]
+    perfume = Perfume(
+        nameEn=f"{first[0]} {second[0]} {number}",
+        nameAr=f"{first[1]} {second[1]} {number}",
+        brandEn=brand_en, brandAr=brand_ar,
+        categoryEn=category_en, categoryAr=category_ar,
+        genderEn=gender_en, genderAr=gender_ar,
+        descriptionEn=f"A {category_en.lower()} fragrance by {brand_en} with notes of {first[0].lower()} and {second[0].lower()}. " * 3,
+        descriptionAr=f"عطر {category_ar} من {brand_ar} بنفحات من {first[1]} و{second[1]}. " * 3,
+        sizes=sizes,
+        stockStatus=rng.choices(STOCK_STATUSES, weights=[80, 12, 8])[0],
+        imageUrl=f"https://images.example.com/perfumes/{number}.jpg",
+        isNew=rng.random() < 0.08,
+        isBestseller=rng.random() < 0.05,
+        isActive=rng.random() < 0.9,
+    )
+    perfume.update_derived_fields()
+    return perfume
+
+
+def seed_catalog(count, seed=0, batch_size=2000, start=0):
+    """
+    Bulk-insert `count` synthetic perfumes numbered from `start` (pass the
+    current size to grow a catalog); returns the number inserted. Output is
+    deterministic for a given seed.
+    """
+    inserted = 0
+    while inserted < count:
+        batch_start = start + inserted
+        rng = random.Random(f"{seed}:{batch_start}")
+        batch = [build_perfume(rng, batch_start + offset) for offset in range(min(batch_size, count - inserted))]
+        Perfume.objects.bulk_create(batch, batch_size=batch_size)
+        inserted += len(batch)
+    return inserted
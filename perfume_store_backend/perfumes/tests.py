@@ -1,16 +1,66 @@
-from django.test import TestCase
-from django.urls import reverse
+import csv
+import datetime
+import decimal
+import gzip
+import http.client
+import io
+import itertools
+import json
+import os
+import re
+import tempfile
+import time
+import unittest
+import urllib.request
+from unittest import mock
+from django.core.management import call_command
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import RequestFactory, TestCase, SimpleTestCase, TransactionTestCase, override_settings
+from django.urls import include, path, reverse
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APIClient
 import uuid
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.utils import timezone
+from django.db import OperationalError, connection, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
 from rest_framework.authtoken.models import Token
-from .models import Perfume
-from .serializers import PublicPerfumeSerializer, AdminPerfumeSerializer
+from .models import GenerationCounter, Perfume, PerfumeTombstone, StockStatus, parse_stock_status
+from rest_framework.renderers import JSONRenderer
+from .serializers import PublicPerfumeSerializer, AdminPerfumeSerializer, public_perfume_projection, admin_perfume_projection
+from .facets import facet_index
+from .search import search_index
+from .normalization import normalize_search_text
+from .synthetic import seed_catalog, BRANDS, CATEGORIES, GENDERS
+from . import catalog, changes, images, rails, snapshot
+from .catalog import bump_catalog_generation, get_catalog_generation
+from .benchmarks import (
+    build_scenarios, compare_results, measure, measure_connections, measure_login_attack, measure_serializers,
+    measure_servers,
+)
+from .urls import perfume_urlpatterns
+from perfume_store_backend.tiered_cache import TieredCache, LocalLRU
+from perfume_store_backend import compression, db_routers, instrumentation
+from perfume_store_backend.admins import throttling
+from perfume_store_backend.admins import views as admin_views
+from perfume_store_backend.renderers import FastJSONRenderer, orjson
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
 
 Admin = get_user_model()
 
+# A process reuses the generation it read last for GENERATION_CHECK_INTERVAL seconds; tests
+# counting queries keep it for their whole run instead of depending on how fast they run
+within_check_interval = mock.patch.object(catalog, 'GENERATION_CHECK_INTERVAL', 60)
+
 class PerfumeModelTest(TestCase):
     """
     Test suite for the Perfume model.
@@ -53,6 +103,61 @@ class PerfumeModelTest(TestCase):
         """
         self.assertEqual(str(self.perfume), "Test Perfume")
 
+    def test_stock_status_is_stored_as_enum(self):
+        """
+        Test that any common spelling of a stock status is stored as the canonical enum value.
+        """
+        self.perfume.refresh_from_db()
+        self.assertEqual(self.perfume.stockStatus, StockStatus.IN_STOCK)
+        Perfume.objects.filter(pk=self.perfume.pk).update(stockStatus='out of stock')
+        self.assertTrue(Perfume.objects.filter(stockStatus=StockStatus.OUT_OF_STOCK).exists())
+        self.assertEqual(parse_stock_status('LOW-STOCK'), StockStatus.LOW_STOCK)
+        self.assertEqual(parse_stock_status('غير متوفر'), StockStatus.OUT_OF_STOCK)
+        self.assertIsNone(parse_stock_status('Pre-order'))
+
+class CompiledSerializerTest(TestCase):
+    """
+    Test suite for the compiled list serialization fast path.
+    """
+
+    def _create_perfumes(self, count):
+        Perfume.objects.bulk_create([
+            Perfume(
+                nameEn=f"Perfume {i}", nameAr=f"عطر {i}", brandEn=f"Brand {i % 7}", brandAr=f"ماركة {i % 7}",
+                categoryEn="Floral", categoryAr="زهري", genderEn="Female", genderAr="أنثى",
+                descriptionEn="Notes of rose and oud. " * 5, descriptionAr="نفحات من الورد والعود. " * 5,
+                sizes=[{"size": "50ml", "priceEGP": 200 + i}, {"size": "100ml", "priceEGP": 350.5}],
+                stockStatus="In Stock", isNew=i % 2 == 0, isActive=i % 3 != 0,
+                imageUrl=None if i % 4 == 0 else f"http://example.com/{i}.jpg",
+            )
+            for i in range(count)
+        ])
+
+    def test_output_is_byte_identical(self):
+        """
+        Test that the compiled path renders exactly the same JSON as the DRF serializers.
+        """
+        self._create_perfumes(12)
+        renderer = JSONRenderer()
+        for serializer_class, projection in ((PublicPerfumeSerializer, public_perfume_projection),
+                                             (AdminPerfumeSerializer, admin_perfume_projection)):
+            queryset = Perfume.objects.order_by('nameEn')
+            expected = renderer.render(serializer_class(queryset, many=True).data)
+            actual = renderer.render(projection.many(projection.values(queryset)))
+            self.assertEqual(actual, expected)
+
+    def test_output_is_identical_for_large_pages(self):
+        """
+        Test that the compiled path matches the DRF serializers on every row of a 1000-row page, as the benchmark measures it.
+        """
+        self._create_perfumes(1000)
+        rows = measure_serializers(rows=(12, 1000))
+        self.assertEqual(list(rows), ['12', '1000'])
+        renderer = JSONRenderer()
+        queryset = Perfume.objects.order_by('nameEn')
+        expected = renderer.render(PublicPerfumeSerializer(queryset, many=True).data)
+        self.assertEqual(renderer.render(public_perfume_projection.many(public_perfume_projection.values(queryset))), expected)
+
 class PerfumeAPITest(APITestCase):
     """
     Test suite for the Perfume API endpoints.
@@ -62,6 +167,9 @@ class PerfumeAPITest(APITestCase):
         """
         Set up initial data for API tests.
         """
+        cache.clear()
+        facet_index.invalidate()
+        search_index.invalidate()
         self.perfume1 = Perfume.objects.create(
             nameEn="Perfume A", nameAr="عطر أ", brandEn="Brand X", brandAr="ماركة س",
             categoryEn="Floral", categoryAr="زهري", genderEn="Female", genderAr="أنثى",
@@ -100,6 +208,117 @@ class PerfumeAPITest(APITestCase):
         self.assertEqual(len(response.data['perfumes']), 1)
         self.assertEqual(response.data['perfumes'][0]['nameEn'], 'Perfume A')
 
+    def test_list_perfumes_cursor_mode(self):
+        """
+        Test walking the public list forwards and backwards with keyset cursors.
+        """
+        for i in range(3):
+            Perfume.objects.create(
+                nameEn=f"Extra {i}", nameAr="إضافي", brandEn="Brand X", brandAr="ماركة س",
+                categoryEn="Floral", categoryAr="زهري", genderEn="Female", genderAr="أنثى",
+                descriptionEn="", descriptionAr="", sizes=[], stockStatus="In Stock", isActive=True
+            )
+        expected = [str(pk) for pk in Perfume.objects.filter(isActive=True).order_by('-created_at', '-id').values_list('id', flat=True)]
+        url = reverse('perfume-list')
+
+        seen, cursor, pages = [], '', []
+        while cursor is not None:
+            response = self.client.get(url, {'cursor': cursor, 'limit': 2}, format='json', follow=True)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('totalItems', response.data['pagination'])
+            pages.append(response.data)
+            seen.extend(p['id'] for p in response.data['perfumes'])
+            cursor = response.data['pagination']['nextCursor']
+        self.assertEqual(seen, expected)
+        self.assertFalse(pages[0]['pagination']['hasPrev'])
+        self.assertIsNone(pages[0]['pagination']['prevCursor'])
+
+        prev_cursor = pages[-1]['pagination']['prevCursor']
+        response = self.client.get(url, {'cursor': prev_cursor, 'limit': 2}, format='json', follow=True)
+        self.assertEqual(response.data['perfumes'], pages[-2]['perfumes'])
+
+    def test_list_perfumes_cursor_mode_total_and_errors(self):
+        """
+        Test the optional total and the rejection of malformed cursors.
+        """
+        url = reverse('perfume-list')
+        response = self.client.get(url, {'cursor': '', 'includeTotal': 'true', 'brandFilter': 'Brand X'}, format='json', follow=True)
+        self.assertEqual(response.data['pagination']['totalItems'], 1)
+        response = self.client.get(url, {'cursor': 'not-a-cursor'}, format='json', follow=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_price_filters_and_sorting(self):
+        """
+        Test filtering and sorting by price using the denormalized price range.
+        """
+        Perfume.objects.create(
+            nameEn="Perfume D", nameAr="عطر د", brandEn="Brand X", brandAr="ماركة س",
+            categoryEn="Floral", categoryAr="زهري", genderEn="Female", genderAr="أنثى",
+            descriptionEn="", descriptionAr="", stockStatus="In Stock", isActive=True,
+            sizes=[{"size": "30ml", "priceEGP": 150}, {"size": "100ml", "priceEGP": 450.5}],
+        )
+        url = reverse('perfume-list')
+
+        def names(params):
+            response = self.client.get(url, params, format='json', follow=True)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return [p['nameEn'] for p in response.data['perfumes']]
+
+        self.assertEqual(names({'sort': 'price_asc'}), ['Perfume D', 'Perfume A', 'Perfume B'])
+        self.assertEqual(names({'sort': 'price_desc'}), ['Perfume B', 'Perfume A', 'Perfume D'])
+        self.assertEqual(names({'sort': 'name'}), ['Perfume A', 'Perfume B', 'Perfume D'])
+        self.assertEqual(names({'minPrice': '250', 'sort': 'price_asc'}), ['Perfume D', 'Perfume B'])
+        self.assertEqual(names({'minPrice': '250', 'maxPrice': '280'}), ['Perfume D'])
+        self.assertEqual(self.client.get(url, {'minPrice': 'cheap'}, format='json', follow=True).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'sort': 'price_asc', 'cursor': ''}, format='json', follow=True).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_search_perfumes(self):
+        """
+        Test searching names, brands and descriptions in both languages.
+        """
+        url = reverse('perfume-list')
+        cases = [
+            ('Perfume A', 'Perfume A'),   # name
+            ('brand y', 'Perfume B'),     # brand, case-insensitive
+            ('desc b', 'Perfume B'),      # description
+            ('عطر أ', 'Perfume A'),       # Arabic name
+            ('ماركه ص', 'Perfume B'),     # taa marbuta typed as ha
+        ]
+        for term, expected in cases:
+            response = self.client.get(url, {'searchTerm': term}, format='json', follow=True)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['perfumes'][0]['nameEn'], expected, term)
+
+    def test_search_tolerates_typos_and_ranks(self):
+        """
+        Test that misspelt terms still match and name hits outrank description hits.
+        """
+        Perfume.objects.create(
+            nameEn="Vanilla Noir", nameAr="فانيلا نوار", brandEn="Brand X", brandAr="ماركة س",
+            categoryEn="Floral", categoryAr="زهري", genderEn="Female", genderAr="أنثى",
+            descriptionEn="Warm and sweet", descriptionAr="دافئ", sizes=[], stockStatus="In Stock", isActive=True
+        )
+        Perfume.objects.create(
+            nameEn="Amber Night", nameAr="ليلة العنبر", brandEn="Brand Y", brandAr="ماركة ص",
+            categoryEn="Woody", categoryAr="خشبي", genderEn="Male", genderAr="ذكر",
+            descriptionEn="A hint of vanilla", descriptionAr="لمسة", sizes=[], stockStatus="In Stock", isActive=True
+        )
+        url = reverse('perfume-list')
+        response = self.client.get(url, {'searchTerm': 'vanila'}, format='json', follow=True)
+        self.assertEqual([p['nameEn'] for p in response.data['perfumes']], ['Vanilla Noir', 'Amber Night'])
+        response = self.client.get(url, {'searchTerm': 'Perfume C'}, format='json', follow=True)
+        self.assertEqual(response.data['perfumes'], [])  # inactive
+
+    def test_normalize_search_text(self):
+        """
+        Test Arabic and Latin folding used for search documents and queries.
+        """
+        self.assertEqual(normalize_search_text('أَحْمَد'), 'احمد')
+        self.assertEqual(normalize_search_text('إسلام  آمال'), 'اسلام امال')
+        self.assertEqual(normalize_search_text('مدرسة عيسى'), 'مدرسه عيسي')
+        self.assertEqual(normalize_search_text('Chloé'), 'chloe')
+        self.assertEqual(self.perfume1.searchDocument, 'perfume a عطر ا brand x ماركه س desc a وصف ا')
+
     def test_get_perfume_detail(self):
         """
         Test retrieving a single perfume's details.
@@ -128,6 +347,76 @@ class PerfumeAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIsNone(response.data)
 
+    def test_sparse_fieldsets(self):
+        """
+        Test that `fields` limits both the response and the selected columns.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('perfume-list'), {'fields': 'name,sizes,imageUrl'}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for perfume in response.json()['perfumes']:
+            self.assertEqual(set(perfume), {'id', 'nameEn', 'nameAr', 'sizes', 'imageUrl'})
+        page_query = queries.captured_queries[-1]['sql']
+        self.assertIn('"nameAr"', page_query)
+        self.assertNotIn('"descriptionEn"', page_query)
+        self.assertNotIn('"brandEn"', page_query)
+
+        response = self.client.get(reverse('perfume-detail', args=[self.perfume1.id]), {'fields': 'brandEn'}, secure=True)
+        self.assertEqual(response.json(), {'id': str(self.perfume1.id), 'brandEn': 'Brand X'})
+        response = self.client.get(reverse('perfume-list'), {'fields': 'name,price'}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_language_only_projection(self):
+        """
+        Test that `languageOnly` returns only the requested language's variant of each bilingual field.
+        """
+        response = self.client.get(reverse('perfume-list'), {'language': 'ar', 'languageOnly': 'true'}, secure=True)
+        perfume = response.json()['perfumes'][0]
+        self.assertIn('nameAr', perfume)
+        self.assertIn('descriptionAr', perfume)
+        self.assertIn('sizes', perfume)
+        self.assertFalse([name for name in perfume if name.endswith('En')])
+
+        response = self.client.get(reverse('perfume-batch'), {
+            'ids': str(self.perfume1.id), 'fields': 'name,brand', 'languageOnly': '1',
+        }, secure=True)
+        self.assertEqual(response.json()['perfumes'], [{'id': str(self.perfume1.id), 'nameEn': 'Perfume A', 'brandEn': 'Brand X'}])
+
+    @within_check_interval
+    def test_batch_detail(self):
+        """
+        Test fetching several perfumes at once: requested order, detail-view shape, missing ids reported, one query.
+        """
+        catalog.forget_generations()
+        get_catalog_generation()
+        unknown = uuid.uuid4()
+        ids = [self.perfume2.id, unknown, self.perfume1.id, self.inactive_perfume.id, self.perfume2.id]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('perfume-batch'), {'ids': ','.join(map(str, ids))}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+        detail = self.client.get(reverse('perfume-detail', args=[self.perfume2.id]), secure=True).json()
+        body = response.json()
+        self.assertEqual(body['perfumes'][0], detail)
+        self.assertEqual([perfume['id'] for perfume in body['perfumes']], [str(self.perfume2.id), str(self.perfume1.id)])
+        self.assertEqual(body['missing'], [str(unknown), str(self.inactive_perfume.id)])
+
+        response = self.client.post(reverse('perfume-batch'), {'ids': [str(self.perfume1.id)]}, format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([perfume['id'] for perfume in response.json()['perfumes']], [str(self.perfume1.id)])
+
+    def test_batch_detail_rejects_bad_ids(self):
+        """
+        Test that the batch endpoint rejects missing, malformed and too many ids.
+        """
+        url = reverse('perfume-batch')
+        self.assertEqual(self.client.get(url, secure=True).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(url, {'ids': 'not-a-uuid'}, secure=True).status_code, status.HTTP_400_BAD_REQUEST)
+        too_many = ','.join(str(uuid.uuid4()) for _ in range(101))
+        self.assertEqual(self.client.get(url, {'ids': too_many}, secure=True).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, {'ids': 'oops'}, format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_get_brands(self):
         """
         Test retrieving a list of unique brand names.
@@ -150,6 +439,59 @@ class PerfumeAPITest(APITestCase):
         self.assertIn('Floral', response.data)
         self.assertIn('Woody', response.data)
 
+    def test_get_brands_within_category(self):
+        """
+        Test that brand facets can be narrowed by another facet.
+        """
+        url = reverse('brand-list')
+        response = self.client.get(url, {'categoryFilter': 'Woody'}, format='json', follow=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, ['Brand Y'])
+
+        response = self.client.get(url, {'language': 'ar', 'categoryFilter': 'زهري'}, format='json', follow=True)
+        self.assertEqual(response.data, ['ماركة س'])
+
+    def test_get_genders_and_stock_statuses(self):
+        """
+        Test the gender and stock status facet endpoints.
+        """
+        response = self.client.get(reverse('gender-list'), format='json', follow=True)
+        self.assertEqual(response.data, ['Female', 'Male'])
+        response = self.client.get(reverse('stock-status-list'), format='json', follow=True)
+        self.assertEqual(response.data, ['In Stock', 'Out of Stock'])
+
+    def test_stock_status_filter_is_exact_match(self):
+        """
+        Test that stockStatusFilter codes map onto the stored enum with a plain, indexable equality.
+        """
+        url = reverse('perfume-list')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'stockStatusFilter': 'out_of_stock'}, format='json', follow=True)
+        self.assertEqual([p['nameEn'] for p in response.data['perfumes']], ['Perfume B'])
+        self.assertEqual(response.data['perfumes'][0]['stockStatus'], 'Out of Stock')
+        self.assertFalse(any('UPPER' in query['sql'] for query in queries.captured_queries))
+        response = self.client.get(url, {'stockStatusFilter': 'no_such_status'}, format='json', follow=True)
+        self.assertEqual(response.data['perfumes'], [])
+
+    def test_get_facet_counts(self):
+        """
+        Test that the facets endpoint reports per-value counts of active perfumes.
+        """
+        response = self.client.get(reverse('facet-list'), {'stockStatusFilter': 'in_stock'}, format='json', follow=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['brand'], [{'value': 'Brand X', 'count': 1}])
+        self.assertEqual(response.data['stockStatus'], [{'value': 'In Stock', 'count': 1}])
+
+    @within_check_interval
+    def test_facets_do_not_query_once_built(self):
+        """
+        Test that facet reads are served from the in-memory index.
+        """
+        facet_index.values('brand')
+        with self.assertNumQueries(0):
+            self.client.get(reverse('brand-list'), {'language': 'ar'}, format='json', follow=True)
+            self.client.get(reverse('category-list'), {'brandFilter': 'Brand X'}, format='json', follow=True)
+
 class PerfumeAdminAPITest(APITestCase):
     """
     Test suite for the admin-only Perfume API endpoints.
@@ -159,6 +501,9 @@ class PerfumeAdminAPITest(APITestCase):
         """
         Set up an admin user and initial data for admin API tests.
         """
+        cache.clear()
+        facet_index.invalidate()
+        search_index.invalidate()
         self.admin_user = Admin.objects.create_superuser(
             name='testadmin',
             password='testpassword'
@@ -184,6 +529,19 @@ class PerfumeAdminAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['pagination']['totalItems'], 2)
 
+    def test_admin_list_perfumes_cursor_mode(self):
+        """
+        Test that the admin list supports cursor pagination, including inactive perfumes.
+        """
+        Perfume.objects.create(nameEn="Inactive Perfume", isActive=False, stockStatus="In Stock", sizes=[], descriptionEn="", descriptionAr="", genderEn="", genderAr="", categoryEn="", categoryAr="", brandEn="", brandAr="", nameAr="")
+        url = reverse('admin-perfume-list')
+        response = self.client.get(url, {'cursor': '', 'limit': 1}, format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['perfumes'][0]['nameEn'], 'Inactive Perfume')
+        response = self.client.get(url, {'cursor': response.data['pagination']['nextCursor'], 'limit': 1}, format='json', secure=True)
+        self.assertEqual(response.data['perfumes'][0]['nameEn'], 'Admin Perfume')
+        self.assertFalse(response.data['pagination']['hasNext'])
+
     def test_admin_create_perfume(self):
         """
         Test that an admin can create a new perfume.
@@ -202,6 +560,18 @@ class PerfumeAdminAPITest(APITestCase):
         self.assertEqual(Perfume.objects.count(), 2)
         self.assertEqual(response.data['nameEn'], 'New Perfume')
 
+    def test_admin_rejects_unknown_stock_status(self):
+        """
+        Test that stock status input is validated against the enum and echoed back as its label.
+        """
+        url = reverse('admin-perfume-detail', kwargs={'pk': self.perfume.pk})
+        response = self.client.patch(url, {"stockStatus": "Pre-order"}, format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.patch(url, {"stockStatus": "low_stock"}, format='json', secure=True)
+        self.assertEqual(response.data['stockStatus'], 'Low Stock')
+        self.perfume.refresh_from_db()
+        self.assertEqual(self.perfume.stockStatus, StockStatus.LOW_STOCK)
+
     def test_admin_update_perfume(self):
         """
         Test that an admin can update an existing perfume.
@@ -213,6 +583,56 @@ class PerfumeAdminAPITest(APITestCase):
         self.perfume.refresh_from_db()
         self.assertEqual(self.perfume.nameEn, "Updated Perfume Name")
 
+    def test_admin_writes_update_facets(self):
+        """
+        Test that admin create, update and delete keep the facet index current.
+        """
+        self.assertEqual(facet_index.values('brand'), ['Admin Brand'])
+        url = reverse('admin-perfume-detail', kwargs={'pk': self.perfume.pk})
+        self.client.patch(url, {"brandEn": "Renamed Brand"}, format='json', secure=True)
+        self.assertEqual(facet_index.values('brand'), ['Renamed Brand'])
+        self.client.patch(url, {"isActive": False}, format='json', secure=True)
+        self.assertEqual(facet_index.values('brand'), [])
+        self.client.patch(url, {"isActive": True}, format='json', secure=True)
+        self.client.delete(url, secure=True)
+        self.assertEqual(facet_index.values('brand'), [])
+        self.assertEqual(facet_index.counts('category'), {})
+
+    @within_check_interval
+    def test_admin_writes_retire_cached_responses(self):
+        """
+        Test that public responses are cached with ETags until an admin write.
+        """
+        self.client.credentials()
+        url = reverse('perfume-detail', kwargs={'product_id': self.perfume.id})
+        first = self.client.get(url, {'t': '1'}, secure=True)
+        etag = first['ETag']
+        self.assertIn('max-age', first['Cache-Control'])
+        with self.assertNumQueries(0):
+            cached = self.client.get(url, {'t': '2'}, secure=True)
+            not_modified = self.client.get(url, secure=True, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.content, first.content)
+        self.assertEqual(cached['ETag'], etag)
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.client.patch(reverse('admin-perfume-detail', kwargs={'pk': self.perfume.pk}), {"nameEn": "Renamed"}, format='json', secure=True)
+        self.client.credentials()
+        fresh = self.client.get(url, secure=True, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(fresh.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(fresh['ETag'], etag)
+        self.assertEqual(fresh.json()['nameEn'], 'Renamed')
+
+    def test_admin_writes_update_search(self):
+        """
+        Test that admin edits are immediately searchable.
+        """
+        self.assertEqual(search_index.search('admin perfume'), [self.perfume.id])
+        url = reverse('admin-perfume-detail', kwargs={'pk': self.perfume.pk})
+        self.client.patch(url, {"nameEn": "Oud Royale"}, format='json', secure=True)
+        self.assertEqual(search_index.search('admin perfume'), [])
+        self.assertEqual(search_index.search('oud'), [self.perfume.id])
+
     def test_admin_delete_perfume(self):
         """
         Test that an admin can delete a perfume.
@@ -222,6 +642,127 @@ class PerfumeAdminAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Perfume.objects.count(), 0)
 
+    def _bulk_payload(self, name):
+        return {
+            "nameEn": name, "nameAr": "عطر", "brandEn": "Season Brand", "brandAr": "ماركة الموسم",
+            "categoryEn": "Floral", "categoryAr": "زهري", "genderEn": "Unisex", "genderAr": "للجنسين",
+            "descriptionEn": "Seasonal", "descriptionAr": "موسمي", "sizes": [{"size": "50ml", "priceEGP": 900}],
+            "stockStatus": "In Stock", "imageUrl": None,
+        }
+
+    def test_admin_bulk_create(self):
+        """
+        Test creating many perfumes in one request, and rejecting a batch with an invalid item.
+        """
+        url = reverse('admin-perfume-bulk-create')
+        catalog.forget_generations()
+        get_catalog_generation()
+        # token lookup, then a single multi-row INSERT inside a transaction, then the generation bump
+        with self.assertNumQueries(6):
+            response = self.client.post(url, [self._bulk_payload(f"Season {i}") for i in range(3)], format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([r['status'] for r in response.data['results']], ['created'] * 3)
+        self.assertEqual(Perfume.objects.filter(brandEn="Season Brand").count(), 3)
+        self.assertIn('season', Perfume.objects.get(nameEn="Season 0").searchDocument)
+
+        invalid = self._bulk_payload("Broken")
+        del invalid['nameAr']
+        response = self.client.post(url, [self._bulk_payload("Fine"), invalid], format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([r['status'] for r in response.data['results']], ['skipped', 'invalid'])
+        self.assertFalse(Perfume.objects.filter(nameEn="Fine").exists())
+
+    def test_admin_bulk_update(self):
+        """
+        Test re-pricing several perfumes at once with per-item results.
+        """
+        other = Perfume.objects.create(**{**self._bulk_payload("Other"), "imageUrl": ""})
+        missing = uuid.uuid4()
+        url = reverse('admin-perfume-bulk-update')
+        response = self.client.patch(url, [
+            {"id": str(self.perfume.id), "sizes": [{"size": "100ml", "priceEGP": 1100}]},
+            {"id": str(other.id), "nameEn": "Other Renamed"},
+            {"id": str(missing), "nameEn": "Ghost"},
+        ], format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['status'] for r in response.data['results']], ['updated', 'updated', 'not_found'])
+        self.perfume.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.perfume.sizes, [{"size": "100ml", "priceEGP": 1100.0}])
+        self.assertEqual(other.nameEn, "Other Renamed")
+        self.assertIn('renamed', other.searchDocument)
+        self.assertEqual((self.perfume.minPriceEGP, self.perfume.maxPriceEGP), (1100, 1100))
+
+        response = self.client.patch(url, {"ids": [str(other.id)], "values": {"sizes": [{"size": "5ml", "priceEGP": 75}]}},
+                                     format='json', secure=True)
+        other.refresh_from_db()
+        self.assertEqual(other.minPriceEGP, 75)
+
+    def test_admin_set_based_operations(self):
+        """
+        Test deactivating by brand, updating by filter and deleting by ids with single statements.
+        """
+        for i in range(3):
+            Perfume.objects.create(**{**self._bulk_payload(f"Season {i}"), "imageUrl": ""})
+        response = self.client.post(reverse('admin-perfume-bulk-activate'),
+                                    {"filter": {"brandEn": "Season Brand"}, "isActive": False}, format='json', secure=True)
+        self.assertEqual(response.data, {"updated": 3})
+        self.assertEqual(Perfume.objects.filter(isActive=False).count(), 3)
+
+        response = self.client.patch(reverse('admin-perfume-bulk-update'),
+                                     {"filter": {"brandEn": "Season Brand"}, "values": {"stockStatus": "Out of Stock"}},
+                                     format='json', secure=True)
+        self.assertEqual(response.data, {"updated": 3})
+
+        response = self.client.post(reverse('admin-perfume-bulk-activate'), {"filter": {"nameEn": "x"}}, format='json', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        for body in (["ids"], [str(self.perfume.id)], "ids", 1):
+            for name in ('admin-perfume-bulk-activate', 'admin-perfume-bulk-delete'):
+                response = self.client.post(reverse(name), body, format='json', secure=True)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, (name, body))
+
+        missing = uuid.uuid4()
+        response = self.client.post(reverse('admin-perfume-bulk-delete'),
+                                    {"ids": [str(self.perfume.id), str(missing)]}, format='json', secure=True)
+        self.assertEqual(response.data['deleted'], 1)
+        self.assertEqual([r['status'] for r in response.data['results']], ['deleted', 'not_found'])
+        self.assertEqual(Perfume.objects.count(), 3)
+
+    def test_admin_export_streams_ndjson_and_csv(self):
+        """
+        Test the streaming catalog export in each format, with and without gzip.
+        """
+        Perfume.objects.create(**{**self._bulk_payload("Inactive"), "imageUrl": "", "isActive": False})
+        url = reverse('admin-perfume-export')
+
+        response = self.client.get(url, secure=True)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[0])['nameAr'], "عطر إداري")
+
+        response = self.client.get(url, {'exportFormat': 'csv', 'activeOnly': 'true', 'gzip': 'true'}, secure=True)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="perfumes.csv.gz"')
+        rows = list(csv.DictReader(io.StringIO(gzip.decompress(b''.join(response.streaming_content)).decode('utf-8'))))
+        self.assertEqual([row['nameEn'] for row in rows], ["Admin Perfume"])
+        self.assertEqual(json.loads(rows[0]['sizes']), [{"size": "100ml", "priceEGP": 1000.0}])
+
+        response = self.client.get(url, {'exportFormat': 'xml'}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_management_command(self):
+        """
+        Test the export_perfumes management command writing to stdout and to a gzipped file.
+        """
+        out = io.StringIO()
+        call_command('export_perfumes', stdout=out)
+        self.assertEqual(json.loads(out.getvalue())['nameEn'], "Admin Perfume")
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'perfumes.csv.gz')
+            call_command('export_perfumes', format='csv', gzip=True, output=path, chunk_size=1)
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                self.assertEqual(next(csv.DictReader(f))['nameEn'], "Admin Perfume")
+
     def test_unauthorized_access(self):
         """
         Test that a non-admin user cannot access the admin endpoints.
@@ -229,4 +770,1199 @@ class PerfumeAdminAPITest(APITestCase):
         self.client.credentials() # Remove authentication
         url = reverse('admin-perfume-list')
         response = self.client.get(url, format='json', secure=True)
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+class CatalogGenerationTest(APITestCase):
+    """
+    Test suite for the generation counters shared by all workers.
+    """
+
+    def setUp(self):
+        cache.clear()
+        catalog.forget_generations()
+        seed_catalog(10)
+
+    def _bump_elsewhere(self):
+        """Bump the catalog generation the way another worker would, behind this process's back."""
+        GenerationCounter.objects.filter(key=catalog.CATALOG_GENERATION_KEY).update(value=F('value') + 1)
+
+    def test_bumps_are_numbered_in_the_database(self):
+        """
+        Test that the counter starts in the database, and each bump advances it there by one.
+        """
+        generation = get_catalog_generation()
+        self.assertEqual(GenerationCounter.objects.get(key=catalog.CATALOG_GENERATION_KEY).value, generation)
+        self.assertEqual(bump_catalog_generation(), generation + 1)
+        self.assertEqual(get_catalog_generation(), generation + 1)
+        self.assertEqual(GenerationCounter.objects.get(key=catalog.CATALOG_GENERATION_KEY).value, generation + 1)
+
+    def test_another_workers_write_retires_cached_responses(self):
+        """
+        Test that a generation bumped by another worker is seen once the check interval has passed.
+        """
+        url = reverse('perfume-list')
+        with within_check_interval:
+            etag = self.client.get(url, secure=True)['ETag']
+            facet_index.values('brand')
+            self._bump_elsewhere()
+            self.assertEqual(self.client.get(url, secure=True)['ETag'], etag)
+        with mock.patch.object(catalog, 'GENERATION_CHECK_INTERVAL', 0):
+            self.assertNotEqual(self.client.get(url, secure=True)['ETag'], etag)
+            with CaptureQueriesContext(connection) as queries:
+                facet_index.values('brand')
+        self.assertTrue(any('"perfumes"' in query['sql'] for query in queries.captured_queries))
+
+    def test_rolled_back_bumps_are_not_reused(self):
+        """
+        Test that the number of a bump whose transaction rolled back is never handed out again.
+        """
+        generation = get_catalog_generation()
+        with self.assertRaises(ValueError), transaction.atomic():
+            self.assertEqual(bump_catalog_generation(), generation + 1)
+            raise ValueError("admin write failed")
+        with mock.patch.object(catalog, 'GENERATION_CHECK_INTERVAL', 0):
+            self.assertEqual(get_catalog_generation(), generation + 2)
+        self.assertEqual(bump_catalog_generation(), generation + 3)
+
+    def test_last_generation_is_used_during_an_outage(self):
+        """
+        Test that a process that cannot read the counter keeps using the value it read last.
+        """
+        generation = get_catalog_generation()
+        with mock.patch.object(catalog, 'GENERATION_CHECK_INTERVAL', 0), \
+                connection.execute_wrapper(_database_unreachable):
+            self.assertEqual(get_catalog_generation(), generation)
+            catalog.forget_generations()
+            with self.assertRaises(OperationalError):
+                get_catalog_generation()
+
+
+class InstrumentationTest(APITestCase):
+    """
+    Test suite for the request metrics middleware and the metrics endpoint.
+    """
+
+    def setUp(self):
+        cache.clear()
+        facet_index.invalidate()
+        search_index.invalidate()
+        instrumentation.registry.reset()
+        seed_catalog(5)
+
+    def test_server_timing_header(self):
+        """
+        Test that responses carry a Server-Timing header with db, serialize, render and total entries.
+        """
+        response = self.client.get(reverse('perfume-list'), secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertRegex(timing, r'serialize;dur=[\d.]+')
+        self.assertRegex(timing, r'render;dur=[\d.]+')
+        self.assertIn(f'size;desc="{len(response.content)} bytes"', timing)
+        self.assertRegex(timing, r'total;dur=[\d.]+$')
+
+    def test_metrics_endpoint(self):
+        """
+        Test that /api/metrics/ is admin-only and exposes per-view histograms in the Prometheus format.
+        """
+        self.client.get(reverse('perfume-list'), secure=True)
+        self.client.get(reverse('perfume-list'), secure=True)
+        response = self.client.get(reverse('metrics'), secure=True)
+        self.assertIn(response.status_code, (status.HTTP_401_UNAUTHORIZED, status.HTTP_403_FORBIDDEN))
+
+        admin = Admin.objects.create_superuser(name='metrics', password='x')
+        self.client.force_authenticate(admin)
+        response = self.client.get(reverse('metrics'), secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('# TYPE perfume_http_request_duration_seconds histogram', body)
+        self.assertIn('perfume_http_request_duration_seconds_bucket{view="perfume-list",le="+Inf"} 2', body)
+        self.assertIn('perfume_http_request_duration_seconds_count{view="perfume-list"} 2', body)
+        self.assertIn('perfume_http_requests_total{view="perfume-list",method="GET",status="200"} 2', body)
+        self.assertRegex(body, r'perfume_db_queries_total\{view="perfume-list"\} [1-9]')
+
+    def test_slow_requests_are_logged(self):
+        """
+        Test that requests over the threshold are logged with their queries and counted.
+        """
+        with mock.patch.object(instrumentation, 'SLOW_REQUEST_THRESHOLD_MS', 0):
+            with self.assertLogs('perfume_store_backend.slow_requests', level='WARNING') as logs:
+                self.client.get(reverse('perfume-list'), secure=True)
+        self.assertIn('Slow request: GET /api/perfumes/', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+        self.assertIn('perfume_slow_requests_total{view="perfume-list"} 1', instrumentation.registry.render_prometheus())
+
+
+class ResponseEncodingTest(APITestCase):
+    """
+    Test suite for the JSON renderer and negotiated response compression.
+    """
+
+    def setUp(self):
+        cache.clear()
+        facet_index.invalidate()
+        search_index.invalidate()
+        seed_catalog(20)
+
+    @unittest.skipUnless(orjson, "orjson is not installed")
+    def test_fast_renderer_matches_drf(self):
+        """
+        Test that the orjson renderer writes exactly DRF's bytes for UUIDs, datetimes, Decimals and non-ASCII text.
+        """
+        data = {
+            'id': uuid.uuid4(),
+            'createdAt': datetime.datetime(2024, 5, 1, 12, 30, 15, 250000, tzinfo=datetime.timezone.utc),
+            'price': decimal.Decimal('199.50'),
+            'nameAr': 'عطر الليل \u2028',
+            7: [1.5, None, True, ('a', 'b')],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+    def test_negotiate_encoding(self):
+        """
+        Test that Accept-Encoding quality values, wildcards and refusals pick the right coding.
+        """
+        preferred = compression.SUPPORTED_ENCODINGS[0]
+        cases = [
+            ('', None),
+            ('identity', None),
+            ('gzip', 'gzip'),
+            ('gzip;q=0', None),
+            ('deflate, gzip;q=0.5, br', preferred),
+            ('*', preferred),
+            ('*, gzip;q=0', 'br' if 'br' in compression.SUPPORTED_ENCODINGS else None),
+        ]
+        factory = RequestFactory()
+        for header, expected in cases:
+            with self.subTest(header=header):
+                request = factory.get('/', HTTP_ACCEPT_ENCODING=header)
+                self.assertEqual(compression.negotiate_encoding(request), expected)
+
+    @within_check_interval
+    def test_cached_responses_are_compressed_once(self):
+        """
+        Test that catalog responses are stored compressed per coding, served without recompressing and revalidated.
+        """
+        url = reverse('perfume-list')
+        plain = self.client.get(url, {'limit': 20}, secure=True)
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', plain['Vary'])
+
+        first = self.client.get(url, {'limit': 20}, secure=True, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(first['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(first.content), plain.content)
+        self.assertLess(len(first.content), len(plain.content))
+        self.assertNotEqual(first['ETag'], plain['ETag'])
+
+        with mock.patch('perfume_store_backend.perfumes.response_cache.compress') as compress, \
+                CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url, {'limit': 20}, secure=True, HTTP_ACCEPT_ENCODING='gzip')
+        compress.assert_not_called()
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['Content-Encoding'], 'gzip')
+
+        revalidated = self.client.get(url, {'limit': 20}, secure=True, HTTP_ACCEPT_ENCODING='gzip',
+                                      HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(revalidated.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_small_responses_are_not_compressed(self):
+        """
+        Test that bodies under COMPRESSION_MIN_SIZE are sent as they are.
+        """
+        perfume_id = Perfume.objects.filter(isActive=True).values_list('id', flat=True).first()
+        response = self.client.get(reverse('perfume-detail', args=[perfume_id]), secure=True,
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertLess(len(response.content), compression.COMPRESSION_MIN_SIZE)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.json()['id'], str(perfume_id))
+
+    def test_middleware_compresses_uncached_responses(self):
+        """
+        Test that the middleware compresses large responses outside the catalog cache too.
+        """
+        admin = Admin.objects.create_superuser(name='encoding', password='x')
+        self.client.force_authenticate(admin)
+        response = self.client.get(reverse('admin-perfume-list'), secure=True, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        body = json.loads(gzip.decompress(response.content))
+        self.assertEqual(body['pagination']['totalItems'], 20)
+
+
+class TieredCacheTest(SimpleTestCase):
+    """
+    Test suite for the two-tier (in-process L1 + shared) cache backend.
+    """
+
+    def _worker_cache(self, location='tiered-cache-test', **options):
+        # Two instances over the same shared location behave like two workers.
+        options.setdefault('SHARED_BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+        options.setdefault('L1_KEY_PREFIXES', ['catalog_response_'])
+        return TieredCache(location, {'OPTIONS': options})
+
+    def test_local_lru_evicts_and_expires(self):
+        """
+        Test that the L1 is bounded by size and by TTL.
+        """
+        lru = LocalLRU(max_entries=2, timeout=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual(lru.get('b'), (False, None))
+        self.assertEqual(lru.get('a'), (True, 1))
+        lru.set('d', 4, timeout=0.01)
+        time.sleep(0.02)
+        self.assertEqual(lru.get('d'), (False, None))
+
+    def test_hot_keys_are_served_from_l1(self):
+        """
+        Test that repeated reads of L1-eligible keys do not reach the shared tier.
+        """
+        worker = self._worker_cache()
+        worker.clear()
+        worker.set('catalog_response_x', b'body')
+        worker._shared.delete('catalog_response_x')
+        self.assertEqual(worker.get('catalog_response_x'), b'body')
+        worker.set('admin_login_attempts_1', 3)
+        worker._shared.delete('admin_login_attempts_1')
+        self.assertIsNone(worker.get('admin_login_attempts_1'))
+
+    def test_get_many_fetches_l1_misses_at_once(self):
+        """
+        Test that get_many serves L1 hits locally and asks the shared tier for all other keys in one request.
+        """
+        worker_a, worker_b = self._worker_cache(), self._worker_cache()
+        worker_a.clear()
+        worker_a.set_many({'catalog_response_x': 'x', 'catalog_response_y': 'y', 'admin_login_attempts_1': 2})
+        worker_b.get('catalog_response_x')
+        keys = ['catalog_response_x', 'catalog_response_y', 'admin_login_attempts_1', 'catalog_response_z']
+        with mock.patch.object(worker_b._shared, 'get_many', wraps=worker_b._shared.get_many) as get_many:
+            self.assertEqual(worker_b.get_many(keys),
+                             {'catalog_response_x': 'x', 'catalog_response_y': 'y', 'admin_login_attempts_1': 2})
+            get_many.assert_called_once_with(keys[1:], version=None)
+            # The L1 keys it fetched are now local too
+            worker_b.get_many(['catalog_response_y'])
+            self.assertEqual(get_many.call_count, 1)
+
+    @unittest.skipUnless(fakeredis, "fakeredis is not installed")
+    def test_redis_shared_tier_counters(self):
+        """
+        Test counters against a Redis-protocol shared tier: atomic and visible to every worker.
+        """
+        options = {
+            'SHARED_BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'SHARED_OPTIONS': {'connection_class': fakeredis.FakeConnection},
+        }
+        worker_a = self._worker_cache('redis://tiered-cache-test:6379/0', **options)
+        worker_b = self._worker_cache('redis://tiered-cache-test:6379/0', **options)
+        worker_a.clear()
+        worker_a.set('admin_login_attempts_1', 0)
+        for worker in (worker_a, worker_b, worker_a):
+            worker.incr('admin_login_attempts_1')
+        self.assertEqual(worker_b.get('admin_login_attempts_1'), 3)
+        worker_b.set('catalog_response_y', {'perfumes': []})
+        self.assertEqual(worker_a.get('catalog_response_y'), {'perfumes': []})
+
+
+def _explain(sql):
+    """Query plan for `sql` as a list of (node, relation) pairs, on PostgreSQL or SQLite."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+            raw = cursor.fetchone()[0]
+            plan = json.loads(raw) if isinstance(raw, str) else raw
+            nodes, stack = [], [plan[0]['Plan']]
+            while stack:
+                node = stack.pop()
+                nodes.append((node['Node Type'], node.get('Relation Name')))
+                stack.extend(node.get('Plans', ()))
+            return nodes
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        return [(row[-1], None) for row in cursor.fetchall()]
+
+
+def _is_seq_scan_plus_sort(nodes):
+    if connection.vendor == 'postgresql':
+        seq_scan = any(node == 'Seq Scan' and relation == 'perfumes' for node, relation in nodes)
+        sort = any(node == 'Sort' for node, relation in nodes)
+    else:
+        seq_scan = any(re.fullmatch(r'SCAN (TABLE )?perfumes', node) for node, relation in nodes)
+        sort = any(node == 'USE TEMP B-TREE FOR ORDER BY' for node, relation in nodes)
+    return seq_scan and sort
+
+
+class AsyncURLConf:
+    """Root URLconf with the public perfume routes on the async views, as under asgi.py."""
+    urlpatterns = [path('api/', include(perfume_urlpatterns(async_views=True)))]
+
+
+class AsyncPublicViewsTest(TestCase):
+    """
+    Test suite for the async list and detail views.
+    """
+
+    def setUp(self):
+        cache.clear()
+        facet_index.invalidate()
+        search_index.invalidate()
+        seed_catalog(30)
+        self.perfume = Perfume.objects.filter(isActive=True).first()
+
+    def test_async_views_match_sync_views(self):
+        """
+        Test that the async views answer every kind of request with the same status and body as the DRF views.
+        """
+        requests = [
+            (reverse('perfume-list'), {}),
+            (reverse('perfume-list'), {'language': 'ar', 'page': 2, 'limit': 5}),
+            (reverse('perfume-list'), {'brandFilter': BRANDS[0][0], 'stockStatusFilter': 'in_stock', 'sort': 'price_asc'}),
+            (reverse('perfume-list'), {'searchTerm': 'vanilla'}),
+            (reverse('perfume-list'), {'cursor': '', 'includeTotal': 'true', 'limit': 4}),
+            (reverse('perfume-list'), {'sort': 'sideways'}),
+            (reverse('perfume-list'), {'cursor': 'garbage'}),
+            (reverse('perfume-detail', args=[self.perfume.id]), {}),
+            (reverse('perfume-detail', args=[uuid.uuid4()]), {}),
+            (reverse('perfume-detail', args=['not-a-uuid']), {}),
+            (reverse('perfume-batch'), {'ids': f'{self.perfume.id},{uuid.uuid4()}'}),
+            (reverse('perfume-batch'), {'ids': 'nope'}),
+            (reverse('perfume-list'), {'language': 'ar', 'languageOnly': 'true', 'fields': 'name,brand,sizes'}),
+            (reverse('perfume-detail', args=[self.perfume.id]), {'fields': 'nameEn,sizes'}),
+        ]
+        expected = [self.client.get(url, params, secure=True) for url, params in requests]
+        cache.clear()
+        with override_settings(ROOT_URLCONF=AsyncURLConf):
+            for (url, params), sync_response in zip(requests, expected):
+                response = async_to_sync(self.async_client.get)(url, params, secure=True)
+                self.assertEqual(response.status_code, sync_response.status_code, (url, params))
+                self.assertEqual(response.content, sync_response.content, (url, params))
+                self.assertEqual(response.get('Content-Type'), sync_response.get('Content-Type'), (url, params))
+
+            response = async_to_sync(self.async_client.post)(
+                reverse('perfume-batch'), {'ids': [str(self.perfume.id)]}, content_type='application/json', secure=True)
+            self.assertEqual(response.json()['perfumes'][0]['id'], str(self.perfume.id))
+
+    @override_settings(ROOT_URLCONF=AsyncURLConf)
+    @within_check_interval
+    async def test_async_list_is_cached_and_instrumented(self):
+        """
+        Test that async responses go through the response cache and carry query counts in Server-Timing.
+        """
+        url = reverse('perfume-list')
+        await catalog.aget_catalog_generation()
+        first = await self.async_client.get(url, secure=True)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertIn('db;dur=', first['Server-Timing'])
+        self.assertIn('desc="2 queries"', first['Server-Timing'])
+        second = await self.async_client.get(url, secure=True)
+        self.assertIn('desc="0 queries"', second['Server-Timing'])
+        self.assertEqual(second.content, first.content)
+        not_modified = await self.async_client.get(url, secure=True, headers={'If-None-Match': first['ETag']})
+        self.assertEqual(not_modified.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+def _database_unreachable(execute, sql, params, many, context):
+    raise OperationalError("could not connect to server")
+
+
+class CatalogSnapshotTest(APITestCase):
+    """
+    Test suite for the on-disk catalog snapshot.
+    """
+
+    def setUp(self):
+        cache.clear()
+        facet_index.invalidate()
+        search_index.invalidate()
+        catalog.forget_generations()
+        seed_catalog(40)
+        snapshot_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(snapshot_dir.cleanup)
+        self.path = os.path.join(snapshot_dir.name, 'catalog.snapshot')
+        patcher = mock.patch.object(snapshot, 'CATALOG_SNAPSHOT_PATH', self.path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.perfume = Perfume.objects.filter(isActive=True).order_by('nameEn').first()
+
+    def test_snapshot_is_written_atomically_and_versioned(self):
+        """
+        Test that a snapshot replaces the file in one rename, records its generation and refuses to go backwards.
+        """
+        self.assertEqual(snapshot.write_catalog_snapshot(5), Perfume.objects.filter(isActive=True).count())
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ['catalog.snapshot'])
+        opened = snapshot.CatalogSnapshot.open(self.path)
+        self.assertEqual(opened.generation, 5)
+        self.assertEqual(opened.find([self.perfume.id])[self.perfume.id]['nameEn'], self.perfume.nameEn)
+
+        self.assertIsNone(snapshot.write_catalog_snapshot(4))
+        self.assertEqual(snapshot.CatalogSnapshot.open(self.path).generation, 5)
+
+        with open(self.path, 'r+b') as f:
+            f.write(b'PERFUME-CATALOG-SNAPSHOT 0')
+        with self.assertRaises(snapshot.SnapshotError):
+            snapshot.CatalogSnapshot.open(self.path)
+
+    @within_check_interval
+    def test_current_snapshot_answers_like_the_database(self):
+        """
+        Test that a current snapshot answers list, detail and batch requests with the database's bodies and no queries.
+        """
+        requests = [
+            (reverse('perfume-list'), {}),
+            (reverse('perfume-list'), {'page': 2, 'limit': 7}),
+            (reverse('perfume-list'), {'language': 'ar', 'brandFilter': BRANDS[0][1], 'sort': 'name'}),
+            (reverse('perfume-list'), {'categoryFilter': CATEGORIES[1][0], 'genderFilter': GENDERS[0][0]}),
+            (reverse('perfume-list'), {'stockStatusFilter': 'in_stock', 'sort': 'price_desc', 'limit': 50}),
+            (reverse('perfume-list'), {'minPrice': '800', 'maxPrice': '1500.50', 'sort': 'price_asc'}),
+            (reverse('perfume-list'), {'stockStatusFilter': 'bogus'}),
+            (reverse('perfume-list'), {'language': 'ar', 'languageOnly': 'true', 'fields': 'name,sizes'}),
+            (reverse('perfume-detail', args=[self.perfume.id]), {}),
+            (reverse('perfume-detail', args=[uuid.uuid4()]), {}),
+            (reverse('perfume-batch'), {'ids': f'{uuid.uuid4()},{self.perfume.id}', 'fields': 'name'}),
+        ]
+        with mock.patch.object(snapshot, 'CATALOG_SNAPSHOT_PATH', ''):
+            expected = [self.client.get(url, params, secure=True) for url, params in requests]
+
+        snapshot.write_catalog_snapshot(bump_catalog_generation())
+        with self.assertNumQueries(0):
+            for (url, params), database_response in zip(requests, expected):
+                response = self.client.get(url, params, secure=True)
+                self.assertEqual(response.status_code, status.HTTP_200_OK, (url, params))
+                self.assertEqual(response.content, database_response.content, (url, params))
+                self.assertFalse(response.has_header('X-Catalog-Snapshot'))
+
+        # Again on the async views, past the responses cached above
+        snapshot.write_catalog_snapshot(bump_catalog_generation())
+        with override_settings(ROOT_URLCONF=AsyncURLConf), self.assertNumQueries(0):
+            for (url, params), database_response in zip(requests, expected):
+                response = async_to_sync(self.async_client.get)(url, params, secure=True)
+                self.assertEqual(response.content, database_response.content, (url, params))
+
+    def test_snapshot_is_current_only_at_the_shared_generation(self):
+        """
+        Test that a starting worker does not take a snapshot on disk for current after another worker's write.
+        """
+        generation = get_catalog_generation()
+        snapshot.write_catalog_snapshot(generation)
+        # Another worker renames a perfume and bumps the shared counter
+        Perfume.objects.filter(id=self.perfume.id).update(nameEn='Renamed')
+        GenerationCounter.objects.filter(key=catalog.CATALOG_GENERATION_KEY).update(value=F('value') + 1)
+
+        catalog.forget_generations()
+        snapshot.catalog_snapshot.load()
+        self.assertIsNone(snapshot.current_snapshot())
+        response = self.client.get(reverse('perfume-detail', args=[self.perfume.id]), secure=True)
+        self.assertEqual(response.json()['nameEn'], 'Renamed')
+
+        # Its snapshot, once written, is current everywhere; one for the older generation no longer replaces it
+        self.assertIsNotNone(snapshot.write_catalog_snapshot(generation + 1))
+        self.assertIsNone(snapshot.write_catalog_snapshot(generation))
+        self.assertEqual(snapshot.current_snapshot().generation, generation + 1)
+
+    def test_outdated_snapshot_serves_reads_during_an_outage(self):
+        """
+        Test that an outdated snapshot answers while the database is down, uncached and marked, and 503 otherwise.
+        """
+        snapshot.write_catalog_snapshot(get_catalog_generation())
+        Perfume.objects.filter(id=self.perfume.id).update(nameEn='Renamed')
+        bump_catalog_generation()
+        active = Perfume.objects.filter(isActive=True).count()
+
+        with connection.execute_wrapper(_database_unreachable), self.assertLogs(level='ERROR') as logs:
+            response = self.client.get(reverse('perfume-detail', args=[self.perfume.id]), secure=True)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.json()['nameEn'], self.perfume.nameEn)
+            self.assertEqual(response['Cache-Control'], 'no-store')
+            self.assertTrue(response.has_header('X-Catalog-Snapshot'))
+
+            response = self.client.get(reverse('perfume-list'), {'limit': 100}, secure=True)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.json()['pagination']['totalItems'], active)
+
+            response = self.client.get(reverse('perfume-batch'), {'ids': str(self.perfume.id)}, secure=True)
+            self.assertEqual(response.json()['missing'], [])
+
+            response = self.client.get(reverse('perfume-list'), {'searchTerm': 'vanilla'}, secure=True)
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            with mock.patch.object(snapshot, 'CATALOG_SNAPSHOT_PATH', ''):
+                response = self.client.get(reverse('perfume-detail', args=[self.perfume.id]), secure=True)
+                self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn('Database unavailable in PerfumeDetailView', logs.output[0])
+
+        response = self.client.get(reverse('perfume-detail', args=[self.perfume.id]), secure=True)
+        self.assertEqual(response.json()['nameEn'], 'Renamed')
+        self.assertFalse(response.has_header('X-Catalog-Snapshot'))
+
+    def test_write_catalog_snapshot_command(self):
+        """
+        Test that the management command bumps the generation and writes a current snapshot.
+        """
+        out = io.StringIO()
+        call_command('write_catalog_snapshot', stdout=out)
+        self.assertIn(f"Wrote {Perfume.objects.filter(isActive=True).count()} perfumes", out.getvalue())
+        self.assertIsNotNone(snapshot.current_snapshot())
+
+
+class CatalogSnapshotWriterTest(TransactionTestCase):
+    """
+    Test suite for rewriting the catalog snapshot after admin writes.
+    """
+
+    def setUp(self):
+        cache.clear()
+        facet_index.invalidate()
+        search_index.invalidate()
+        seed_catalog(10)
+        snapshot_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(snapshot_dir.cleanup)
+        patcher = mock.patch.object(snapshot, 'CATALOG_SNAPSHOT_PATH', os.path.join(snapshot_dir.name, 'catalog.snapshot'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Saved perfumes would otherwise have their imageUrl fetched after commit
+        patcher = mock.patch.object(images, 'PERFUME_IMAGE_ROOT', '')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_admin_writes_rewrite_the_snapshot(self):
+        """
+        Test that committed admin writes rewrite the snapshot in the background, current for a fresh worker too.
+        """
+        perfume = Perfume.objects.filter(isActive=True).first()
+        token = Token.objects.create(user=Admin.objects.create_superuser(name='snapshot', password='x'))
+        response = self.client.patch(reverse('admin-perfume-detail', args=[perfume.id]), {'nameEn': 'Snapshot Noir'},
+                                     content_type='application/json', secure=True,
+                                     HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        snapshot.snapshot_writer.wait()
+        written = snapshot.catalog_snapshot.get()
+        self.assertEqual(written.generation, get_catalog_generation())
+        self.assertEqual(written.find([perfume.id])[perfume.id]['nameEn'], 'Snapshot Noir')
+
+        cache.clear()
+        catalog.forget_generations()
+        self.assertIs(snapshot.catalog_snapshot.load(), written)
+        self.assertEqual(get_catalog_generation(), written.generation)
+        self.assertIs(snapshot.current_snapshot(), written)
+
+
+    def test_writer_survives_an_unexpected_error(self):
+        """
+        Test that a failed write of any kind is logged and the next request still writes a snapshot.
+        """
+        generation = get_catalog_generation()
+        with mock.patch.object(snapshot, 'write_catalog_snapshot', side_effect=TypeError("not serializable")):
+            with self.assertLogs(level='ERROR'):
+                snapshot.snapshot_writer.request(generation)
+                snapshot.snapshot_writer.wait()
+        self.assertIsNone(snapshot.snapshot_writer._thread)
+
+        snapshot.snapshot_writer.request(generation)
+        snapshot.snapshot_writer.wait()
+        self.assertEqual(snapshot.catalog_snapshot.get().generation, generation)
+
+class PerfumeChangesTest(APITestCase):
+    """
+    Test suite for the incremental catalog sync endpoint and its delete tombstones.
+    """
+
+    def setUp(self):
+        cache.clear()
+        facet_index.invalidate()
+        search_index.invalidate()
+        seed_catalog(30)
+        patcher = mock.patch.object(changes, 'CATALOG_CHANGES_LAG', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.url = reverse('perfume-changes')
+
+    def _sync(self, since=None, **params):
+        """Follow nextCursor until caught up; returns (perfume ids, removed ids, cursor, batches)."""
+        perfumes, removed, batches = [], [], 0
+        while True:
+            response = self.client.get(self.url, {**({'since': since} if since else {}), **params}, secure=True)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            perfumes += [perfume['id'] for perfume in response.data['perfumes']]
+            removed += response.data['removed']
+            since, batches = response.data['nextCursor'], batches + 1
+            if not response.data['hasMore']:
+                return perfumes, removed, since, batches
+
+    def test_full_sync_then_deltas(self):
+        """
+        Test that a sync from scratch pages through the catalog and later polls return only the changes.
+        """
+        perfumes, removed, cursor, batches = self._sync(limit=7)
+        active = {str(perfume_id) for perfume_id in Perfume.objects.filter(isActive=True).values_list('id', flat=True)}
+        self.assertEqual(set(perfumes), active)
+        self.assertEqual(len(perfumes), len(active))
+        self.assertEqual(set(removed), {str(perfume_id) for perfume_id in Perfume.objects.filter(isActive=False).values_list('id', flat=True)})
+        self.assertEqual(batches, 5)
+        self.assertEqual(self._sync(cursor)[:2], ([], []))
+
+        updated, deactivated, deleted = Perfume.objects.filter(isActive=True).order_by('nameEn')[:3]
+        admin = Admin.objects.create_superuser(name='sync', password='x')
+        self.client.force_authenticate(admin)
+        self.client.patch(reverse('admin-perfume-detail', args=[updated.id]), {'nameEn': 'Synced'}, format='json', secure=True)
+        self.client.post(reverse('admin-perfume-bulk-activate'), {'ids': [str(deactivated.id)], 'isActive': False},
+                         format='json', secure=True)
+        self.client.delete(reverse('admin-perfume-detail', args=[deleted.id]), secure=True)
+        self.client.force_authenticate(None)
+
+        response = self.client.get(self.url, {'since': cursor}, secure=True)
+        self.assertEqual([perfume['nameEn'] for perfume in response.data['perfumes']], ['Synced'])
+        self.assertEqual(response.data['removed'], [str(deactivated.id), str(deleted.id)])
+        self.assertFalse(response.data['hasMore'])
+        self.assertTrue(PerfumeTombstone.objects.filter(perfume_id=deleted.id).exists())
+
+    def test_recent_changes_wait_for_the_lag(self):
+        """
+        Test that changes younger than CATALOG_CHANGES_LAG are held back and the cursor stays behind them.
+        """
+        cursor = self._sync()[2]
+        perfume = Perfume.objects.filter(isActive=True).first()
+        perfume.save()
+        with mock.patch.object(changes, 'CATALOG_CHANGES_LAG', 60):
+            response = self.client.get(self.url, {'since': cursor}, secure=True)
+        self.assertEqual(response.data['perfumes'], [])
+        response = self.client.get(self.url, {'since': response.data['nextCursor']}, secure=True)
+        self.assertEqual([item['id'] for item in response.data['perfumes']], [str(perfume.id)])
+
+    def test_bad_and_expired_cursors(self):
+        """
+        Test that a malformed cursor is a 400 and one older than the tombstones is a 410.
+        """
+        response = self.client.get(self.url, {'since': 'not-a-cursor'}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        old = timezone.now() - datetime.timedelta(seconds=changes.CATALOG_TOMBSTONE_RETENTION + 60)
+        response = self.client.get(self.url, {'since': changes.encode_change_cursor(old, uuid.uuid4())}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+    def test_old_tombstones_are_pruned(self):
+        """
+        Test that recording deletions drops tombstones past the retention period.
+        """
+        old = timezone.now() - datetime.timedelta(seconds=changes.CATALOG_TOMBSTONE_RETENTION + 60)
+        PerfumeTombstone.objects.create(perfume_id=uuid.uuid4(), deleted_at=old)
+        perfume_id = uuid.uuid4()
+        changes.record_deletions([perfume_id])
+        self.assertEqual(list(PerfumeTombstone.objects.values_list('perfume_id', flat=True)), [perfume_id])
+
+
+@unittest.skipUnless(images.Image, "Pillow is not installed")
+class PerfumeImageTest(APITestCase):
+    """
+    Test suite for perfume image uploads, resized variants and their immutable URLs.
+    """
+
+    def setUp(self):
+        cache.clear()
+        facet_index.invalidate()
+        search_index.invalidate()
+        image_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(image_dir.cleanup)
+        self.image_root = image_dir.name
+        patcher = mock.patch.object(images, 'PERFUME_IMAGE_ROOT', self.image_root)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        token = Token.objects.create(user=Admin.objects.create_superuser(name='images', password='x'))
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token.key)
+        self.perfume = Perfume.objects.create(
+            nameEn="Pictured", nameAr="مصور", brandEn="Brand", brandAr="ماركة", categoryEn="Floral",
+            categoryAr="زهري", genderEn="Unisex", genderAr="للجنسين", descriptionEn="", descriptionAr="",
+            sizes=[{"size": "50ml", "priceEGP": 900}], stockStatus="In Stock", isActive=True,
+        )
+
+    def _png(self, width=800, height=600):
+        out = io.BytesIO()
+        images.Image.new('RGBA', (width, height), (200, 30, 90, 128)).save(out, 'PNG')
+        return out.getvalue()
+
+    def test_build_variants_stores_content_hashed_files(self):
+        """
+        Test that variants are made at each width up to the original's, in WebP and JPEG, under content-hashed names.
+        """
+        variants = images.build_variants(self._png(800, 600))
+        self.assertEqual(set(variants), {'webp', 'jpeg'})
+        self.assertEqual(list(variants['webp']), ['160', '320', '480', '640', '800'])
+        for image_format, urls in variants.items():
+            for width, url in urls.items():
+                name = url.rsplit('/', 1)[1]
+                self.assertTrue(url.startswith(images.PERFUME_IMAGE_URL))
+                self.assertRegex(name, images.STORED_NAME)
+                with images.Image.open(os.path.join(self.image_root, name)) as stored:
+                    self.assertEqual(stored.format, images.IMAGE_FORMATS[image_format][0])
+                    self.assertEqual(stored.size, (int(width), round(600 * int(width) / 800)))
+        self.assertEqual(images.build_variants(self._png(800, 600)), variants)
+        self.assertEqual(list(images.build_variants(self._png(2000, 1000))['jpeg']), ['160', '320', '480', '640', '960'])
+
+    def test_upload_queues_variants_and_responses_carry_them(self):
+        """
+        Test that an upload stores the original, makes the variants after commit and exposes them in public responses.
+        """
+        url = reverse('admin-perfume-image', args=[self.perfume.id])
+        with mock.patch.object(images, 'queue_perfume_images') as queue:
+            response = self.client.post(url, {'image': io.BytesIO(self._png())}, format='multipart', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertTrue(response.data['imageUrl'].startswith('https://testserver/media/perfumes/'))
+        self.assertEqual(response.data['imageVariants'], {})
+        queue.assert_called_once_with([self.perfume.id])
+
+        self.assertTrue(images.process_perfume_image(self.perfume.id))
+        self.assertFalse(images.process_perfume_image(self.perfume.id))
+        self.perfume.refresh_from_db()
+        self.assertEqual(self.perfume.imageSource, self.perfume.imageUrl)
+
+        self.client.credentials()
+        response = self.client.get(reverse('perfume-detail', args=[self.perfume.id]), secure=True)
+        self.assertEqual(response.data['imageVariants'], self.perfume.imageVariants)
+        self.assertIn('640', response.data['imageVariants']['webp'])
+        response = self.client.get(reverse('perfume-list'), secure=True)
+        self.assertEqual(response.data['perfumes'][0]['imageVariants'], self.perfume.imageVariants)
+
+    def test_changing_the_image_url_drops_the_variants(self):
+        """
+        Test that variants made from one imageUrl are not served for another, and that the change queues new ones.
+        """
+        self.perfume.imageUrl = 'http://example.com/old.jpg'
+        self.perfume.save()
+        Perfume.objects.filter(id=self.perfume.id).update(
+            imageSource='http://example.com/old.jpg', imageVariants={'webp': {'160': '/media/perfumes/x.webp'}},
+        )
+        url = reverse('admin-perfume-detail', args=[self.perfume.id])
+        with mock.patch.object(images, 'queue_perfume_images') as queue:
+            response = self.client.patch(url, {'nameEn': 'Renamed'}, format='json', secure=True)
+            self.assertEqual(response.data['imageVariants'], {'webp': {'160': '/media/perfumes/x.webp'}})
+            queue.assert_called_once_with([])
+            queue.reset_mock()
+            response = self.client.patch(url, {'imageUrl': 'http://example.com/new.jpg'}, format='json', secure=True)
+            self.assertEqual(response.data['imageVariants'], {})
+            queue.assert_called_once_with([self.perfume.id])
+
+    def test_fetches_only_from_allowed_hosts(self):
+        """
+        Test that a remote imageUrl is downloaded only over an allowed scheme from an allowed host, redirects included.
+        """
+        response = mock.MagicMock()
+        response.__enter__.return_value.read.return_value = self._png()
+        with mock.patch.object(images._fetch_opener, 'open', return_value=response) as urlopen:
+            for url in ('https://example.com/a.png', 'http://images.example.com/a.png',
+                        'file:///etc/passwd', 'https://169.254.169.254/latest/meta-data'):
+                with self.assertRaises(images.ImageError):
+                    images.fetch_image(url)
+            urlopen.assert_not_called()
+            with mock.patch.object(images, 'IMAGE_FETCH_HOSTS', ['.example.com']):
+                self.assertEqual(images.fetch_image('https://images.example.com/a.png'), self._png())
+                with self.assertRaises(images.ImageError):
+                    images.fetch_image('https://127.0.0.1/a.png')
+        redirect = images._CheckedRedirectHandler()
+        request = urllib.request.Request('https://images.example.com/a.png')
+        with mock.patch.object(images, 'IMAGE_FETCH_HOSTS', ['.example.com']):
+            with self.assertRaises(images.ImageError):
+                redirect.redirect_request(request, None, 302, 'Found', {}, 'http://localhost/admin')
+            self.assertIsNotNone(redirect.redirect_request(request, None, 302, 'Found', {}, 'https://cdn.example.com/a.png'))
+
+    def test_rejects_files_that_are_not_images(self):
+        """
+        Test that an upload that does not decode as a supported image is refused and nothing is stored.
+        """
+        url = reverse('admin-perfume-image', args=[self.perfume.id])
+        response = self.client.post(url, {'image': io.BytesIO(b'not an image')}, format='multipart', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(os.listdir(self.image_root), [])
+        with mock.patch.object(images, 'PERFUME_IMAGE_ROOT', ''):
+            response = self.client.post(url, {'image': io.BytesIO(self._png())}, format='multipart', secure=True)
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_stored_images_are_served_immutable(self):
+        """
+        Test that stored files are served with a year-long immutable Cache-Control and that other names are not found.
+        """
+        name = images.build_variants(self._png())['webp']['320'].rsplit('/', 1)[1]
+        response = self.client.get(reverse('perfume-image', args=[name]), secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        self.assertEqual(b''.join(response.streaming_content)[:4], b'RIFF')
+        for missing in ('0' * 32 + '.webp', 'catalog.snapshot'):
+            response = self.client.get(reverse('perfume-image', args=[missing]), secure=True)
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+
+@unittest.skipUnless(images.Image, "Pillow is not installed")
+class ImageWorkerTest(TransactionTestCase):
+    """
+    Test suite for the background thread that makes image variants.
+    """
+
+    def setUp(self):
+        cache.clear()
+        image_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(image_dir.cleanup)
+        patcher = mock.patch.object(images, 'PERFUME_IMAGE_ROOT', image_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_worker_survives_an_unexpected_error(self):
+        """
+        Test that an error that is not an ImageError or OSError is logged and later requests still make variants.
+        """
+        out = io.BytesIO()
+        images.Image.new('RGB', (400, 300), (200, 30, 90)).save(out, 'PNG')
+        perfume = Perfume.objects.create(
+            nameEn="Pictured", nameAr="مصور", brandEn="Brand", brandAr="ماركة", categoryEn="Floral",
+            categoryAr="زهري", genderEn="Unisex", genderAr="للجنسين", descriptionEn="", descriptionAr="",
+            sizes=[{"size": "50ml", "priceEGP": 900}], stockStatus="In Stock", isActive=True,
+            imageUrl=images.store_original(out.getvalue()),
+        )
+        with mock.patch.object(images, 'process_perfume_image', side_effect=http.client.IncompleteRead(b'')):
+            with self.assertLogs(level='ERROR'):
+                images.image_worker.request(perfume.id)
+                images.image_worker.wait()
+        self.assertIsNone(images.image_worker._thread)
+
+        images.image_worker.request(perfume.id)
+        images.image_worker.wait()
+        perfume.refresh_from_db()
+        self.assertIn('320', perfume.imageVariants['webp'])
+
+class CollectionsTest(APITestCase):
+    """
+    Test suite for the homepage collections endpoint and the list's flag filters.
+    """
+
+    def setUp(self):
+        cache.clear()
+        facet_index.invalidate()
+        search_index.invalidate()
+        catalog.forget_generations()
+        seed_catalog(300)
+        self.url = reverse('collection-list')
+
+    def _newest(self, **filters):
+        queryset = Perfume.objects.filter(isActive=True, **filters).order_by('-created_at', '-id')
+        return [str(perfume_id) for perfume_id in queryset.values_list('id', flat=True)[:rails.COLLECTION_RAIL_SIZE]]
+
+    def _rail_ids(self, language):
+        collections = rails.get_collections(language)
+        rows = collections['new'] + collections['bestseller']
+        rows += [row for kind in ('brands', 'categories') for _, group in collections[kind] for row in group]
+        return {row['id'] for row in rows}
+
+    def test_collections_hold_the_newest_of_each_rail(self):
+        """
+        Test that each rail holds the newest active perfumes it selects, with the biggest brands and categories first.
+        """
+        response = self.client.get(self.url, {'language': 'ar'}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([perfume['id'] for perfume in response.data['new']], self._newest(isNew=True))
+        self.assertEqual([perfume['id'] for perfume in response.data['bestseller']], self._newest(isBestseller=True))
+        brand_counts = facet_index.counts('brand', 'ar')
+        names = [group['name'] for group in response.data['brands']]
+        self.assertEqual(len(names), rails.COLLECTION_GROUPS)
+        self.assertEqual(names, sorted(brand_counts, key=lambda name: (-brand_counts[name], name))[:rails.COLLECTION_GROUPS])
+        for group in response.data['brands']:
+            self.assertEqual([perfume['id'] for perfume in group['perfumes']], self._newest(brandAr=group['name']))
+        self.assertEqual(len(response.data['categories']), rails.COLLECTION_GROUPS)
+
+    @within_check_interval
+    def test_writes_carry_the_rails_forward(self):
+        """
+        Test that after admin writes the rails are served without queries and match a rebuild from scratch.
+        """
+        self.client.get(self.url, secure=True)
+        self.client.get(self.url, {'language': 'ar'}, secure=True)
+        in_rails = self._rail_ids('en') | self._rail_ids('ar')
+        outsider = Perfume.objects.filter(isActive=True, isNew=False, isBestseller=False).exclude(id__in=in_rails).first()
+        member = Perfume.objects.get(id=self._newest(isNew=True)[0])
+        newcomer = Perfume.objects.filter(isActive=True, isBestseller=False).order_by('-created_at', '-id').first()
+        self.client.force_authenticate(Admin.objects.create_superuser(name='rails', password='x'))
+        for perfume, values, requeried in ((outsider, {'descriptionEn': 'Quiet'}, False),
+                                           (member, {'nameEn': 'Railed'}, True),
+                                           (newcomer, {'isBestseller': True}, True)):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.patch(reverse('admin-perfume-detail', args=[perfume.id]), values,
+                                             format='json', secure=True)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            rail_queries = [query for query in queries.captured_queries if 'LIMIT 12' in query['sql']]
+            self.assertEqual(bool(rail_queries), requeried, values)
+        self.client.force_authenticate(None)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, secure=True)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(response.data['new'][0]['nameEn'], 'Railed')
+        self.assertEqual(response.data['bestseller'][0]['id'], str(newcomer.id))
+        carried = {language: rails.get_collections(language) for language in ('en', 'ar')}
+        cache.clear()
+        facet_index.invalidate()
+        self.assertEqual({language: rails.get_collections(language) for language in ('en', 'ar')}, carried)
+
+    @within_check_interval
+    def test_list_filters_on_flags_from_database_and_snapshot(self):
+        """
+        Test that isNew/isBestseller narrow the public list, whether it is answered by the database or the snapshot.
+        """
+        params = {'isBestseller': 'true', 'limit': 100}
+        snapshot_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(snapshot_dir.cleanup)
+        with mock.patch.object(snapshot, 'CATALOG_SNAPSHOT_PATH', ''):
+            from_database = self.client.get(reverse('perfume-list'), params, secure=True).data
+        self.assertEqual([perfume['id'] for perfume in from_database['perfumes']][:12], self._newest(isBestseller=True))
+        self.assertTrue(all(perfume['isBestseller'] for perfume in from_database['perfumes']))
+        with mock.patch.object(snapshot, 'CATALOG_SNAPSHOT_PATH', os.path.join(snapshot_dir.name, 'catalog.snapshot')):
+            snapshot.write_catalog_snapshot(bump_catalog_generation())
+            with self.assertNumQueries(0):
+                from_snapshot = self.client.get(reverse('perfume-list'), params, secure=True).data
+        self.assertEqual(from_snapshot, from_database)
+
+
+@mock.patch.object(db_routers, 'REPLICA_DB_ALIAS', 'replica')
+class ReplicaRoutingTest(SimpleTestCase):
+    """
+    Test suite for the read-replica router and the middleware that pins requests to the primary.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.router = db_routers.PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+
+    def _route(self, request, status_code=200):
+        """Run `request` through the middleware; returns where a read inside the view would go."""
+        routed = []
+
+        def view(request):
+            routed.append(self.router.db_for_read(Perfume))
+            return HttpResponse(status=status_code)
+
+        db_routers.ReplicaRoutingMiddleware(view)(request)
+        return routed[0]
+
+    def test_reads_go_to_the_replica_and_writes_to_the_primary(self):
+        """
+        Test the router's decisions outside any request.
+        """
+        self.assertEqual(self.router.db_for_read(Perfume), 'replica')
+        self.assertEqual(self.router.db_for_write(Perfume), 'default')
+        self.assertTrue(self.router.allow_migrate('default', 'perfumes'))
+        self.assertFalse(self.router.allow_migrate('replica', 'perfumes'))
+        with db_routers.use_primary():
+            self.assertEqual(self.router.db_for_read(Perfume), 'default')
+
+    def test_unsafe_requests_read_from_the_primary(self):
+        """
+        Test that public reads use the replica, and requests that write use the primary.
+        """
+        self.assertEqual(self._route(self.factory.get('/api/perfumes/')), 'replica')
+        self.assertEqual(self._route(self.factory.post('/api/perfumes/batch/')), 'default')
+        self.assertEqual(self._route(self.factory.delete('/api/admin/perfumes/1/')), 'default')
+        # None of those was an authenticated write
+        self.assertEqual(self._route(self.factory.get('/api/perfumes/')), 'replica')
+
+    def test_reads_stay_on_the_primary_after_an_admin_write(self):
+        """
+        Test read-your-writes: after an authenticated write, reads use the primary until the sticky window ends.
+        """
+        self._route(self.factory.patch('/api/admin/perfumes/1/', HTTP_AUTHORIZATION='Token abc'), status_code=400)
+        self.assertEqual(self._route(self.factory.get('/api/perfumes/')), 'replica')
+
+        self._route(self.factory.patch('/api/admin/perfumes/1/', HTTP_AUTHORIZATION='Token abc'))
+        self.assertEqual(self._route(self.factory.get('/api/admin/perfumes/', HTTP_AUTHORIZATION='Token abc')), 'default')
+        # Public reads too, so nothing stale is cached under the new catalog generation
+        self.assertEqual(self._route(self.factory.get('/api/perfumes/')), 'default')
+
+        cache.delete(db_routers.RECENT_WRITE_KEY)
+        self.assertEqual(self._route(self.factory.get('/api/perfumes/')), 'replica')
+
+    def test_async_middleware(self):
+        """
+        Test that the pin reaches the ORM calls of async views, which run on other threads.
+        """
+        async def view(request):
+            return HttpResponse(await sync_to_async(self.router.db_for_read)(Perfume))
+
+        middleware = db_routers.ReplicaRoutingMiddleware(view)
+        self.assertEqual(async_to_sync(middleware)(self.factory.get('/api/perfumes/')).content, b'replica')
+        async_to_sync(middleware)(self.factory.put('/api/admin/settings/', HTTP_AUTHORIZATION='Token abc'))
+        self.assertEqual(async_to_sync(middleware)(self.factory.get('/api/perfumes/')).content, b'default')
+
+    def test_no_replica(self):
+        """
+        Test that without a replica everything uses the default database and the middleware is left out.
+        """
+        with mock.patch.object(db_routers, 'REPLICA_DB_ALIAS', None):
+            self.assertEqual(self.router.db_for_read(Perfume), 'default')
+            with self.assertRaises(MiddlewareNotUsed):
+                db_routers.ReplicaRoutingMiddleware(lambda request: HttpResponse())
+
+
+class ServerBenchmarkTest(TransactionTestCase):
+    """
+    Test suite for the WSGI/ASGI worker comparison harness.
+    """
+
+    def test_measure_servers(self):
+        """
+        Test that both workers serve every simulated request successfully.
+        """
+        seed_catalog(20)
+        results = measure_servers(concurrency=4, requests=12, threads=2, db_latency_ms=0, client_delay_ms=1)
+        for server in ('wsgi', 'asgi'):
+            self.assertEqual(results[server]['requests'], 12, server)
+            self.assertEqual(results[server]['errors'], 0, server)
+            self.assertGreater(results[server]['requests_per_s'], 0)
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+    def test_measure_login_attack(self):
+        """
+        Test that the throttle caps the password checks a burst of wrong logins gets.
+        """
+        admin_views._decoy_password_hash.cache_clear()
+        self.addCleanup(admin_views._decoy_password_hash.cache_clear)
+        with mock.patch.object(throttling, 'login_global_limiter', throttling.SlidingWindowLimiter('login_global', 5, 60)):
+            results = measure_login_attack(requests=12, concurrency=3)
+        self.assertEqual(results['unthrottled']['statuses'], {'401': 12})
+        self.assertLessEqual(results['throttled']['password_checks'], 5)
+        self.assertEqual(sum(results['throttled']['statuses'].values()), 12)
+
+    def test_measure_connections(self):
+        """
+        Test that every connection mode serves the requests and reports its connection setup.
+        """
+        seed_catalog(20)
+        results = measure_connections(requests=10)
+        self.assertLessEqual({'per-request', 'persistent'}, set(results))
+        for mode, result in results.items():
+            self.assertEqual(result['requests'], 10, mode)
+            self.assertEqual(result['errors'], 0, mode)
+            self.assertGreaterEqual(result['connect_ms_per_request'], 0)
+
+
+class QueryPlanTest(APITestCase):
+    """
+    EXPLAIN regression harness for the public list queries.
+
+    Seeds a synthetic catalog, requests every PerfumeListView filter
+    combination in both languages, and checks the plan of each query the
+    view ran. Full-text search is left out: it is ordered by relevance, so
+    it always sorts. Set PERFUME_PLAN_CATALOG_SIZE to seed more rows.
+    """
+    CATALOG_SIZE = int(os.environ.get('PERFUME_PLAN_CATALOG_SIZE', 20000))
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_catalog(cls.CATALOG_SIZE)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def setUp(self):
+        cache.clear()
+
+    def _filter_params(self, language):
+        column = 1 if language == 'ar' else 0
+        return {
+            'brandFilter': BRANDS[0][column],
+            'categoryFilter': CATEGORIES[0][column],
+            'genderFilter': GENDERS[0][column],
+            'stockStatusFilter': 'in_stock',
+        }
+
+    def _combinations(self):
+        for language in ('en', 'ar'):
+            filters = self._filter_params(language)
+            for size in range(len(filters) + 1):
+                for names in itertools.combinations(filters, size):
+                    params = {'language': language, **{name: filters[name] for name in names}}
+                    yield params
+                    yield {**params, 'cursor': ''}
+                    yield {**params, 'page': 5}
+            for sort in ('price_asc', 'price_desc', 'name'):
+                yield {'language': language, 'sort': sort}
+                yield {'language': language, 'sort': sort, 'brandFilter': filters['brandFilter']}
+
+    def test_list_queries_avoid_seq_scan_plus_sort(self):
+        """
+        Test that no list filter combination is planned as a sequential scan followed by a sort.
+        """
+        url = reverse('perfume-list')
+        failures = []
+        for params in self._combinations():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, params, secure=True)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, params)
+            for query in queries.captured_queries:
+                if 'ORDER BY' not in query['sql']:
+                    continue
+                nodes = _explain(query['sql'])
+                if _is_seq_scan_plus_sort(nodes):
+                    failures.append(f"{params}: {[node for node, relation in nodes]}")
+        self.assertEqual(failures, [], "\n".join(failures))
+
+    def test_changes_queries_use_the_updated_at_index(self):
+        """
+        Test that the incremental sync queries walk their indexes instead of sorting the table.
+        """
+        first = self.client.get(reverse('perfume-changes'), {'limit': 100}, secure=True)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('perfume-changes'), {'since': first.data['nextCursor']}, secure=True)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for query in queries.captured_queries:
+            nodes = _explain(query['sql'])
+            self.assertFalse(_is_seq_scan_plus_sort(nodes), nodes)
+
+    def test_collection_rails_use_partial_indexes(self):
+        """
+        Test that every homepage rail is read off an index instead of sorting the table.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            rails.get_collections('en')
+        self.assertGreater(len(queries), 2)
+        for query in queries.captured_queries:
+            nodes = _explain(query['sql'])
+            self.assertFalse(_is_seq_scan_plus_sort(nodes), nodes)
+
+
+class BenchmarkSuiteTest(TestCase):
+    """
+    Test suite for the endpoint benchmark harness (not the benchmarks themselves).
+    """
+
+    def test_every_scenario_runs(self):
+        """
+        Test that every benchmark scenario succeeds against a small synthetic catalog.
+        """
+        seed_catalog(60)
+        admin = Admin.objects.create_superuser(name='bench', password='x')
+        admin_client = APIClient()
+        admin_client.force_authenticate(admin)
+        results = {}
+        with mock.patch.object(instrumentation, 'SLOW_REQUEST_THRESHOLD_MS', float('inf')):
+            for scenario in build_scenarios(60):
+                results[scenario.name] = measure(scenario, admin_client if scenario.admin else APIClient(), iterations=1)
+        self.assertIn('admin/bulk-delete', results)
+        self.assertGreater(results['list/en/all']['queries'], 0)
+        self.assertEqual(results['list/cached']['queries'], 0)
+        self.assertEqual(results['batch/20']['queries'], 1)
+        self.assertEqual(results['brands/en']['queries'], 0)
+
+    def test_compare_results_flags_regressions(self):
+        """
+        Test that query-count changes and latency growth beyond tolerance and noise are reported.
+        """
+        def result(p50, queries, peak=100.0):
+            return {'p50_ms': p50, 'p95_ms': p50, 'mean_ms': p50, 'queries': queries, 'alloc_peak_kib': peak}
+        baseline = {'results': {'1000': {'a': result(10, 2), 'b': result(0.2, 1), 'c': result(5, 1), 'd': result(5, 1, 100)}}}
+        current = {'results': {'1000': {'a': result(20, 2), 'b': result(0.6, 1), 'c': result(5, 3), 'd': result(5, 1, 400),
+                                        'new': result(99, 9)}}}
+        regressions = compare_results(current, baseline, tolerance=0.25)
+        self.assertEqual(len(regressions), 3)
+        self.assertTrue(regressions[0].startswith('a @ 1000: p50'))
+        self.assertTrue(regressions[1].startswith('c @ 1000: 1 -> 3 queries'))
+        self.assertTrue(regressions[2].startswith('d @ 1000: peak allocations'))
@@ -1,14 +1,41 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PerfumeListView, PerfumeDetailView, BrandListView, CategoryListView, PerfumeAdminViewSet
+from .views import (
+    PerfumeListView, PerfumeDetailView, PerfumeBatchView, AsyncPerfumeListView, AsyncPerfumeDetailView,
+    AsyncPerfumeBatchView, BrandListView, CategoryListView,
+    GenderListView, StockStatusListView, FacetListView, CollectionListView, PerfumeChangesView, PerfumeAdminViewSet,
+)
+from .response_cache import cache_catalog_response
 
 router = DefaultRouter()
 router.register(r'admin/perfumes', PerfumeAdminViewSet, basename='admin-perfume')
 
-urlpatterns = [
-    path('perfumes/', PerfumeListView.as_view(), name='perfume-list'),
-    path('perfumes/<str:product_id>/', PerfumeDetailView.as_view(), name='perfume-detail'),
-    path('brands/', BrandListView.as_view(), name='brand-list'),
-    path('categories/', CategoryListView.as_view(), name='category-list'),
+def perfume_urlpatterns(async_views=False):
+    """
+    The list, batch and detail routes, on the async views when serving
+    through ASGI (ASYNC_PUBLIC_VIEWS) and on the DRF views otherwise, and
+    the changes route, which must come before the detail one.
+    """
+    if async_views:
+        list_view, batch_view, detail_view = AsyncPerfumeListView, AsyncPerfumeBatchView, AsyncPerfumeDetailView
+    else:
+        list_view, batch_view, detail_view = PerfumeListView, PerfumeBatchView, PerfumeDetailView
+    return [
+        path('perfumes/', cache_catalog_response(list_view.as_view()), name='perfume-list'),
+        # Before the detail route, which would otherwise take "batch" for an id
+        path('perfumes/batch/', cache_catalog_response(batch_view.as_view()), name='perfume-batch'),
+        # Not response-cached: what it returns moves with the clock as well as the catalog
+        path('perfumes/changes/', PerfumeChangesView.as_view(), name='perfume-changes'),
+        path('perfumes/<str:product_id>/', cache_catalog_response(detail_view.as_view()), name='perfume-detail'),
+    ]
+
+urlpatterns = perfume_urlpatterns(getattr(settings, 'ASYNC_PUBLIC_VIEWS', False)) + [
+    path('brands/', cache_catalog_response(BrandListView.as_view()), name='brand-list'),
+    path('categories/', cache_catalog_response(CategoryListView.as_view()), name='category-list'),
+    path('genders/', cache_catalog_response(GenderListView.as_view()), name='gender-list'),
+    path('stock-statuses/', cache_catalog_response(StockStatusListView.as_view()), name='stock-status-list'),
+    path('facets/', cache_catalog_response(FacetListView.as_view()), name='facet-list'),
+    path('collections/', cache_catalog_response(CollectionListView.as_view()), name='collection-list'),
     path('', include(router.urls)), # Include router URLs
 ]
@@ -1,102 +1,269 @@
+import asyncio
 import json
-import os
 import logging
 import uuid
+from decimal import Decimal, InvalidOperation
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .serializers import PublicPerfumeSerializer, AdminPerfumeSerializer
-from .models import Perfume
+from rest_framework.settings import api_settings
+from asgiref.sync import sync_to_async
+from django.db import DatabaseError
+from django.http import HttpResponse
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from .serializers import AdminPerfumeSerializer, public_perfume_projection, admin_perfume_projection
+from .models import Perfume, SORT_ORDERINGS, parse_stock_status
+from .facets import facet_index, FACET_FIELDS
+from .search import apply_search
+from .export import EXPORT_FORMATS, export_queryset, iter_export, gzip_stream
+from .pagination import paginate_by_cursor, apaginate_by_cursor, cached_count, acached_count, InvalidCursor
+from .snapshot import acurrent_snapshot, catalog_snapshot, current_snapshot
+from . import images
+from .changes import (
+    CHANGES_DEFAULT_LIMIT, CHANGES_MAX_LIMIT, CursorExpired, catalog_changed, catalog_changes, record_deletions,
+)
+from .rails import get_collections
 from uuid import UUID
 
-# Define the path to the JSON file relative to the project root
-PERFUMES_FILE_PATH = 'perfume_store_backend/data/perfumes.json'
-
-def _read_perfumes_from_file():
-    # Corrected path: go up one level from 'perfumes' to 'perfume_store_backend', then into 'data'
-    full_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'perfumes.json')
-    if not os.path.exists(full_path):
-        return []
-    with open(full_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-        try:
-            perfumes = json.loads(content)
-            return perfumes
-        except json.JSONDecodeError as e:
-            return []
-
-def _write_perfumes_to_file(perfumes):
-    # Corrected path: go up one level from 'perfumes' to 'perfume_store_backend', then into 'data'
-    full_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'perfumes.json')
+# Query parameters that narrow the public perfume list
+PUBLIC_FILTER_PARAMS = (
+    'language', 'brandFilter', 'categoryFilter', 'genderFilter', 'stockStatusFilter', 'searchTerm',
+    'minPrice', 'maxPrice', 'isNew', 'isBestseller',
+)
+
+# Flag filters of the public list: only perfumes with the flag set when true
+PUBLIC_FLAG_FILTERS = ('isNew', 'isBestseller')
+
+class InvalidQueryParameter(ValueError):
+    pass
+
+def _price_param(query_params, name):
+    value = query_params.get(name)
+    if not value:
+        return None
     try:
-        with open(full_path, 'w', encoding='utf-8') as f:
-            json.dump(perfumes, f, indent=4, ensure_ascii=False)
-    except Exception as e:
-        # It's a good idea to log this error too!
-        logging.error(f"Failed to write perfumes to file {full_path}: {e}")
+        price = Decimal(value)
+    except InvalidOperation:
+        raise InvalidQueryParameter(f"{name} must be a number.")
+    if not price.is_finite():
+        raise InvalidQueryParameter(f"{name} must be a number.")
+    return price
+
+def _public_sort(query_params):
+    """SORT_ORDERINGS key for the requested `sort`, or None to keep the default (newest, or relevance when searching)."""
+    sort = query_params.get('sort')
+    if not sort:
+        return None
+    if sort not in ('newest', 'price_asc', 'price_desc', 'name'):
+        raise InvalidQueryParameter("sort must be one of: price_asc, price_desc, name, newest.")
+    if sort == 'name' and query_params.get('language') == 'ar':
+        sort = 'name_ar'
+    return sort
+
+def _public_ordering(query_params):
+    """ORDER BY for the requested `sort`, or None to keep the default."""
+    sort = _public_sort(query_params)
+    return None if sort is None else SORT_ORDERINGS[sort]
+
+def _filter_public_perfumes(query_params):
+    """Active perfumes narrowed by the public list filters (ordered by relevance only when searching)."""
+    language = query_params.get('language')
+    brand_filter = query_params.get('brandFilter')
+    category_filter = query_params.get('categoryFilter')
+    gender_filter = query_params.get('genderFilter')
+    stock_status_filter = query_params.get('stockStatusFilter')
+    search_term = query_params.get('searchTerm')
+    min_price = _price_param(query_params, 'minPrice')
+    max_price = _price_param(query_params, 'maxPrice')
+
+    queryset = Perfume.objects.filter(isActive=True)
+    for flag in PUBLIC_FLAG_FILTERS:
+        if _flag(query_params, flag):
+            queryset = queryset.filter(**{flag: True})
+    if brand_filter:
+        if language == "ar":
+            queryset = queryset.filter(brandAr=brand_filter)
+        else:
+            queryset = queryset.filter(brandEn=brand_filter)
+    if category_filter:
+        if language == "ar":
+            queryset = queryset.filter(categoryAr=category_filter)
+        else:
+            queryset = queryset.filter(categoryEn=category_filter)
+    if gender_filter:
+        if language == "ar":
+            queryset = queryset.filter(genderAr=gender_filter)
+        else:
+            queryset = queryset.filter(genderEn=gender_filter)
+    if stock_status_filter:
+        # in_stock / low_stock / out_of_stock (or a display label) -> exact match on the stored enum
+        stock_status = parse_stock_status(stock_status_filter)
+        if stock_status is None:
+            return queryset.none()
+        queryset = queryset.filter(stockStatus=stock_status)
+    # A perfume matches a price range when any of its sizes could fall inside it
+    if min_price is not None:
+        queryset = queryset.filter(maxPriceEGP__gte=min_price)
+    if max_price is not None:
+        queryset = queryset.filter(minPriceEGP__lte=max_price)
+    if search_term:
+        # Searches name, brand and description in both languages, ranked by relevance
+        queryset = apply_search(queryset, search_term)
+    return queryset
+
+def _filter_signature(scope, query_params, names):
+    """Hashable description of the filters in effect, used as a cache key for totals."""
+    return (scope,) + tuple((name, query_params.get(name) or '') for name in names)
+
+def _wants_cursor(query_params):
+    """Cursor mode is selected by passing `cursor` (empty for the first page)."""
+    return 'cursor' in query_params
+
+def _flag(query_params, name):
+    return query_params.get(name, '').lower() in ('1', 'true', 'yes')
+
+def _wants_total(query_params):
+    return _flag(query_params, 'includeTotal')
+
+# Bilingual fields, which `fields` may name without their En/Ar suffix
+LOCALIZED_FIELDS = ('name', 'brand', 'category', 'gender', 'description')
+
+def _public_projection(query_params):
+    """
+    The public projection narrowed to what the client asked for. `fields` is
+    a comma-separated list of field names (a bilingual field's base name,
+    e.g. `name`, selects both languages); `languageOnly` drops the variant of
+    each bilingual field that is not in `language`. `id` is always included.
+    Only the selected columns are read from the database.
+    """
+    fields = query_params.get('fields')
+    language_only = _flag(query_params, 'languageOnly')
+    if not fields and not language_only:
+        return public_perfume_projection
+    if fields:
+        names = {'id'}
+        for name in filter(None, (part.strip() for part in fields.split(','))):
+            if name in LOCALIZED_FIELDS:
+                names.update((name + 'En', name + 'Ar'))
+            elif name in public_perfume_projection.columns:
+                names.add(name)
+            else:
+                raise InvalidQueryParameter(f"Unknown field: {name}.")
+    else:
+        names = set(public_perfume_projection.columns)
+    if language_only:
+        other = 'En' if query_params.get('language') == 'ar' else 'Ar'
+        names -= {base + other for base in LOCALIZED_FIELDS}
+    return public_perfume_projection.subset(names)
+
+def _page_pagination(page, limit, total_items):
+    total_pages = (total_items + limit - 1) // limit
+    return {
+        "currentPage": page,
+        "totalPages": total_pages,
+        "totalItems": total_items,
+        "hasNext": page < total_pages,
+        "hasPrev": page > 1
+    }
+
+# Sent, with 503, when the database is unreachable and the snapshot cannot answer
+CATALOG_UNAVAILABLE = {"detail": "The catalog is temporarily unavailable. Please try again later."}
+
+def _snapshot_list(snapshot, query_params, projection, page, limit):
+    """
+    The list body for a page-mode query, answered from the catalog snapshot
+    with the same filters and orderings as the database; None for queries
+    only the database can answer (search, cursor mode).
+    """
+    offset = (page - 1) * limit
+    if query_params.get('searchTerm') or _wants_cursor(query_params) or offset < 0:
+        return None
+    suffix = 'Ar' if query_params.get('language') == 'ar' else 'En'
+    equal = {
+        column + suffix: query_params[name]
+        for name, column in (('brandFilter', 'brand'), ('categoryFilter', 'category'), ('genderFilter', 'gender'))
+        if query_params.get(name)
+    }
+    if query_params.get('stockStatusFilter'):
+        # An unknown status matches nothing, as in the database
+        equal['stockStatus'] = parse_stock_status(query_params['stockStatusFilter'])
+    for flag in PUBLIC_FLAG_FILTERS:
+        if _flag(query_params, flag):
+            equal[flag] = True
+    positions = snapshot.select(
+        equal, _price_param(query_params, 'minPrice'), _price_param(query_params, 'maxPrice'),
+        _public_sort(query_params) or 'newest',
+    )
+    return {
+        "perfumes": snapshot.perfumes(positions[offset:offset + limit], projection.columns),
+        "pagination": _page_pagination(page, limit, len(positions)),
+    }
+
+def _outage_snapshot(view_name, error):
+    """The snapshot on disk, whatever its age, for answering while the database is unreachable."""
+    logging.error(f"Database unavailable in {view_name}: {error}")
+    return catalog_snapshot.get()
+
+def _mark_stale(response, snapshot):
+    """Date a response answered from an outdated snapshot and keep it out of every cache."""
+    response['Cache-Control'] = 'no-store'
+    response['X-Catalog-Snapshot'] = snapshot.written_at
+    return response
 
 class PerfumeListView(APIView):
     def get(self, request, *args, **kwargs):
         try:
-            # --- This is the original logic ---
-            language = request.query_params.get('language')
-            brand_filter = request.query_params.get('brandFilter')
-            category_filter = request.query_params.get('categoryFilter')
-            gender_filter = request.query_params.get('genderFilter')
-            stock_status_filter = request.query_params.get('stockStatusFilter')
-            search_term = request.query_params.get('searchTerm')
             page = int(request.query_params.get('page', 1))
             limit = int(request.query_params.get('limit', 12))
             offset = (page - 1) * limit
+            projection = _public_projection(request.query_params)
 
-            queryset = Perfume.objects.filter(isActive=True)
-            if search_term:
-                if language == "ar":
-                    queryset = queryset.filter(nameAr__icontains=search_term)
-                else:
-                    queryset = queryset.filter(nameEn__icontains=search_term)
-            if brand_filter:
-                if language == "ar":
-                    queryset = queryset.filter(brandAr=brand_filter)
-                else:
-                    queryset = queryset.filter(brandEn=brand_filter)
-            if category_filter:
-                if language == "ar":
-                    queryset = queryset.filter(categoryAr=category_filter)
-                else:
-                    queryset = queryset.filter(categoryEn=category_filter)
-            if gender_filter:
-                if language == "ar":
-                    queryset = queryset.filter(genderAr=gender_filter)
-                else:
-                    queryset = queryset.filter(genderEn=gender_filter)
-            if stock_status_filter:
-                if stock_status_filter == 'out_of_stock':
-                    queryset = queryset.filter(stockStatus__iexact='Out of Stock')
-                elif stock_status_filter == 'in_stock':
-                    queryset = queryset.filter(stockStatus__iexact='In Stock')
-                elif stock_status_filter == 'low_stock':
-                    queryset = queryset.filter(stockStatus__iexact='Low Stock')
-                else:
-                    queryset = queryset.filter(stockStatus__iexact=stock_status_filter)
-            queryset = queryset.order_by('-created_at')
+            snapshot = current_snapshot()
+            if snapshot is not None:
+                payload = _snapshot_list(snapshot, request.query_params, projection, page, limit)
+                if payload is not None:
+                    return Response(payload, status=status.HTTP_200_OK)
+
+            queryset = _filter_public_perfumes(request.query_params)
+            ordering = _public_ordering(request.query_params)
+
+            if _wants_cursor(request.query_params):
+                if ordering not in (None, SORT_ORDERINGS['newest']):
+                    raise InvalidQueryParameter("Cursor pagination only supports sort=newest.")
+                rows = queryset.values(*projection.columns, 'created_at')
+                perfumes, pagination = paginate_by_cursor(rows, request.query_params.get('cursor'), limit)
+                if _wants_total(request.query_params):
+                    signature = _filter_signature('public', request.query_params, PUBLIC_FILTER_PARAMS)
+                    pagination["totalItems"] = cached_count(queryset, signature)
+                return Response({
+                    "perfumes": projection.many(perfumes),
+                    "pagination": pagination
+                }, status=status.HTTP_200_OK)
+
+            if ordering is not None:
+                queryset = queryset.order_by(*ordering)
+            elif not request.query_params.get('searchTerm'):
+                queryset = queryset.order_by('-created_at')
 
             total_items = queryset.count()
-            total_pages = (total_items + limit - 1) // limit
-            paginated_perfumes = queryset[offset:offset + limit]
+            paginated_perfumes = projection.values(queryset)[offset:offset + limit]
 
-            serializer = PublicPerfumeSerializer(paginated_perfumes, many=True)
             return Response({
-                "perfumes": serializer.data,
-                "pagination": {
-                    "currentPage": page,
-                    "totalPages": total_pages,
-                    "totalItems": total_items,
-                    "hasNext": page < total_pages,
-                    "hasPrev": page > 1
-                }
+                "perfumes": projection.many(paginated_perfumes),
+                "pagination": _page_pagination(page, limit, total_items)
             }, status=status.HTTP_200_OK)
 
+        except (InvalidCursor, InvalidQueryParameter) as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        except DatabaseError as e:
+            snapshot = _outage_snapshot('PerfumeListView', e)
+            payload = snapshot and _snapshot_list(snapshot, request.query_params, projection, page, limit)
+            if payload is None:
+                return Response(CATALOG_UNAVAILABLE, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            return _mark_stale(Response(payload, status=status.HTTP_200_OK), snapshot)
+
         except Exception as e:
             # --- This is the new, robust error handling ---
             # For YOU: This logs the detailed error to your server console/log file.
@@ -112,42 +279,425 @@ class PerfumeDetailView(APIView):
     def get(self, request, product_id, *args, **kwargs):
         # Defensive: check if product_id is a valid UUID
         try:
-            UUID(str(product_id))
+            perfume_id = UUID(str(product_id))
         except Exception:
             return Response({'detail': 'Invalid product ID.'}, status=400)
         try:
-            perfume = Perfume.objects.get(id=product_id, isActive=True)
-        except Perfume.DoesNotExist:
-            return Response(None, status=status.HTTP_200_OK)
-        serializer = PublicPerfumeSerializer(perfume)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+            projection = _public_projection(request.query_params)
+        except InvalidQueryParameter as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        snapshot = current_snapshot()
+        try:
+            if snapshot is not None:
+                perfumes = list(snapshot.find([perfume_id], projection.columns).values())
+            else:
+                perfumes = projection.many(projection.values(Perfume.objects.filter(id=perfume_id, isActive=True))[:1])
+        except DatabaseError as e:
+            snapshot = _outage_snapshot('PerfumeDetailView', e)
+            if snapshot is None:
+                return Response(CATALOG_UNAVAILABLE, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            perfumes = list(snapshot.find([perfume_id], projection.columns).values())
+            return _mark_stale(Response(perfumes[0] if perfumes else None, status=status.HTTP_200_OK), snapshot)
+        # A missing or inactive perfume is a 200 with an empty body
+        return Response(perfumes[0] if perfumes else None, status=status.HTTP_200_OK)
+
+class PerfumeChangesView(APIView):
+    """
+    Incremental sync: `since` is the `nextCursor` of the previous response
+    (omit it to start from scratch), `limit` caps the batch. Follow
+    `nextCursor` while `hasMore`; afterwards poll with the last cursor.
+    Responds 410 Gone when the cursor is too old to sync from.
+    """
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = min(max(int(request.query_params.get('limit', CHANGES_DEFAULT_LIMIT)), 1), CHANGES_MAX_LIMIT)
+            projection = _public_projection(request.query_params)
+            payload = catalog_changes(request.query_params.get('since'), limit, projection)
+        except CursorExpired as e:
+            return Response({"detail": str(e)}, status=status.HTTP_410_GONE)
+        except (InvalidCursor, InvalidQueryParameter) as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({"detail": "`limit` must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        except DatabaseError as e:
+            logging.error(f"Error in PerfumeChangesView: {e}")
+            return Response(CATALOG_UNAVAILABLE, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response(payload, status=status.HTTP_200_OK)
+
+# Most ids one batch request may ask for
+BATCH_MAX_IDS = 100
+
+def _query_ids(query_params):
+    """`ids` from the query string: comma-separated, repeated, or both."""
+    return [part for value in query_params.getlist('ids') for part in value.split(',') if part.strip()]
+
+def _body_ids(data):
+    ids = data.get('ids') if isinstance(data, dict) else None
+    if not isinstance(ids, list):
+        raise InvalidQueryParameter("`ids` must be a list of perfume IDs.")
+    return ids
+
+def _batch_ids(ids):
+    """The requested ids as UUIDs, duplicates dropped, in the order given."""
+    if not ids:
+        raise InvalidQueryParameter("Provide at least one perfume ID in `ids`.")
+    if len(ids) > BATCH_MAX_IDS:
+        raise InvalidQueryParameter(f"At most {BATCH_MAX_IDS} perfumes can be requested at once.")
+    try:
+        return list(dict.fromkeys(UUID(str(perfume_id).strip()) for perfume_id in ids))
+    except ValueError:
+        raise InvalidQueryParameter("`ids` must contain valid perfume IDs.")
+
+def _batch_query(perfume_ids, projection):
+    return projection.values(Perfume.objects.filter(id__in=perfume_ids, isActive=True))
+
+def _batch_found(rows, projection):
+    """{id: rendered perfume} for the rows of `_batch_query()`."""
+    rows = list(rows)
+    return dict(zip((row['id'] for row in rows), projection.many(rows)))
+
+def _batch_payload(perfume_ids, found):
+    """Found perfumes in the requested order, plus the ids that are unknown or inactive."""
+    return {
+        "perfumes": [found[perfume_id] for perfume_id in perfume_ids if perfume_id in found],
+        "missing": [str(perfume_id) for perfume_id in perfume_ids if perfume_id not in found],
+    }
+
+class PerfumeBatchView(APIView):
+    """
+    Many perfumes by ID in one request and one query, for the cart, wishlist
+    and recently viewed lists: GET ?ids=<id>,<id>,... (cacheable) or POST
+    {"ids": [...]}. Perfumes come back in the requested order, shaped like
+    the detail view's; unknown and inactive IDs are listed under `missing`.
+    """
+    def get(self, request, *args, **kwargs):
+        return self._respond(request, lambda: _query_ids(request.query_params))
+
+    def post(self, request, *args, **kwargs):
+        return self._respond(request, lambda: _body_ids(request.data))
+
+    def _respond(self, request, get_ids):
+        try:
+            perfume_ids = _batch_ids(get_ids())
+            projection = _public_projection(request.query_params)
+        except InvalidQueryParameter as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        snapshot = current_snapshot()
+        try:
+            if snapshot is not None:
+                found = snapshot.find(perfume_ids, projection.columns)
+            else:
+                found = _batch_found(_batch_query(perfume_ids, projection), projection)
+        except DatabaseError as e:
+            snapshot = _outage_snapshot('PerfumeBatchView', e)
+            if snapshot is None:
+                return Response(CATALOG_UNAVAILABLE, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            payload = _batch_payload(perfume_ids, snapshot.find(perfume_ids, projection.columns))
+            return _mark_stale(Response(payload, status=status.HTTP_200_OK), snapshot)
+        return Response(_batch_payload(perfume_ids, found), status=status.HTTP_200_OK)
+
+class AsyncCatalogView(View):
+    """
+    Base for the async public read views served under ASGI (see asgi.py).
+
+    DRF's APIView cannot run async handlers, so these are plain Django views
+    that take the same query parameters and render the same bodies with the
+    API's JSON renderer.
+    """
+    renderer_class = api_settings.DEFAULT_RENDERER_CLASSES[0]
+
+    def render(self, data, status_code=status.HTTP_200_OK):
+        if data is None:
+            # Like DRF's Response(None): an empty body without a Content-Type
+            response = HttpResponse(status=status_code)
+            del response['Content-Type']
+            return response
+        renderer = self.renderer_class()
+        return HttpResponse(renderer.render(data), content_type=renderer.media_type, status=status_code)
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Token-authenticated API, no session cookies: CSRF-exempt like DRF's views
+        return csrf_exempt(super().as_view(**initkwargs))
+
+async def _alist(queryset):
+    return [row async for row in queryset]
+
+class AsyncPerfumeListView(AsyncCatalogView):
+    """
+    PerfumeListView on the async ORM. The page and its COUNT(*) are awaited
+    together; while Django runs them on the request's database thread, the
+    event loop serves other requests.
+    """
+    async def get(self, request, *args, **kwargs):
+        query_params = request.GET
+        try:
+            page = int(query_params.get('page', 1))
+            limit = int(query_params.get('limit', 12))
+            offset = (page - 1) * limit
+            projection = _public_projection(query_params)
+
+            snapshot = await acurrent_snapshot()
+            if snapshot is not None:
+                payload = _snapshot_list(snapshot, query_params, projection, page, limit)
+                if payload is not None:
+                    return self.render(payload)
+
+            if query_params.get('searchTerm'):
+                # The in-process search index may have to be rebuilt from the database first
+                queryset = await sync_to_async(_filter_public_perfumes)(query_params)
+            else:
+                queryset = _filter_public_perfumes(query_params)
+            ordering = _public_ordering(query_params)
+
+            if _wants_cursor(query_params):
+                if ordering not in (None, SORT_ORDERINGS['newest']):
+                    raise InvalidQueryParameter("Cursor pagination only supports sort=newest.")
+                rows = queryset.values(*projection.columns, 'created_at')
+                page_query = apaginate_by_cursor(rows, query_params.get('cursor'), limit)
+                if _wants_total(query_params):
+                    signature = _filter_signature('public', query_params, PUBLIC_FILTER_PARAMS)
+                    (perfumes, pagination), total_items = await asyncio.gather(
+                        page_query, acached_count(queryset, signature))
+                    pagination["totalItems"] = total_items
+                else:
+                    perfumes, pagination = await page_query
+                return self.render({
+                    "perfumes": projection.many(perfumes),
+                    "pagination": pagination
+                })
+
+            if ordering is not None:
+                queryset = queryset.order_by(*ordering)
+            elif not query_params.get('searchTerm'):
+                queryset = queryset.order_by('-created_at')
+
+            total_items, paginated_perfumes = await asyncio.gather(
+                queryset.acount(),
+                _alist(projection.values(queryset)[offset:offset + limit]),
+            )
+            return self.render({
+                "perfumes": projection.many(paginated_perfumes),
+                "pagination": _page_pagination(page, limit, total_items)
+            })
+
+        except (InvalidCursor, InvalidQueryParameter) as e:
+            return self.render({"detail": str(e)}, status.HTTP_400_BAD_REQUEST)
+
+        except DatabaseError as e:
+            snapshot = _outage_snapshot('AsyncPerfumeListView', e)
+            payload = snapshot and _snapshot_list(snapshot, query_params, projection, page, limit)
+            if payload is None:
+                return self.render(CATALOG_UNAVAILABLE, status.HTTP_503_SERVICE_UNAVAILABLE)
+            return _mark_stale(self.render(payload), snapshot)
+
+        except Exception as e:
+            logging.error(f"Error in AsyncPerfumeListView: {e}", exc_info=True)
+            return self.render(
+                {"detail": "An error occurred while fetching perfumes. Please try again later."},
+                status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+class AsyncPerfumeDetailView(AsyncCatalogView):
+    async def get(self, request, product_id, *args, **kwargs):
+        try:
+            perfume_id = UUID(str(product_id))
+        except Exception:
+            return self.render({'detail': 'Invalid product ID.'}, status.HTTP_400_BAD_REQUEST)
+        try:
+            projection = _public_projection(request.GET)
+        except InvalidQueryParameter as e:
+            return self.render({"detail": str(e)}, status.HTTP_400_BAD_REQUEST)
+        snapshot = await acurrent_snapshot()
+        try:
+            if snapshot is not None:
+                perfumes = list(snapshot.find([perfume_id], projection.columns).values())
+            else:
+                rows = await _alist(projection.values(Perfume.objects.filter(id=perfume_id, isActive=True))[:1])
+                perfumes = projection.many(rows)
+        except DatabaseError as e:
+            snapshot = _outage_snapshot('AsyncPerfumeDetailView', e)
+            if snapshot is None:
+                return self.render(CATALOG_UNAVAILABLE, status.HTTP_503_SERVICE_UNAVAILABLE)
+            perfumes = list(snapshot.find([perfume_id], projection.columns).values())
+            return _mark_stale(self.render(perfumes[0] if perfumes else None), snapshot)
+        return self.render(perfumes[0] if perfumes else None)
+
+class AsyncPerfumeBatchView(AsyncCatalogView):
+    async def get(self, request, *args, **kwargs):
+        return await self._respond(request, lambda: _query_ids(request.GET))
+
+    async def post(self, request, *args, **kwargs):
+        return await self._respond(request, lambda: _body_ids(json.loads(request.body or b'null')))
+
+    async def _respond(self, request, get_ids):
+        try:
+            perfume_ids = _batch_ids(get_ids())
+            projection = _public_projection(request.GET)
+        except json.JSONDecodeError:
+            return self.render({"detail": "Malformed JSON body."}, status.HTTP_400_BAD_REQUEST)
+        except InvalidQueryParameter as e:
+            return self.render({"detail": str(e)}, status.HTTP_400_BAD_REQUEST)
+        snapshot = await acurrent_snapshot()
+        try:
+            if snapshot is not None:
+                found = snapshot.find(perfume_ids, projection.columns)
+            else:
+                found = _batch_found(await _alist(_batch_query(perfume_ids, projection)), projection)
+        except DatabaseError as e:
+            snapshot = _outage_snapshot('AsyncPerfumeBatchView', e)
+            if snapshot is None:
+                return self.render(CATALOG_UNAVAILABLE, status.HTTP_503_SERVICE_UNAVAILABLE)
+            payload = _batch_payload(perfume_ids, snapshot.find(perfume_ids, projection.columns))
+            return _mark_stale(self.render(payload), snapshot)
+        return self.render(_batch_payload(perfume_ids, found))
+
+def _facet_filters(request):
+    """Facet filters shared by the facet endpoints, keyed by facet name."""
+    stock_status_filter = request.query_params.get('stockStatusFilter')
+    stock_status = parse_stock_status(stock_status_filter)
+    return {
+        'brand': request.query_params.get('brandFilter'),
+        'category': request.query_params.get('categoryFilter'),
+        'gender': request.query_params.get('genderFilter'),
+        'stockStatus': stock_status_filter if stock_status is None else stock_status.label,
+    }
 
 class BrandListView(APIView):
     def get(self, request, *args, **kwargs):
         language = request.query_params.get('language')
-        queryset = Perfume.objects.filter(isActive=True)
-        if language == "ar":
-            brands = queryset.values_list('brandAr', flat=True)
-        else:
-            brands = queryset.values_list('brandEn', flat=True)
-        unique_brands = sorted(list(set(filter(None, brands))))
-        return Response(unique_brands, status=status.HTTP_200_OK)
+        brands = facet_index.values('brand', language, _facet_filters(request))
+        return Response(brands, status=status.HTTP_200_OK)
 
 class CategoryListView(APIView):
     def get(self, request, *args, **kwargs):
         language = request.query_params.get('language')
-        queryset = Perfume.objects.filter(isActive=True)
-        if language == "ar":
-            categories = queryset.values_list('categoryAr', flat=True)
-        else:
-            categories = queryset.values_list('categoryEn', flat=True)
-        unique_categories = sorted(list(set(filter(None, categories))))
-        return Response(unique_categories, status=status.HTTP_200_OK)
+        categories = facet_index.values('category', language, _facet_filters(request))
+        return Response(categories, status=status.HTTP_200_OK)
+
+class GenderListView(APIView):
+    def get(self, request, *args, **kwargs):
+        language = request.query_params.get('language')
+        genders = facet_index.values('gender', language, _facet_filters(request))
+        return Response(genders, status=status.HTTP_200_OK)
+
+class StockStatusListView(APIView):
+    def get(self, request, *args, **kwargs):
+        stock_statuses = facet_index.values('stockStatus', filters=_facet_filters(request))
+        return Response(stock_statuses, status=status.HTTP_200_OK)
+
+class CollectionListView(APIView):
+    """
+    The homepage rails in one response: "new" and "bestseller", and one rail
+    per top brand and category in `language`. Takes `fields` and
+    `languageOnly` like the list endpoint.
+    """
+    def get(self, request, *args, **kwargs):
+        try:
+            projection = _public_projection(request.query_params)
+            collections = get_collections(request.query_params.get('language'))
+        except InvalidQueryParameter as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except DatabaseError as e:
+            logging.error(f"Error in CollectionListView: {e}")
+            return Response(CATALOG_UNAVAILABLE, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        payload = {kind: projection.many(collections[kind]) for kind in ('new', 'bestseller')}
+        for kind in ('brands', 'categories'):
+            payload[kind] = [{"name": name, "perfumes": projection.many(rows)} for name, rows in collections[kind]]
+        return Response(payload, status=status.HTTP_200_OK)
+
+class FacetListView(APIView):
+    """All facets with per-value counts of active perfumes, narrowed by the given filters."""
+    def get(self, request, *args, **kwargs):
+        language = request.query_params.get('language')
+        filters = _facet_filters(request)
+        facets = {}
+        for facet in FACET_FIELDS:
+            counts = facet_index.counts(facet, language, filters)
+            facets[facet] = [{"value": value, "count": count} for value, count in counts.items()]
+        return Response(facets, status=status.HTTP_200_OK)
 
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from django.db import transaction
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.http import FileResponse, Http404, StreamingHttpResponse
 from django.core.management import call_command # Import call_command
 from perfume_store_backend.admins.views import IsAdminUser # Import the permission
 
+# Largest number of items accepted by one bulk admin request
+BULK_MAX_ITEMS = 500
+
+# Columns a set-based bulk operation may select rows by
+BULK_FILTER_FIELDS = (
+    'brandEn', 'brandAr', 'categoryEn', 'categoryAr', 'genderEn', 'genderAr',
+    'stockStatus', 'isActive', 'isNew', 'isBestseller',
+)
+
+class BulkRequestError(Exception):
+    pass
+
+def _bulk_items(data):
+    if not isinstance(data, list) or not data:
+        raise BulkRequestError("Expected a non-empty list of perfumes.")
+    if len(data) > BULK_MAX_ITEMS:
+        raise BulkRequestError(f"At most {BULK_MAX_ITEMS} perfumes can be sent in one request.")
+    return data
+
+def _bulk_ids(ids):
+    if not isinstance(ids, list) or not ids:
+        raise BulkRequestError("`ids` must be a non-empty list.")
+    if len(ids) > BULK_MAX_ITEMS:
+        raise BulkRequestError(f"At most {BULK_MAX_ITEMS} ids can be sent in one request.")
+    try:
+        return [UUID(str(perfume_id)) for perfume_id in ids]
+    except ValueError:
+        raise BulkRequestError("`ids` must contain valid perfume IDs.")
+
+def _bulk_target(data):
+    """
+    Rows targeted by a set-based bulk request: either explicit `ids` or a
+    `filter` of whitelisted column equalities. Returns (queryset, ids or None).
+    """
+    if not isinstance(data, dict):
+        raise BulkRequestError("Expected an object with either `ids` or `filter`.")
+    if 'ids' in data:
+        ids = _bulk_ids(data.get('ids'))
+        return Perfume.objects.filter(id__in=ids), ids
+    filters = data.get('filter')
+    if not isinstance(filters, dict) or not filters:
+        raise BulkRequestError("Provide either `ids` or a non-empty `filter`.")
+    unknown = set(filters) - set(BULK_FILTER_FIELDS)
+    if unknown:
+        raise BulkRequestError(f"Cannot filter on: {', '.join(sorted(unknown))}.")
+    try:
+        return Perfume.objects.filter(**filters), None
+    except (TypeError, ValueError, ValidationError) as e:
+        raise BulkRequestError(f"Invalid filter value: {e}")
+
+def _set_based_update(queryset, values):
+    """
+    Apply `values` to every row of `queryset` with one UPDATE inside a
+    transaction and return the affected ids. Derived columns (search
+    document, price range) are recomputed only when one of their sources changed.
+    """
+    with transaction.atomic():
+        perfume_ids = list(queryset.select_for_update().values_list('id', flat=True))
+        Perfume.objects.filter(id__in=perfume_ids).update(**values, updated_at=timezone.now())
+        if set(values) & set(Perfume.DERIVED_FROM_FIELDS):
+            perfumes = list(Perfume.objects.filter(id__in=perfume_ids))
+            for perfume in perfumes:
+                perfume.update_derived_fields()
+            Perfume.objects.bulk_update(perfumes, list(Perfume.DERIVED_FIELDS), batch_size=BULK_MAX_ITEMS)
+    return perfume_ids
+
+def _queue_changed_images(perfumes):
+    """Queue image variants for the perfumes whose variants were not made from their current imageUrl."""
+    images.queue_perfume_images([
+        perfume.id for perfume in perfumes if perfume.imageUrl and perfume.imageSource != perfume.imageUrl
+    ])
+
 class PerfumeAdminViewSet(viewsets.ViewSet):
     permission_classes = [IsAdminUser] # Protect this viewset
     serializer_class = AdminPerfumeSerializer
@@ -157,14 +707,26 @@ class PerfumeAdminViewSet(viewsets.ViewSet):
         limit = int(request.query_params.get('limit', 20))
         offset = (page - 1) * limit
 
+        if _wants_cursor(request.query_params):
+            try:
+                rows = Perfume.objects.values(*admin_perfume_projection.columns, 'created_at')
+                perfumes, pagination = paginate_by_cursor(rows, request.query_params.get('cursor'), limit)
+            except InvalidCursor as e:
+                return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            if _wants_total(request.query_params):
+                pagination["totalItems"] = cached_count(Perfume.objects.all(), ('admin',))
+            return Response({
+                "perfumes": admin_perfume_projection.many(perfumes),
+                "pagination": pagination
+            }, status=status.HTTP_200_OK)
+
         queryset = Perfume.objects.all().order_by('-created_at')
         total_items = queryset.count()
         total_pages = (total_items + limit - 1) // limit
-        paginated_perfumes = queryset[offset:offset + limit]
+        paginated_perfumes = admin_perfume_projection.values(queryset)[offset:offset + limit]
 
-        serializer = self.serializer_class(paginated_perfumes, many=True)
         return Response({
-            "perfumes": serializer.data,
+            "perfumes": admin_perfume_projection.many(paginated_perfumes),
             "pagination": {
                 "currentPage": page,
                 "totalPages": total_pages,
@@ -178,6 +740,9 @@ class PerfumeAdminViewSet(viewsets.ViewSet):
         serializer = self.serializer_class(data=request.data)
         serializer.is_valid(raise_exception=True)
         perfume = Perfume.objects.create(**serializer.validated_data)
+        catalog_changed(updated_ids=[perfume.id])
+        if perfume.imageUrl:
+            images.queue_perfume_images([perfume.id])
         return Response(self.serializer_class(perfume).data, status=status.HTTP_201_CREATED)
 
     def retrieve(self, request, pk=None, *args, **kwargs):
@@ -198,6 +763,8 @@ class PerfumeAdminViewSet(viewsets.ViewSet):
         for attr, value in serializer.validated_data.items():
             setattr(perfume, attr, value)
         perfume.save()
+        catalog_changed(updated_ids=[perfume.id])
+        _queue_changed_images([perfume])
         return Response(self.serializer_class(perfume).data, status=status.HTTP_200_OK)
 
     def partial_update(self, request, pk=None, *args, **kwargs):
@@ -210,6 +777,8 @@ class PerfumeAdminViewSet(viewsets.ViewSet):
         for attr, value in serializer.validated_data.items():
             setattr(perfume, attr, value)
         perfume.save()
+        catalog_changed(updated_ids=[perfume.id])
+        _queue_changed_images([perfume])
         return Response(self.serializer_class(perfume).data, status=status.HTTP_200_OK)
 
     def destroy(self, request, pk=None, *args, **kwargs):
@@ -217,5 +786,218 @@ class PerfumeAdminViewSet(viewsets.ViewSet):
             perfume = Perfume.objects.get(id=pk)
         except Perfume.DoesNotExist:
             return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
-        perfume.delete()
+        perfume_id = perfume.id
+        with transaction.atomic():
+            perfume.delete()
+            record_deletions([perfume_id])
+        catalog_changed(deleted_ids=[perfume_id])
         return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['post'], url_path='image')
+    def image(self, request, pk=None, *args, **kwargs):
+        """
+        Set a perfume's image from an uploaded `image` file (multipart), or,
+        with no file, (re)make the variants of its current imageUrl. The
+        variants are made in the background; the response is 202 Accepted.
+        """
+        if not images.images_enabled():
+            return Response({"detail": "Image processing is not available."}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        try:
+            perfume = Perfume.objects.get(id=pk)
+        except Perfume.DoesNotExist:
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        upload = request.FILES.get('image')
+        if upload is not None:
+            if upload.size > images.IMAGE_MAX_BYTES:
+                return Response({"detail": f"Images may be at most {images.IMAGE_MAX_BYTES} bytes."},
+                                status=status.HTTP_400_BAD_REQUEST)
+            try:
+                url = images.store_original(upload.read())
+            except images.ImageError as e:
+                return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            perfume.imageUrl = request.build_absolute_uri(url)
+            perfume.save()
+            catalog_changed(updated_ids=[perfume.id])
+        elif not perfume.imageUrl:
+            return Response({"detail": "Upload an `image` file or set imageUrl first."}, status=status.HTTP_400_BAD_REQUEST)
+        images.queue_perfume_images([perfume.id])
+        return Response(self.serializer_class(perfume).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request, *args, **kwargs):
+        """
+        Stream the whole catalog as NDJSON (default) or CSV, optionally gzipped.
+
+        Rows are read through a server-side cursor and written as they
+        arrive, so memory stays flat however large the catalog is.
+        """
+        export_format = request.query_params.get('exportFormat', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return Response({"detail": f"exportFormat must be one of: {', '.join(EXPORT_FORMATS)}."}, status=status.HTTP_400_BAD_REQUEST)
+        active_only = request.query_params.get('activeOnly', '').lower() in ('1', 'true', 'yes')
+        use_gzip = request.query_params.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+        chunks = iter_export(export_format, export_queryset(active_only))
+        filename = f"perfumes.{export_format}"
+        if use_gzip:
+            response = StreamingHttpResponse(gzip_stream(chunks), content_type='application/gzip')
+            filename += '.gz'
+        else:
+            response = StreamingHttpResponse(
+                (chunk.encode('utf-8') for chunk in chunks),
+                content_type=f"{EXPORT_FORMATS[export_format]}; charset=utf-8",
+            )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(detail=False, methods=['post'], url_path='bulk-create')
+    def bulk_create(self, request, *args, **kwargs):
+        """Create many perfumes with one validation pass and one multi-row INSERT."""
+        try:
+            items = _bulk_items(request.data)
+        except BulkRequestError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = self.serializer_class(data=items, many=True)
+        if not serializer.is_valid():
+            return Response({"results": _bulk_errors(serializer.errors)}, status=status.HTTP_400_BAD_REQUEST)
+
+        perfumes = [Perfume(**validated) for validated in serializer.validated_data]
+        for perfume in perfumes:
+            perfume.update_derived_fields()
+        with transaction.atomic():
+            Perfume.objects.bulk_create(perfumes, batch_size=BULK_MAX_ITEMS)
+        catalog_changed(updated_ids=[perfume.id for perfume in perfumes])
+        _queue_changed_images(perfumes)
+        return Response({
+            "results": [
+                {"index": index, "status": "created", "perfume": self.serializer_class(perfume).data}
+                for index, perfume in enumerate(perfumes)
+            ]
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['patch'], url_path='bulk-update')
+    def bulk_update(self, request, *args, **kwargs):
+        """
+        Partially update many perfumes in one transaction.
+
+        Accepts either a list of `{"id": ..., <fields>}` items, applied with
+        `bulk_update`, or a set-based `{"ids"|"filter": ..., "values": {...}}`
+        object, applied with a single UPDATE.
+        """
+        if isinstance(request.data, dict):
+            return self._bulk_update_where(request)
+        try:
+            items = _bulk_items(request.data)
+            ids = _bulk_ids([item.get('id') if isinstance(item, dict) else None for item in items])
+        except BulkRequestError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = self.serializer_class(data=items, many=True, partial=True)
+        if not serializer.is_valid():
+            return Response({"results": _bulk_errors(serializer.errors)}, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        results, changed, fields = [], [], {'updated_at', *Perfume.DERIVED_FIELDS}
+        with transaction.atomic():
+            existing = Perfume.objects.select_for_update().in_bulk(ids)
+            for index, (perfume_id, validated) in enumerate(zip(ids, serializer.validated_data)):
+                perfume = existing.get(perfume_id)
+                if perfume is None:
+                    results.append({"index": index, "id": str(perfume_id), "status": "not_found"})
+                    continue
+                for attr, value in validated.items():
+                    setattr(perfume, attr, value)
+                perfume.updated_at = now
+                perfume.update_derived_fields()
+                fields.update(validated)
+                changed.append(perfume)
+                results.append({"index": index, "id": str(perfume_id), "status": "updated", "perfume": perfume})
+            if changed:
+                Perfume.objects.bulk_update(changed, sorted(fields), batch_size=BULK_MAX_ITEMS)
+        catalog_changed(updated_ids=[perfume.id for perfume in changed])
+        _queue_changed_images(changed)
+        for result in results:
+            if "perfume" in result:
+                result["perfume"] = self.serializer_class(result["perfume"]).data
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+    def _bulk_update_where(self, request):
+        try:
+            queryset, ids = _bulk_target(request.data)
+        except BulkRequestError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        values = request.data.get('values')
+        if not isinstance(values, dict) or not values:
+            return Response({"detail": "`values` must be a non-empty object."}, status=status.HTTP_400_BAD_REQUEST)
+        serializer = self.serializer_class(data=values, partial=True)
+        serializer.is_valid(raise_exception=True)
+        updated_ids = _set_based_update(queryset, serializer.validated_data)
+        catalog_changed(updated_ids=updated_ids)
+        if serializer.validated_data.get('imageUrl'):
+            images.queue_perfume_images(updated_ids)
+        return Response(_bulk_summary("updated", updated_ids, ids), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='bulk-activate')
+    def bulk_activate(self, request, *args, **kwargs):
+        """Set `isActive` on perfumes selected by `ids` or `filter` with a single UPDATE."""
+        try:
+            queryset, ids = _bulk_target(request.data)
+        except BulkRequestError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        is_active = request.data.get('isActive', True)
+        if not isinstance(is_active, bool):
+            return Response({"detail": "`isActive` must be a boolean."}, status=status.HTTP_400_BAD_REQUEST)
+        updated_ids = _set_based_update(queryset, {'isActive': is_active})
+        catalog_changed(updated_ids=updated_ids)
+        return Response(_bulk_summary("updated", updated_ids, ids), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='bulk-delete')
+    def bulk_delete(self, request, *args, **kwargs):
+        """Delete perfumes selected by `ids` or `filter` with a single DELETE."""
+        try:
+            queryset, ids = _bulk_target(request.data)
+        except BulkRequestError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            deleted_ids = list(queryset.select_for_update().values_list('id', flat=True))
+            Perfume.objects.filter(id__in=deleted_ids).delete()
+            record_deletions(deleted_ids)
+        catalog_changed(deleted_ids=deleted_ids)
+        return Response(_bulk_summary("deleted", deleted_ids, ids), status=status.HTTP_200_OK)
+
+def _bulk_errors(errors):
+    """Per-item results for a rejected batch; valid items are reported as skipped."""
+    return [
+        {"index": index, "status": "invalid", "errors": item_errors} if item_errors else {"index": index, "status": "skipped"}
+        for index, item_errors in enumerate(errors)
+    ]
+
+def _bulk_summary(outcome, affected_ids, requested_ids):
+    """Count of affected rows plus, when explicit ids were sent, a per-id result."""
+    summary = {outcome: len(affected_ids)}
+    if requested_ids is not None:
+        affected = set(affected_ids)
+        summary["results"] = [
+            {"id": str(perfume_id), "status": outcome if perfume_id in affected else "not_found"}
+            for perfume_id in requested_ids
+        ]
+    return summary
+
+# A year: the longest max-age caches are expected to honour
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+def serve_perfume_image(request, name):
+    """
+    A stored perfume image or variant. Names are content hashes, so the
+    response may be cached forever. In production the web server should
+    serve PERFUME_IMAGE_ROOT at PERFUME_IMAGE_URL with the same headers.
+    """
+    path = images.stored_image_path(images.PERFUME_IMAGE_URL + name) if images.PERFUME_IMAGE_ROOT else None
+    if path is None:
+        raise Http404
+    try:
+        response = FileResponse(open(path, 'rb'))
+    except FileNotFoundError:
+        raise Http404
+    response['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return response
+
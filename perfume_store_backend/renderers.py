@@ -0,0 +1,40 @@
+"""
+JSON rendering for the API.
+
+`FastJSONRenderer` produces the same bytes as DRF's JSONRenderer (compact,
+UTF-8, not ASCII-escaped, U+2028/U+2029 escaped) but encodes with orjson,
+which is several times faster on the catalog's list pages. UUIDs and the
+builtin containers are encoded natively; dates and times, Decimals, lazy
+translation strings and other types orjson does not know are handed to
+DRF's encoder, so they come out exactly as before. Without orjson installed,
+or when the client asks for indented output, it is DRF's renderer.
+"""
+from rest_framework.utils.encoders import JSONEncoder
+
+from .instrumentation import TimedJSONRenderer, timed
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+_encode_default = JSONEncoder().default
+
+
+class FastJSONRenderer(TimedJSONRenderer):
+    """TimedJSONRenderer encoding with orjson when it is available."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        with timed('render'):
+            ret = orjson.dumps(
+                data,
+                default=_encode_default,
+                # Datetimes go through DRF's encoder, which writes UTC as Z
+                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            )
+            # Like DRF: these are valid JSON but end a line in JavaScript
+            return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
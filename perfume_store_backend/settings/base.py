@@ -76,6 +76,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "corsheaders", 
     "rest_framework",
     "rest_framework.authtoken", 
@@ -84,6 +85,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings (and Server-Timing header) cover the whole stack
+    "perfume_store_backend.instrumentation.RequestMetricsMiddleware",
+    # Above everything that reads or writes the body
+    "perfume_store_backend.compression.CompressionMiddleware",
+    # Before anything queries the database; a no-op without a read replica
+    "perfume_store_backend.db_routers.ReplicaRoutingMiddleware",
     "corsheaders.middleware.CorsMiddleware", 
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -113,11 +120,45 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "perfume_store_backend.wsgi.application"
 
+# Serve the public list/detail endpoints from the async views. asgi.py turns
+# this on, so the same settings give sync views under WSGI and async ones
+# under uvicorn.
+ASYNC_PUBLIC_VIEWS = os.environ.get('ASYNC_PUBLIC_VIEWS', '').lower() in ('1', 'true', 'yes')
+
+# Catalog snapshot (perfumes/snapshot.py), rewritten after every admin write
+# and opened by each worker at startup, so public reads can be answered
+# before the first database round trip and while the database is down.
+# Set CATALOG_SNAPSHOT_PATH to an empty value to turn it off.
+CATALOG_SNAPSHOT_PATH = os.environ.get(
+    'CATALOG_SNAPSHOT_PATH', str(BASE_DIR / 'perfume_store_backend' / 'data' / 'catalog.snapshot'))
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
 # Supabase PostgreSQL Database Configuration
+#
+# Every new connection costs a TCP and TLS handshake plus authentication
+# against the remote server, so a worker keeps its connection for
+# DB_CONN_MAX_AGE seconds (0 closes it after every request), checking it is
+# still alive before reusing it. With DB_POOL set, connections come from a
+# psycopg 3 pool per process instead, shared by all its threads; use it
+# under ASGI, where each request's queries run on a thread of their own and
+# a persistent connection would never be reused.
+DB_POOL = os.environ.get('DB_POOL', '').lower() in ('1', 'true', 'yes')
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+
+DATABASE_OPTIONS = {
+    "sslmode": "require",
+}
+if DB_POOL:
+    DATABASE_OPTIONS["pool"] = {
+        "min_size": int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+        "max_size": int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+        # Seconds a request waits for a free connection before failing
+        "timeout": int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+    }
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -126,12 +167,30 @@ DATABASES = {
         "PASSWORD": os.environ.get("SUPABASE_PASSWORD", "YOUR_SUPABASE_PASSWORD"),
         "HOST": os.environ.get("SUPABASE_HOST", "YOUR_SUPABASE_HOST"),
         "PORT": os.environ.get("SUPABASE_PORT", "5432"),
-        "OPTIONS": {
-            "sslmode": "require",
-        },
+        # Pooled connections go back to the pool after each request, which checks them
+        "CONN_MAX_AGE": 0 if DB_POOL else DB_CONN_MAX_AGE,
+        "CONN_HEALTH_CHECKS": not DB_POOL,
+        "OPTIONS": DATABASE_OPTIONS,
     }
 }
 
+# Optional read replica: the public read endpoints query it, writes and the
+# admin's reads right after a write stay on the primary
+# (perfume_store_backend/db_routers.py). Same credentials as the primary.
+DATABASE_REPLICA_HOST = os.environ.get('DATABASE_REPLICA_HOST')
+if DATABASE_REPLICA_HOST:
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": DATABASE_REPLICA_HOST,
+        "PORT": os.environ.get("DATABASE_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "OPTIONS": {**DATABASE_OPTIONS},
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["perfume_store_backend.db_routers.PrimaryReplicaRouter"]
+
+# Seconds all reads stay on the primary after an admin write; cover the replica's lag
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
 
 
 # For development, you can still use SQLite if needed
@@ -181,28 +240,96 @@ USE_TZ = True
 STATIC_URL = "static/"
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+MEDIA_URL = "/media/"
+MEDIA_ROOT = BASE_DIR / "media"
+
+# Perfume images and their resized variants (perfumes/images.py), stored
+# under content-hashed names and served from PERFUME_IMAGE_URL with
+# immutable cache headers. Set PERFUME_IMAGE_ROOT to an empty value to turn
+# uploads and variants off.
+PERFUME_IMAGE_ROOT = os.environ.get('PERFUME_IMAGE_ROOT', str(MEDIA_ROOT / 'perfumes'))
+PERFUME_IMAGE_URL = MEDIA_URL + 'perfumes/'
+# Hosts a remote imageUrl may be downloaded from (comma-separated,
+# ALLOWED_HOSTS patterns, https only); unset, only uploaded images get variants
+PERFUME_IMAGE_FETCH_HOSTS = [
+    host.strip() for host in os.environ.get('PERFUME_IMAGE_FETCH_HOSTS', '').split(',') if host.strip()
+]
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
-# Cache configuration for rate limiting
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+# Cache configuration for rate limiting and catalog response caching.
+# With REDIS_URL set, every worker shares one Redis cache (so login attempt
+# counters and cached responses are global), fronted by a small per-process
+# L1 for hot catalog entries. L1_KEY_PREFIXES may only list keys whose value
+# never changes (these include the catalog generation), since other workers'
+# L1s are not invalidated. Without it, each process has its own LocMemCache.
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'perfume_store_backend.tiered_cache.TieredCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {
+                'SHARED_BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                'L1_KEY_PREFIXES': ['catalog_response_', 'perfume_count_'],
+                'L1_MAX_ENTRIES': int(os.environ.get('CACHE_L1_MAX_ENTRIES', 1000)),
+                'L1_TIMEOUT': int(os.environ.get('CACHE_L1_TIMEOUT', 30)),
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'unique-snowflake',
+        }
     }
-}
+
+# The catalog and settings generations live in the database whatever the cache
+# (perfume_store_backend/perfumes/catalog.py); each worker re-reads them at most
+# this often (seconds), which bounds how long it serves data another worker changed.
+CATALOG_GENERATION_CHECK_INTERVAL = float(os.environ.get('CATALOG_GENERATION_CHECK_INTERVAL', 1))
 
 AUTH_USER_MODEL = 'admins.Admin'
 
+# Request instrumentation (perfume_store_backend/instrumentation.py).
+# Requests slower than this are logged, with their slowest queries, on the
+# `perfume_store_backend.slow_requests` logger; per-view histograms are
+# served to admins at /api/metrics/ in the Prometheus text format.
+SLOW_REQUEST_THRESHOLD_MS = int(os.environ.get('SLOW_REQUEST_THRESHOLD_MS', 500))
+SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', 'true').lower() != 'false'
+
+# Response compression (perfume_store_backend/compression.py): brotli or gzip
+# per Accept-Encoding, for bodies of at least this many bytes.
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+
+# Login throttle (perfume_store_backend/admins/throttling.py), as (attempts,
+# seconds): per client IP and per account name. Counted in the cache, so the
+# limits span all workers only with REDIS_URL; with the per-process LocMemCache
+# each worker allows them on its own.
+LOGIN_RATE_PER_IP = (5, 15 * 60)
+LOGIN_RATE_PER_ACCOUNT = (10, 15 * 60)
+# Optional budget for all logins together, per minute. Off unless set: an
+# attacker who spends it locks every admin out until the minute is over.
+LOGIN_RATE_GLOBAL = (
+    (int(os.environ['LOGIN_RATE_GLOBAL_PER_MINUTE']), 60) if os.environ.get('LOGIN_RATE_GLOBAL_PER_MINUTE') else None
+)
+
+# Seconds an admin token lookup stays cached (perfume_store_backend/admins/authentication.py)
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.environ.get('AUTH_TOKEN_CACHE_TIMEOUT', 300))
+
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        # orjson-backed JSONRenderer that reports its time in the Server-Timing header
+        'perfume_store_backend.renderers.FastJSONRenderer',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        # TokenAuthentication with the token and its admin cached
+        'perfume_store_backend.admins.authentication.CachedTokenAuthentication',
     ],
 }
 
@@ -0,0 +1,197 @@
+"""
+Two-tier cache backend: a small in-process LRU in front of a shared cache.
+
+The shared tier (Redis in production) is what makes counters and cached
+responses visible to every worker. Hot, immutable entries whose keys start
+with one of `L1_KEY_PREFIXES` are also kept in a per-process LRU for
+`L1_TIMEOUT` seconds so repeated reads skip the network round trip.
+
+Only keys whose value never changes once written belong in the L1, because
+a write or delete in one worker cannot reach another worker's L1 before
+the entry expires. The catalog response and count caches qualify: their
+keys include the catalog generation, which lives in the database
+(perfumes/catalog.py), so a catalog write moves readers on to new keys
+and the old entries just age out. A write in this process still updates
+its own L1 immediately.
+
+Example:
+
+    CACHES = {
+        "default": {
+            "BACKEND": "perfume_store_backend.tiered_cache.TieredCache",
+            "LOCATION": "redis://127.0.0.1:6379/0",
+            "OPTIONS": {
+                "SHARED_BACKEND": "django.core.cache.backends.redis.RedisCache",
+                "L1_KEY_PREFIXES": ["catalog_response_"],
+            },
+        }
+    }
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+from django.utils.module_loading import import_string
+
+
+class LocalLRU:
+    """Thread-safe, size-bounded LRU with a per-entry expiry time."""
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return (found, value)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, timeout=None):
+        if timeout is None or timeout > self.timeout:
+            timeout = self.timeout
+        if timeout <= 0:
+            self.delete(key)
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TieredCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        shared_backend = import_string(options.get('SHARED_BACKEND', 'django.core.cache.backends.redis.RedisCache'))
+        self._shared = shared_backend(location, {
+            'TIMEOUT': params.get('TIMEOUT', 300),
+            'KEY_PREFIX': params.get('KEY_PREFIX', ''),
+            'VERSION': params.get('VERSION', 1),
+            'KEY_FUNCTION': params.get('KEY_FUNCTION'),
+            'OPTIONS': options.get('SHARED_OPTIONS', {}),
+        })
+        self._local = LocalLRU(
+            max_entries=int(options.get('L1_MAX_ENTRIES', 1000)),
+            timeout=float(options.get('L1_TIMEOUT', 30)),
+        )
+        self._local_prefixes = tuple(options.get('L1_KEY_PREFIXES', ()))
+
+    # --- L1 bookkeeping -------------------------------------------------
+
+    def _is_local(self, key):
+        return bool(self._local_prefixes) and key.startswith(self._local_prefixes)
+
+    def _local_key(self, key, version):
+        return self.make_and_validate_key(key, version=version)
+
+    def _written(self, key, version):
+        """Keep L1 coherent after a write that went to the shared tier."""
+        if self._is_local(key):
+            self._local.delete(self._local_key(key, version))
+
+    # --- cache API ------------------------------------------------------
+
+    def get(self, key, default=None, version=None):
+        if not self._is_local(key):
+            return self._shared.get(key, default, version=version)
+        local_key = self._local_key(key, version)
+        found, value = self._local.get(local_key)
+        if found:
+            return value
+        value = self._shared.get(key, self, version=version)
+        if value is self:
+            return default
+        self._local.set(local_key, value)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._shared.set(key, value, timeout, version=version)
+        if self._is_local(key):
+            local_timeout = None if timeout is DEFAULT_TIMEOUT else timeout
+            self._local.set(self._local_key(key, version), value, local_timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self._shared.add(key, value, timeout, version=version)
+        if added:
+            self._written(key, version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._shared.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        deleted = self._shared.delete(key, version=version)
+        self._written(key, version)
+        return deleted
+
+    def has_key(self, key, version=None):
+        return self._shared.has_key(key, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        # Atomic on the shared tier (Redis INCRBY), so counters are exact
+        # across workers.
+        value = self._shared.incr(key, delta, version=version)
+        self._written(key, version)
+        return value
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version=version)
+
+    def get_many(self, keys, version=None):
+        found, missing = {}, []
+        for key in keys:
+            if self._is_local(key):
+                hit, value = self._local.get(self._local_key(key, version))
+                if hit:
+                    found[key] = value
+                    continue
+            missing.append(key)
+        if missing:
+            fetched = self._shared.get_many(missing, version=version)
+            for key, value in fetched.items():
+                if self._is_local(key):
+                    self._local.set(self._local_key(key, version), value)
+            found.update(fetched)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self._shared.set_many(data, timeout, version=version)
+        for key in data:
+            self._written(key, version)
+        return failed
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self._shared.delete_many(keys, version=version)
+        for key in keys:
+            self._written(key, version)
+
+    def clear(self):
+        self._shared.clear()
+        self._local.clear()
+
+    def close(self, **kwargs):
+        self._shared.close(**kwargs)
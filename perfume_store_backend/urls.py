@@ -17,8 +17,12 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include # Import include
 
+from perfume_store_backend.perfumes.images import PERFUME_IMAGE_URL
+from perfume_store_backend.perfumes.views import serve_perfume_image
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("perfume_store_backend.perfumes.urls")), # Include perfumes app URLs under /api/
     path("api/", include("perfume_store_backend.admins.urls")), # Include admins app URLs under /api/
+    path(PERFUME_IMAGE_URL.lstrip("/") + "<str:name>", serve_perfume_image, name="perfume-image"), # Content-hashed, cached forever
 ]
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "perfume_store_backend.settings.base")
 
 application = get_wsgi_application()
+
+# Serve public reads from the on-disk catalog snapshot from the first request
+from perfume_store_backend.perfumes.snapshot import catalog_snapshot  # noqa: E402
+
+catalog_snapshot.load()
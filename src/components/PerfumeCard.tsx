@@ -1,6 +1,7 @@
 import React, { useRef, useEffect, useState } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import { useLanguage } from '../contexts/LanguageContext';
+import { imageSrcSet, ImageVariants } from '../lib/api';
 
 interface PerfumeCardProps {
   perfume: {
@@ -22,6 +23,7 @@ interface PerfumeCardProps {
     }>;
     stockStatus: string;
     imageUrl: string;
+    imageVariants?: ImageVariants;
     isNew: boolean;
     isBestseller: boolean;
     isActive: boolean;
@@ -29,6 +31,9 @@ interface PerfumeCardProps {
   indexInRow?: number;
 }
 
+// Rendered width of a card image in the home page grid (2, 3 or 4 columns)
+const CARD_IMAGE_SIZES = '(min-width: 1024px) 25vw, (min-width: 768px) 33vw, 50vw';
+
 export default function PerfumeCard({ perfume, indexInRow = 0 }: PerfumeCardProps) {
   const { language, t } = useLanguage();
   const navigate = useNavigate();
@@ -83,15 +88,22 @@ export default function PerfumeCard({ perfume, indexInRow = 0 }: PerfumeCardProp
       <div className={perfume.stockStatus === 'Out of Stock' ? 'opacity-70' : ''}>
         {/* Image Container */}
         <div className="relative">
-          <img
-            src={perfume.imageUrl || "https://placehold.co/300x300?text=No+Image"}
-            alt={name}
-            className="w-full h-48 object-contain bg-white"
-            onError={(e) => {
-              e.currentTarget.src = "https://placehold.co/300x300?text=No+Image";
-              e.currentTarget.onerror = null; // prevents infinite loop
-            }}
-          />
+          <picture>
+            <source type="image/webp" srcSet={imageSrcSet(perfume.imageVariants, 'webp')} sizes={CARD_IMAGE_SIZES} />
+            <img
+              src={perfume.imageUrl || "https://placehold.co/300x300?text=No+Image"}
+              srcSet={imageSrcSet(perfume.imageVariants, 'jpeg')}
+              sizes={CARD_IMAGE_SIZES}
+              alt={name}
+              loading="lazy"
+              className="w-full h-48 object-contain bg-white"
+              onError={(e) => {
+                e.currentTarget.removeAttribute('srcset');
+                e.currentTarget.src = "https://placehold.co/300x300?text=No+Image";
+                e.currentTarget.onerror = null; // prevents infinite loop
+              }}
+            />
+          </picture>
 
           {/* Badges */}
           <div className="absolute top-2 left-2 flex flex-col gap-1 items-start">
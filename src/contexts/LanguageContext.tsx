@@ -26,6 +26,8 @@ const translations = {
     'home.filter.gender': 'Gender',
     'home.new': 'New',
     'home.bestseller': 'Bestseller',
+    'home.newArrivals': 'New Arrivals',
+    'home.bestsellers': 'Bestsellers',
     'home.inStock': 'In Stock',
     'home.outOfStock': 'Out of Stock',
     'home.viewDetails': 'View Details',
@@ -137,6 +139,8 @@ const translations = {
     'home.filter.gender': 'الجنس',
     'home.new': 'جديد',
     'home.bestseller': 'الأكثر مبيعاً',
+    'home.newArrivals': 'وصل حديثاً',
+    'home.bestsellers': 'الأكثر مبيعاً',
     'home.inStock': 'متوفر',
     'home.outOfStock': 'غير متوفر',
     'home.viewDetails': 'عرض التفاصيل',
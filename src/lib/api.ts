@@ -5,6 +5,9 @@ interface PerfumeSize {
   priceEGP: number;
 }
 
+// Resized copies of imageUrl per format, keyed by width: {"webp": {"320": "/media/perfumes/<hash>.webp"}}
+export type ImageVariants = Partial<Record<'webp' | 'jpeg', Record<string, string>>>;
+
 interface Perfume {
   id?: string; // UUID primary key
   _id?: string;
@@ -21,6 +24,7 @@ interface Perfume {
   sizes: PerfumeSize[];
   stockStatus: string;
   imageUrl?: string;
+  imageVariants?: ImageVariants;
   isNew: boolean;
   isBestseller: boolean;
   isActive: boolean;
@@ -34,12 +38,34 @@ interface Pagination {
   hasPrev: boolean;
 }
 
+interface CursorPagination {
+  nextCursor: string | null;
+  prevCursor: string | null;
+  hasNext: boolean;
+  hasPrev: boolean;
+  totalItems?: number;
+}
+
 interface PerfumeListResponse {
   perfumes: Perfume[];
   pagination: Pagination;
 }
 
+interface PerfumeCursorListResponse {
+  perfumes: Perfume[];
+  pagination: CursorPagination;
+}
+
 // Perfume API calls
+// `srcset` for one format of an image's variants, or undefined if there are none yet
+export const imageSrcSet = (variants: ImageVariants | undefined, format: 'webp' | 'jpeg'): string | undefined => {
+  const urls = variants?.[format];
+  if (!urls || Object.keys(urls).length === 0) return undefined;
+  return Object.entries(urls)
+    .map(([width, path]) => `${new URL(path, API_BASE_URL).href} ${width}w`)
+    .join(', ');
+};
+
 export const listPerfumes = async (params: {
   language?: string;
   brandFilter?: string;
@@ -47,8 +73,15 @@ export const listPerfumes = async (params: {
   genderFilter?: string;
   stockStatusFilter?: string;
   searchTerm?: string;
+  minPrice?: number;
+  maxPrice?: number;
+  sort?: 'newest' | 'price_asc' | 'price_desc' | 'name';
   page?: number;
   limit?: number;
+  // Only these fields (bilingual ones by base name, e.g. 'name'); id is always included
+  fields?: string[];
+  // Only the `language` variant of bilingual fields
+  languageOnly?: boolean;
 }): Promise<PerfumeListResponse> => {
   const query = new URLSearchParams();
   if (params.language) query.append('language', params.language);
@@ -57,8 +90,44 @@ export const listPerfumes = async (params: {
   if (params.genderFilter) query.append('genderFilter', params.genderFilter);
   if (params.stockStatusFilter) query.append('stockStatusFilter', params.stockStatusFilter);
   if (params.searchTerm) query.append('searchTerm', params.searchTerm);
+  if (params.minPrice !== undefined) query.append('minPrice', params.minPrice.toString());
+  if (params.maxPrice !== undefined) query.append('maxPrice', params.maxPrice.toString());
+  if (params.sort) query.append('sort', params.sort);
   if (params.page) query.append('page', params.page.toString());
   if (params.limit) query.append('limit', params.limit.toString());
+  if (params.fields) query.append('fields', params.fields.join(','));
+  if (params.languageOnly) query.append('languageOnly', 'true');
+
+  const response = await fetch(`${API_BASE_URL}/perfumes/?${query.toString()}`);
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+  return response.json();
+};
+
+// Keyset-paginated variant for infinite scroll: pass '' for the first page,
+// then the returned nextCursor.
+export const listPerfumesByCursor = async (params: {
+  language?: string;
+  brandFilter?: string;
+  categoryFilter?: string;
+  genderFilter?: string;
+  stockStatusFilter?: string;
+  searchTerm?: string;
+  cursor: string;
+  limit?: number;
+  includeTotal?: boolean;
+}): Promise<PerfumeCursorListResponse> => {
+  const query = new URLSearchParams();
+  if (params.language) query.append('language', params.language);
+  if (params.brandFilter) query.append('brandFilter', params.brandFilter);
+  if (params.categoryFilter) query.append('categoryFilter', params.categoryFilter);
+  if (params.genderFilter) query.append('genderFilter', params.genderFilter);
+  if (params.stockStatusFilter) query.append('stockStatusFilter', params.stockStatusFilter);
+  if (params.searchTerm) query.append('searchTerm', params.searchTerm);
+  query.append('cursor', params.cursor);
+  if (params.limit) query.append('limit', params.limit.toString());
+  if (params.includeTotal) query.append('includeTotal', 'true');
 
   const response = await fetch(`${API_BASE_URL}/perfumes/?${query.toString()}`);
   if (!response.ok) {
@@ -68,8 +137,9 @@ export const listPerfumes = async (params: {
 };
 
 export const getPerfumeById = async (id: string): Promise<Perfume | null> => {
-  const timestamp = Date.now(); // Cache busting
-  const response = await fetch(`${API_BASE_URL}/perfumes/${id}/?t=${timestamp}`);
+  // Detail responses carry an ETag that changes with the catalog, so the
+  // browser revalidates them cheaply instead of needing a cache-buster
+  const response = await fetch(`${API_BASE_URL}/perfumes/${id}/`);
   if (!response.ok) {
     return null;
   }
@@ -87,6 +157,86 @@ export const getPerfumeById = async (id: string): Promise<Perfume | null> => {
   };
 };
 
+interface PerfumeBatchResponse {
+  perfumes: Perfume[];
+  missing: string[];
+}
+
+// Largest batch the backend accepts (BATCH_MAX_IDS)
+const PERFUME_BATCH_SIZE = 100;
+
+// Fetch many perfumes in one request (per 100 ids) instead of one request per id.
+// Unknown and inactive perfumes are simply absent from the returned map.
+export const getPerfumesByIds = async (ids: string[]): Promise<Map<string, Perfume>> => {
+  // Sorted so the same set of ids always hits the same cached response
+  const uniqueIds = Array.from(new Set(ids)).sort();
+  const perfumes = new Map<string, Perfume>();
+  for (let start = 0; start < uniqueIds.length; start += PERFUME_BATCH_SIZE) {
+    const query = new URLSearchParams({ ids: uniqueIds.slice(start, start + PERFUME_BATCH_SIZE).join(',') });
+    const response = await fetch(`${API_BASE_URL}/perfumes/batch/?${query.toString()}`);
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    const data: PerfumeBatchResponse = await response.json();
+    for (const perfume of data.perfumes) {
+      perfumes.set(perfume.id as string, { ...perfume, isActive: true });
+    }
+  }
+  return perfumes;
+};
+
+export interface PerfumeChanges {
+  perfumes: Perfume[];
+  removed: string[];
+  nextCursor: string;
+  hasMore: boolean;
+}
+
+// Perfumes changed since `since` (the previous response's nextCursor; omit it for the whole
+// catalog) and the ids of ones deleted or deactivated. Returns null when the cursor has
+// expired (410) and the catalog must be fetched again from scratch.
+export const getPerfumeChanges = async (since?: string): Promise<PerfumeChanges | null> => {
+  const query = new URLSearchParams();
+  if (since) query.append('since', since);
+  const response = await fetch(`${API_BASE_URL}/perfumes/changes/?${query.toString()}`);
+  if (response.status === 410) {
+    return null;
+  }
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+  return response.json();
+};
+
+export interface CollectionGroup {
+  name: string;
+  perfumes: Perfume[];
+}
+
+export interface Collections {
+  new: Perfume[];
+  bestseller: Perfume[];
+  brands: CollectionGroup[];
+  categories: CollectionGroup[];
+}
+
+// The homepage rails (new arrivals, bestsellers, and the top brands and categories) in one request
+export const getCollections = async (params: {
+  language?: string;
+  fields?: string[];
+  languageOnly?: boolean;
+} = {}): Promise<Collections> => {
+  const query = new URLSearchParams();
+  if (params.language) query.append('language', params.language);
+  if (params.fields) query.append('fields', params.fields.join(','));
+  if (params.languageOnly) query.append('languageOnly', 'true');
+  const response = await fetch(`${API_BASE_URL}/collections/?${query.toString()}`);
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+  return response.json();
+};
+
 export const getBrands = async (language?: string): Promise<string[]> => {
   const query = new URLSearchParams();
   if (language) query.append('language', language);
@@ -242,6 +392,15 @@ export const getSettings = async (): Promise<Record<string, string>> => {
   return response.json();
 };
 
+// Whitelisted settings the storefront needs (e.g. whatsapp_phone); no login required
+export const getPublicSettings = async (): Promise<Record<string, unknown>> => {
+  const response = await fetch(`${API_BASE_URL}/settings/`);
+  if (!response.ok) {
+    throw new Error(`HTTP error! status: ${response.status}`);
+  }
+  return response.json();
+};
+
 export const updateSetting = async (key: string, value: string): Promise<void> => {
   const response = await authenticatedFetch(`${API_BASE_URL}/admin/settings/`, {
     method: 'PUT',
@@ -4,7 +4,7 @@ import { useLanguage } from '../contexts/LanguageContext';
 import { useCart } from '../contexts/CartContext';
 import Header from '../components/Header';
 import CartItem from '../components/CartItem';
-import { getPerfumeById, getSettings } from '../lib/api';
+import { getPerfumesByIds, getPublicSettings } from '../lib/api';
 import { toast } from 'sonner';
 
 // Helper to interpolate variables in translation strings
@@ -31,8 +31,8 @@ export default function CartPage() {
   useEffect(() => {
     const fetchSettings = async () => {
       try {
-        const settings = await getSettings();
-        if (settings.whatsapp_phone) {
+        const settings = await getPublicSettings();
+        if (typeof settings.whatsapp_phone === 'string' && settings.whatsapp_phone) {
           setWhatsappNumber(settings.whatsapp_phone);
         }
       } catch (error) {
@@ -65,10 +65,19 @@ export default function CartPage() {
     const checkCartItems = async () => {
       const newWarnings: { [id: string]: string } = {};
       const newStockInfo: { [id: string]: string } = {};
+
+      let products: Map<string, any>;
+      try {
+        products = await getPerfumesByIds(items.map(item => item.id));
+      } catch (err) {
+        toast.error(t('cart.fetchError') || 'Failed to check cart item.');
+        setStockStatusLoaded(true);
+        return;
+      }
       
       for (const item of items) {
         try {
-          const product = await getPerfumeById(item.id);
+          const product = products.get(item.id);
           if (!product || !product.isActive) {
             removeItem(item.id, item.size);
             newWarnings[item.id] = t('cart.productRemoved') || 'This product is no longer available and was removed from your cart.';
@@ -119,10 +128,18 @@ export default function CartPage() {
     let valid = true;
     const newWarnings: { [id: string]: string } = {};
     const newStockInfo: { [id: string]: string } = {};
+
+    let products: Map<string, any>;
+    try {
+      products = await getPerfumesByIds(items.map(item => item.id));
+    } catch (err) {
+      toast.error(t('cart.fetchError') || 'Failed to check cart item.');
+      return { valid: false, stockInfo: newStockInfo };
+    }
     
     for (const item of items) {
       try {
-        const product = await getPerfumeById(item.id);
+        const product = products.get(item.id);
         if (!product || !product.isActive) {
           removeItem(item.id, item.size);
           newWarnings[item.id] = t('cart.productRemoved') || 'This product is no longer available and was removed from your cart.';
@@ -212,8 +229,8 @@ export default function CartPage() {
     // Fetch latest settings before sending order
     let currentWhatsappNumber = whatsappNumber; // Use current number as fallback
     try {
-      const settings = await getSettings();
-      if (settings.whatsapp_phone) {
+      const settings = await getPublicSettings();
+      if (typeof settings.whatsapp_phone === 'string' && settings.whatsapp_phone) {
         currentWhatsappNumber = settings.whatsapp_phone; // Use new number directly
         setWhatsappNumber(settings.whatsapp_phone); // Update state for future use
       }
@@ -251,15 +268,16 @@ export default function CartPage() {
     setStockStatusLoaded(false); // Set loading state
     const newStockInfo: { [id: string]: string } = {};
     
-    for (const item of items) {
-      try {
-        const product = await getPerfumeById(item.id);
+    try {
+      const products = await getPerfumesByIds(items.map(item => item.id));
+      for (const item of items) {
+        const product = products.get(item.id);
         if (product && product.isActive) {
           newStockInfo[item.id] = product.stockStatus || 'in_stock';
         }
-      } catch (err) {
-        console.error('Failed to fetch stock status for item:', item.id);
       }
+    } catch (err) {
+      console.error('Failed to fetch stock status for cart items');
     }
     
     setProductStockInfo(newStockInfo);
@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useRef, RefObject } from 'react';
 import { useLanguage } from '../contexts/LanguageContext';
-import { listPerfumes, getBrands, getCategories } from '../lib/api';
+import { listPerfumes, getBrands, getCategories, getCollections, Collections } from '../lib/api';
 import { useCart } from '../contexts/CartContext';
 
 import Header from '../components/Header';
@@ -8,6 +8,9 @@ import PerfumeCard from '../components/PerfumeCard';
 import FilterBar from '../components/FilterBar';
 import Pagination from '../components/Pagination';
 
+// Fields PerfumeCard renders
+const GRID_FIELDS = ['name', 'brand', 'category', 'sizes', 'stockStatus', 'imageUrl', 'imageVariants', 'isNew', 'isBestseller'];
+
 function getColumns() {
   if (window.innerWidth >= 1024) return 4; // lg
   if (window.innerWidth >= 768) return 3;  // md
@@ -33,6 +36,7 @@ export default function HomePage() {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
   const [columns, setColumns] = useState(getColumns());
+  const [collections, setCollections] = useState<Collections | null>(null);
 
   const searchInputRef = useRef<HTMLInputElement>(null);
 
@@ -69,6 +73,9 @@ export default function HomePage() {
           searchTerm: debouncedSearchTerm || undefined,
           page: currentPage,
           limit: 24, 
+          // Just what PerfumeCard shows, in the current language
+          fields: GRID_FIELDS,
+          languageOnly: true,
         });
         
         console.log("Fetched perfume data:", data); // Log the entire data object
@@ -84,6 +91,20 @@ export default function HomePage() {
     fetchPerfumes();
   }, [language, brandFilter, categoryFilter, genderFilter, stockStatusFilter, debouncedSearchTerm, currentPage]);
 
+  // Fetch the homepage rails
+  useEffect(() => {
+    const fetchCollections = async () => {
+      try {
+        const data = await getCollections({ language, fields: GRID_FIELDS, languageOnly: true });
+        setCollections(data);
+      } catch (err) {
+        setCollections(null);
+        console.error("Failed to fetch collections:", err);
+      }
+    };
+    fetchCollections();
+  }, [language]);
+
   // Fetch brands
   useEffect(() => {
     const fetchBrands = async () => {
@@ -129,6 +150,16 @@ export default function HomePage() {
     rows.push(displayedPerfumes.slice(i, i + columns));
   }
 
+  // Rails only on the unfiltered first page
+  const showRails = collections !== null && currentPage === 1 && !debouncedSearchTerm
+    && !brandFilter && !categoryFilter && !genderFilter && !stockStatusFilter;
+  const rails = collections ? [
+    { key: 'new', title: t('home.newArrivals'), perfumes: collections.new },
+    { key: 'bestseller', title: t('home.bestsellers'), perfumes: collections.bestseller },
+    ...collections.brands.map(group => ({ key: `brand-${group.name}`, title: group.name, perfumes: group.perfumes })),
+    ...collections.categories.map(group => ({ key: `category-${group.name}`, title: group.name, perfumes: group.perfumes })),
+  ].filter(rail => rail.perfumes.length > 0) : [];
+
   const { pagination = { totalItems: 0, totalPages: 1, currentPage: 1, hasNext: false, hasPrev: false } } = perfumeData || {};
 
   if (loading && displayedPerfumes.length === 0) {
@@ -562,6 +593,18 @@ export default function HomePage() {
       {/* Perfume Grid Section */}
       <section className="py-4">
         <div className="container mx-auto px-4">
+          {showRails && rails.map(rail => (
+            <section key={rail.key} className="mb-6">
+              <h2 className="text-lg font-semibold mb-3 text-gray-900 dark:text-white">{rail.title}</h2>
+              <div className="flex gap-4 overflow-x-auto pb-2 snap-x">
+                {rail.perfumes.map((perfume, idx) => (
+                  <div key={perfume.id} className="w-40 sm:w-48 flex-shrink-0 snap-start">
+                    <PerfumeCard perfume={perfume} indexInRow={idx % columns} />
+                  </div>
+                ))}
+              </div>
+            </section>
+          ))}
           <div className="mb-3 text-gray-600 dark:text-gray-400 text-body-base">
             Showing {displayedPerfumes.length} of {pagination.totalItems} perfumes
             {pagination.totalPages > 1 && ` (Page ${pagination.currentPage} of ${pagination.totalPages})`}
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useParams, Link } from 'react-router-dom';
 import { useLanguage } from '../contexts/LanguageContext';
-import { getPerfumeById } from '../lib/api';
+import { getPerfumeById, imageSrcSet } from '../lib/api';
 import { useCart } from '../contexts/CartContext';
 import Header from '../components/Header';
 import { toast } from 'sonner';
@@ -157,11 +157,16 @@ export default function ProductPage() {
                 )}
               </div>
             )}
-            <img
-              src={perfume.imageUrl || "https://placehold.co/400x400?text=No+Image"}
-              alt={name}
-              className="w-full h-96 object-contain rounded-lg shadow-2xl"
-            />
+            <picture>
+              <source type="image/webp" srcSet={imageSrcSet(perfume.imageVariants, 'webp')} sizes="(min-width: 1024px) 50vw, 100vw" />
+              <img
+                src={perfume.imageUrl || "https://placehold.co/400x400?text=No+Image"}
+                srcSet={imageSrcSet(perfume.imageVariants, 'jpeg')}
+                sizes="(min-width: 1024px) 50vw, 100vw"
+                alt={name}
+                className="w-full h-96 object-contain rounded-lg shadow-2xl"
+              />
+            </picture>
             {/* Note Pyramid Example */}
             {(() => {
               // Example accords data for demonstration